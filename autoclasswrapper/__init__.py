@@ -10,8 +10,16 @@ from .input import (Input,
                     raise_on_duplicates,
                     DuplicateColumnNameError,
                     CastFloat64Error)
-from .output import Output
+from .output import Output, Results
 from .run import Run
+from .cache import ArtifactCache
+from .scratch import ScratchDir
+from .jobqueue import RunQueue, RunJob
+from .executors import (Executor,
+                        LocalPoolExecutor,
+                        SSHExecutor,
+                        DirectoryQueueExecutor)
+from .metrics import Metrics
 from .tools import search_autoclass_in_path, get_autoclass_version
 
 
@@ -21,4 +29,20 @@ log_formatter = logging.Formatter("%(asctime)s %(levelname)-8s %(message)s",
                                   "%Y-%m-%d %H:%M:%S")
 log_handler.setFormatter(log_formatter)
 log.addHandler(log_handler)
-log.setLevel(logging.DEBUG)
+log.setLevel(logging.INFO)
+
+
+def set_log_level(level):
+    """Set level of messages printed by autoclasswrapper.
+
+    Parameters
+    ----------
+    level : int or string
+        Logging level:
+
+        - "DEBUG": all messages, including full lists of columns
+        - "INFO": progress messages (default)
+        - "WARNING": quiet mode, only warnings and errors
+
+    """
+    log.setLevel(level)
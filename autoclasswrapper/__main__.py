@@ -0,0 +1,8 @@
+"""autoclasswrapper: Python wrapper for AutoClass C classification.
+
+Command line entry point: python -m autoclasswrapper worker <queue_dir>
+"""
+
+from .executors import main
+
+main()
@@ -0,0 +1,282 @@
+"""autoclasswrapper: Python wrapper for AutoClass C classification.
+
+Content-addressed cache for AutoClass C files
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# bump when the content of cached files changes for identical inputs
+CACHE_VERSION = 1
+
+
+def hash_file(filename, chunk_size=1 << 20):
+    """Compute SHA-256 digest of a file content.
+
+    Parameters
+    ----------
+    filename : string
+        Name of the file to hash.
+    chunk_size : int, optional (default: 1 MiB)
+        Size of chunks read from file.
+
+    Returns
+    -------
+    digest : string
+        Hexadecimal digest.
+
+    """
+    sha = hashlib.sha256()
+    with open(filename, "rb") as f_in:
+        for chunk in iter(lambda: f_in.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def hash_dataframe(df):
+    """Compute SHA-256 digest of a dataframe content.
+
+    Index, column names, data types and values are hashed.
+
+    Parameters
+    ----------
+    df : Pandas dataframe
+        Dataframe to hash.
+
+    Returns
+    -------
+    digest : string
+        Hexadecimal digest.
+
+    """
+    sha = hashlib.sha256()
+    header = [str(df.index.name),
+              [str(name) for name in df.columns],
+              [str(dtype) for dtype in df.dtypes]]
+    sha.update(json.dumps(header).encode("utf8"))
+    sha.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return sha.hexdigest()
+
+
+def hash_items(items):
+    """Compute SHA-256 digest of JSON-serializable items.
+
+    Parameters
+    ----------
+    items : list
+        Items (file digests, parameters...) defining a cache entry.
+
+    Returns
+    -------
+    digest : string
+        Hexadecimal digest.
+
+    """
+    content = json.dumps([CACHE_VERSION, items], sort_keys=True)
+    return hashlib.sha256(content.encode("utf8")).hexdigest()
+
+
+class ArtifactCache():
+    """On-disk cache of files, keyed by content digests.
+
+    Each entry is a directory named after its key. Files are stored
+    with their extension as name ("autoclass.db2" is stored as ".db2").
+    Least recently used entries are evicted when size limits are reached.
+
+    Parameters
+    ----------
+    cache_dir : string
+        Directory to store cache entries.
+    max_entries : int or None, optional (default: 20)
+        Maximum number of entries. None means no limit.
+    max_size : int or None, optional (default: None)
+        Maximum size of the cache, in bytes. None means no limit.
+    hardlink : bool, optional (default: True)
+        If True, restore files as hard links when possible.
+        Files are stored read-only, so that restored hard links
+        are read-only too.
+        If False, always copy files.
+
+    """
+
+    def __init__(self,
+                 cache_dir,
+                 max_entries=20,
+                 max_size=None,
+                 hardlink=True):
+        """Instantiate object."""
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.hardlink = hardlink
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_path(self, key):
+        """Get path of a cache entry.
+
+        Parameters
+        ----------
+        key : string
+            Cache key.
+
+        Returns
+        -------
+        path : string
+            Path of entry directory.
+
+        """
+        return os.path.join(self.cache_dir, key)
+
+    def contains(self, key, extensions):
+        """Verify all files of an entry are in cache.
+
+        Parameters
+        ----------
+        key : string
+            Cache key.
+        extensions : list of strings
+            Extensions of expected files.
+
+        Returns
+        -------
+        bool
+
+        """
+        entry = self.entry_path(key)
+        return all(os.path.isfile(os.path.join(entry, ext))
+                   for ext in extensions)
+
+    def store(self, key, filename, extension):
+        """Copy file into cache entry.
+
+        Parameters
+        ----------
+        key : string
+            Cache key.
+        filename : string
+            Name of file to store.
+        extension : string
+            Name of file in cache entry.
+
+        """
+        entry = self.entry_path(key)
+        os.makedirs(entry, exist_ok=True)
+        target = os.path.join(entry, extension)
+        # copy then rename so that readers never see partial files
+        tmp_name = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(filename, tmp_name)
+        # read-only: writing through a restored hard link fails
+        os.chmod(tmp_name, 0o444)
+        os.replace(tmp_name, target)
+        self.touch(key)
+        log.debug(f"Stored {filename} in cache entry {key[:12]}")
+        self.evict(keep=key)
+
+    def restore(self, key, extension, filename):
+        """Restore file from cache entry.
+
+        Existing file is removed first, so that restored content
+        never overwrites a hard-linked file.
+
+        Parameters
+        ----------
+        key : string
+            Cache key.
+        extension : string
+            Name of file in cache entry.
+        filename : string
+            Name of restored file.
+
+        """
+        source = os.path.join(self.entry_path(key), extension)
+        unlink(filename)
+        if self.hardlink:
+            try:
+                os.link(source, filename)
+            except OSError:
+                shutil.copyfile(source, filename)
+        else:
+            shutil.copyfile(source, filename)
+        self.touch(key)
+        log.debug(f"Restored {filename} from cache entry {key[:12]}")
+
+    def touch(self, key):
+        """Mark entry as recently used.
+
+        Parameters
+        ----------
+        key : string
+            Cache key.
+
+        """
+        now = time.time()
+        os.utime(self.entry_path(key), (now, now))
+
+    def entries(self):
+        """List cache entries from least to most recently used.
+
+        Returns
+        -------
+        entries : list of tuples
+            (key, last access time, size in bytes) for each entry.
+
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            path = self.entry_path(key)
+            if not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path)
+                       if entry.is_file())
+            entries.append((key, os.stat(path).st_mtime, size))
+        entries.sort(key=lambda entry: entry[1])
+        return entries
+
+    def evict(self, keep=None):
+        """Remove least recently used entries above size limits.
+
+        Parameters
+        ----------
+        keep : string, optional (default: None)
+            Key of an entry that must not be evicted.
+
+        """
+        entries = self.entries()
+        total_size = sum(size for _, _, size in entries)
+        count = len(entries)
+        for key, _, size in entries:
+            too_many = self.max_entries is not None and \
+                count > self.max_entries
+            too_big = self.max_size is not None and \
+                total_size > self.max_size
+            if not (too_many or too_big):
+                break
+            if key == keep:
+                continue
+            log.debug(f"Evicting cache entry {key[:12]}")
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total_size -= size
+            count -= 1
+
+
+def unlink(filename):
+    """Remove file if it exists.
+
+    Parameters
+    ----------
+    filename : string
+        Name of file to remove.
+
+    """
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,635 @@
+"""autoclasswrapper: Python wrapper for AutoClass C classification.
+
+Executors of AutoClass C runs: local process pool, SSH hosts
+and directory queue on a shared file system
+"""
+
+import abc
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import time
+import uuid
+
+from .run import RUN_INPUT_EXTENSIONS, RUN_MARKER_FILES
+from .scratch import SCRATCH_CLEANUP, ScratchDir
+
+log = logging.getLogger(__name__)
+
+# sub-directories of a directory queue
+QUEUE_SUBDIRS = ("tmp", "pending", "running", "done")
+# description of a job in its directory
+JOB_FILE = "job.json"
+# exit status of the run script, written by workers
+RETURNCODE_FILE = "returncode"
+# standard and error outputs of the run script
+JOB_OUTPUT_FILE = "autoclass-run.out"
+# exit status of jobs that workers could not run
+WORKER_ERROR_RETURNCODE = -1
+
+
+def get_job_files(run):
+    """Get names of files shipped to a worker.
+
+    Parameters
+    ----------
+    run : Run() object
+        AutoClass C run.
+
+    Returns
+    -------
+    filenames : list of strings
+        Names of input files and run script, relative to work_dir.
+
+    """
+    return [run.root_name + ext for ext in RUN_INPUT_EXTENSIONS + (".sh",)]
+
+
+def get_result_files(run):
+    """Get names of files pulled back from a worker.
+
+    Parameters
+    ----------
+    run : Run() object
+        AutoClass C run.
+
+    Returns
+    -------
+    artifacts : list of strings
+        Names of results, reports and log files (see Run.scratch_artifacts).
+    markers : list of strings
+        Names of autoclass-run-success and autoclass-run-failure files,
+        pulled back last.
+
+    """
+    return run.get_scratch_artifacts(), list(RUN_MARKER_FILES)
+
+
+def execute_job(job_dir, script_name, tag=""):
+    """Run AutoClass C run script in a job directory and wait for its end.
+
+    Parameters
+    ----------
+    job_dir : string
+        Directory with input files and run script.
+    script_name : string
+        Name of run script.
+    tag : string (default: ""), optional
+        Tag to identify the autoclass run among other processes.
+
+    Returns
+    -------
+    returncode : int
+        Exit status of the run script.
+
+    """
+    with open(os.path.join(job_dir, JOB_OUTPUT_FILE), "w") as output:
+        proc = subprocess.run(["bash", script_name, tag],
+                              cwd=job_dir,
+                              stdout=output,
+                              stderr=subprocess.STDOUT)
+    return proc.returncode
+
+
+def copy_files(names, source_dir, dest_dir):
+    """Copy files between directories.
+
+    Parameters
+    ----------
+    names : list of strings
+        Names of files. Missing files are skipped.
+    source_dir : string
+        Source directory.
+    dest_dir : string
+        Destination directory.
+
+    """
+    for name in names:
+        path = os.path.join(source_dir, name)
+        if os.path.isfile(path):
+            shutil.copy2(path, os.path.join(dest_dir, name))
+
+
+def should_cleanup(cleanup, job_dir):
+    """Verify a job directory should be removed.
+
+    Parameters
+    ----------
+    cleanup : string
+        Cleanup policy: "always", "on_success" or "never".
+    job_dir : string
+        Job directory.
+
+    Returns
+    -------
+    bool
+        True if the job directory should be removed.
+
+    """
+    success = os.path.exists(os.path.join(job_dir, RUN_MARKER_FILES[0]))
+    return cleanup == "always" or (cleanup == "on_success" and success)
+
+
+class Executor(abc.ABC):
+    """Base class of executors of AutoClass C runs.
+
+    An executor ships input files and run script of a run to a worker,
+    runs the script there and pulls results back into the work_dir
+    of the run. Runs are executed in background threads.
+    Subclasses implement execute().
+
+    Parameters
+    ----------
+    max_workers : int, optional (default: None)
+        Maximum number of runs executed at the same time.
+        If None, the number of CPU cores is used.
+    cleanup : string, optional (default: "on_success")
+        When to remove job directories on workers:
+        "always", "on_success" or "never".
+
+    """
+
+    def __init__(self, max_workers=None, cleanup="on_success"):
+        """Instantiate object."""
+        if cleanup not in SCRATCH_CLEANUP:
+            raise ValueError(f"Unknown cleanup policy '{cleanup}'. "
+                             f"Available: {', '.join(SCRATCH_CLEANUP)}")
+        self.cleanup = cleanup
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self.threads = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix=type(self).__name__)
+
+    def __enter__(self):
+        """Enter context: return executor."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Exit context: wait for all runs."""
+        self.shutdown(wait=True)
+
+    def submit(self, run, tag="", callback=None):
+        """Submit an AutoClass C run.
+
+        Parameters
+        ----------
+        run : Run() object
+            Run, with run file already created.
+        tag : string (default: ""), optional
+            Tag to identify the autoclass run among other processes.
+        callback : function, optional (default: None)
+            Function called with the exit status of the run script
+            once results are pulled back, before the future is done.
+
+        Returns
+        -------
+        future : concurrent.futures.Future() object
+            Future of the exit status of the run script, done when
+            results are pulled back.
+
+        """
+        def execute_run():
+            returncode = self.execute(run, tag)
+            if callback is not None:
+                callback(returncode)
+            return returncode
+        return self.threads.submit(execute_run)
+
+    @abc.abstractmethod
+    def execute(self, run, tag=""):
+        """Execute an AutoClass C run and wait for its end.
+
+        Parameters
+        ----------
+        run : Run() object
+            Run, with run file already created.
+        tag : string (default: ""), optional
+            Tag to identify the autoclass run among other processes.
+
+        Returns
+        -------
+        returncode : int
+            Exit status of the run script.
+
+        """
+
+    def shutdown(self, wait=True):
+        """Stop accepting runs.
+
+        Parameters
+        ----------
+        wait : bool, optional (default: True)
+            If True, wait for the end of all runs.
+
+        """
+        self.threads.shutdown(wait=wait)
+
+
+class LocalPoolExecutor(Executor):
+    """Execute AutoClass C runs in a pool of local worker processes.
+
+    Each run is executed in its own scratch directory.
+
+    Parameters
+    ----------
+    max_workers : int, optional (default: None)
+        Number of worker processes.
+        If None, the number of CPU cores is used.
+    base_dir : string, optional (default: None)
+        Base directory of job directories.
+        If None, /dev/shm is used if available, otherwise $TMPDIR.
+    cleanup : string, optional (default: "on_success")
+        When to remove job directories.
+
+    """
+
+    def __init__(self, max_workers=None, base_dir=None,
+                 cleanup="on_success"):
+        """Instantiate object."""
+        super().__init__(max_workers, cleanup)
+        self.base_dir = base_dir
+        self.pool = concurrent.futures.ProcessPoolExecutor(self.max_workers)
+
+    def execute(self, run, tag=""):
+        """Execute an AutoClass C run in a worker process.
+
+        See Executor.execute().
+        """
+        scratch = ScratchDir(self.base_dir, prefix=run.root_name + "-")
+        scratch.stage([run.get_path(name) for name in get_job_files(run)])
+        log.info(f"Running {run.root_name} in local worker ({scratch.path})")
+        returncode = self.pool.submit(execute_job,
+                                      scratch.path,
+                                      run.root_name + ".sh",
+                                      tag).result()
+        for names in get_result_files(run):
+            copy_files(names, scratch.path, run.work_dir)
+        if should_cleanup(self.cleanup, scratch.path):
+            scratch.remove()
+        return returncode
+
+    def shutdown(self, wait=True):
+        """Stop accepting runs and stop worker processes.
+
+        See Executor.shutdown().
+        """
+        super().shutdown(wait)
+        self.pool.shutdown(wait=wait)
+
+
+class SSHExecutor(Executor):
+    """Execute AutoClass C runs on remote hosts through SSH.
+
+    AutoClass C must be installed on remote hosts. Files are shipped
+    and pulled back as tar streams over SSH.
+
+    Parameters
+    ----------
+    hosts : list of strings
+        Remote hosts (for instance "user@node01").
+    remote_dir : string, optional (default: "/tmp")
+        Base directory of job directories on remote hosts.
+    runs_per_host : int, optional (default: 1)
+        Maximum number of runs executed at the same time on each host.
+    ssh_command : list of strings, optional (default: ["ssh"])
+        Command used to run commands on remote hosts,
+        for instance ["ssh", "-o", "BatchMode=yes"].
+    cleanup : string, optional (default: "on_success")
+        When to remove job directories on remote hosts.
+
+    """
+
+    def __init__(self, hosts, remote_dir="/tmp", runs_per_host=1,
+                 ssh_command=("ssh",), cleanup="on_success"):
+        """Instantiate object."""
+        super().__init__(len(hosts) * runs_per_host, cleanup)
+        self.remote_dir = remote_dir
+        self.ssh_command = list(ssh_command)
+        # free run slots, shared by threads
+        self.slots = queue.Queue()
+        for _ in range(runs_per_host):
+            for host in hosts:
+                self.slots.put(host)
+
+    def ssh(self, host, command, **kwargs):
+        """Run a command on a remote host.
+
+        Parameters
+        ----------
+        host : string
+            Remote host.
+        command : string
+            Shell command.
+        kwargs : dict
+            Arguments of subprocess.run().
+
+        Returns
+        -------
+        proc : subprocess.CompletedProcess() object
+            Completed SSH process.
+
+        """
+        return subprocess.run(self.ssh_command + [host, command], **kwargs)
+
+    def pull(self, host, job_dir, names, dest_dir):
+        """Pull files back from a remote job directory.
+
+        Parameters
+        ----------
+        host : string
+            Remote host.
+        job_dir : string
+            Remote job directory.
+        names : list of strings
+            Names of files. Missing files are skipped.
+        dest_dir : string
+            Local destination directory.
+
+        """
+        quoted = " ".join(shlex.quote(name) for name in names)
+        command = (f"cd {shlex.quote(job_dir)} && for name in {quoted}; "
+                   'do if [ -e "$name" ]; then echo "$name"; fi; done '
+                   "| tar -cf - -T -")
+        with subprocess.Popen(self.ssh_command + [host, command],
+                              stdout=subprocess.PIPE) as ssh:
+            subprocess.run(["tar", "-xf", "-", "-C", dest_dir],
+                           stdin=ssh.stdout, check=True)
+        if ssh.returncode != 0:
+            raise RuntimeError(f"Cannot pull results from {host}:{job_dir}")
+
+    def execute(self, run, tag=""):
+        """Execute an AutoClass C run on a remote host.
+
+        See Executor.execute().
+        """
+        host = self.slots.get()
+        try:
+            job_dir = (f"{self.remote_dir}/"
+                       f"{run.root_name}-{uuid.uuid4().hex[:12]}")
+            quoted_dir = shlex.quote(job_dir)
+            log.info(f"Running {run.root_name} on {host} ({job_dir})")
+            names = [name for name in get_job_files(run)
+                     if os.path.isfile(run.get_path(name))]
+            # ship input files
+            with subprocess.Popen(["tar", "-cf", "-", "-C", run.work_dir,
+                                   *names],
+                                  stdout=subprocess.PIPE) as tar:
+                ship = self.ssh(host,
+                                f"mkdir -p {quoted_dir} "
+                                f"&& tar -xf - -C {quoted_dir}",
+                                stdin=tar.stdout)
+            if tar.returncode != 0 or ship.returncode != 0:
+                raise RuntimeError(f"Cannot ship input files to {host}")
+            # run search and reports
+            script = shlex.quote(run.root_name + ".sh")
+            proc = self.ssh(host,
+                            f"cd {quoted_dir} && bash {script} "
+                            f"{shlex.quote(tag)} >{JOB_OUTPUT_FILE} 2>&1")
+            artifacts, markers = get_result_files(run)
+            self.pull(host, job_dir, artifacts, run.work_dir)
+            self.pull(host, job_dir, markers, run.work_dir)
+            success = os.path.exists(run.get_path(RUN_MARKER_FILES[0]))
+            if self.cleanup == "always" or (self.cleanup == "on_success"
+                                            and success):
+                self.ssh(host, f"rm -rf {quoted_dir}")
+            return proc.returncode
+        finally:
+            self.slots.put(host)
+
+
+class DirectoryQueueExecutor(Executor):
+    """Execute AutoClass C runs through a queue on a shared file system.
+
+    Each run is published as a job directory in <queue_dir>/pending.
+    Workers started on other nodes with:
+
+        python -m autoclasswrapper worker <queue_dir>
+
+    claim jobs by moving them atomically to <queue_dir>/running,
+    then move them to <queue_dir>/done at the end of the run.
+    Results are then pulled back into the work_dir of the run.
+
+    Parameters
+    ----------
+    queue_dir : string
+        Queue directory, shared by the submitting host and workers.
+    poll_interval : float, optional (default: 1.0)
+        Interval between checks of finished jobs, in seconds.
+    max_workers : int, optional (default: 32)
+        Maximum number of runs waited for at the same time.
+    cleanup : string, optional (default: "on_success")
+        When to remove job directories from <queue_dir>/done.
+    timeout : float, optional (default: None)
+        Maximum time to wait for the end of each run, in seconds,
+        for instance if no worker is alive. None means no limit.
+
+    """
+
+    def __init__(self, queue_dir, poll_interval=1.0, max_workers=32,
+                 cleanup="on_success", timeout=None):
+        """Instantiate object."""
+        super().__init__(max_workers, cleanup)
+        self.queue_dir = queue_dir
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        create_queue_dir(queue_dir)
+
+    def execute(self, run, tag="", timeout=None):
+        """Execute an AutoClass C run through the directory queue.
+
+        See Executor.execute().
+
+        Parameters
+        ----------
+        timeout : float, optional (default: None)
+            Maximum time to wait for the end of the run, in seconds.
+            If None, the timeout of the executor is used.
+
+        Raises
+        ------
+        TimeoutError
+            If the run did not end in time. A job still pending
+            is withdrawn from the queue.
+
+        """
+        if timeout is None:
+            timeout = self.timeout
+        job_id = f"{run.root_name}-{uuid.uuid4().hex[:12]}"
+        tmp_dir = os.path.join(self.queue_dir, "tmp", job_id)
+        os.makedirs(tmp_dir)
+        copy_files(get_job_files(run), run.work_dir, tmp_dir)
+        with open(os.path.join(tmp_dir, JOB_FILE), "w") as job_file:
+            json.dump({"script": run.root_name + ".sh", "tag": tag},
+                      job_file)
+        # rename is atomic: workers never see partial jobs
+        os.rename(tmp_dir, os.path.join(self.queue_dir, "pending", job_id))
+        log.info(f"Queued {run.root_name} as job {job_id}")
+        done_dir = os.path.join(self.queue_dir, "done", job_id)
+        start = time.monotonic()
+        while not os.path.isdir(done_dir):
+            if timeout is not None and time.monotonic() - start > timeout:
+                self.withdraw_job(job_id)
+                raise TimeoutError(f"Job {job_id} did not end "
+                                   f"after {timeout} s")
+            time.sleep(self.poll_interval)
+        for names in get_result_files(run):
+            copy_files(names, done_dir, run.work_dir)
+        with open(os.path.join(done_dir, RETURNCODE_FILE), "r") as rc_file:
+            returncode = int(rc_file.read())
+        if should_cleanup(self.cleanup, done_dir):
+            shutil.rmtree(done_dir, ignore_errors=True)
+        return returncode
+
+    def withdraw_job(self, job_id):
+        """Remove a pending job from the queue.
+
+        Parameters
+        ----------
+        job_id : string
+            Job identifier.
+
+        """
+        tmp_dir = os.path.join(self.queue_dir, "tmp", job_id)
+        try:
+            # atomic: fails if a worker claimed the job meanwhile
+            os.rename(os.path.join(self.queue_dir, "pending", job_id),
+                      tmp_dir)
+        except OSError:
+            log.warning(f"Cannot withdraw job {job_id}, already claimed")
+            return
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        log.info(f"Withdrew job {job_id}")
+
+
+def create_queue_dir(queue_dir):
+    """Create sub-directories of a directory queue.
+
+    Parameters
+    ----------
+    queue_dir : string
+        Queue directory.
+
+    """
+    for subdir in QUEUE_SUBDIRS:
+        os.makedirs(os.path.join(queue_dir, subdir), exist_ok=True)
+
+
+def claim_job(queue_dir):
+    """Claim the oldest pending job of a directory queue.
+
+    Parameters
+    ----------
+    queue_dir : string
+        Queue directory.
+
+    Returns
+    -------
+    job_dir : string or None
+        Job directory, moved to <queue_dir>/running.
+        None if no job is pending.
+
+    """
+    pending_dir = os.path.join(queue_dir, "pending")
+    jobs = sorted(os.scandir(pending_dir),
+                  key=lambda entry: entry.stat().st_mtime)
+    for entry in jobs:
+        job_dir = os.path.join(queue_dir, "running", entry.name)
+        try:
+            os.rename(entry.path, job_dir)
+        except OSError:
+            # claimed by another worker
+            continue
+        return job_dir
+    return None
+
+
+def run_worker(queue_dir, poll_interval=1.0, max_jobs=None,
+               idle_timeout=None):
+    """Execute jobs of a directory queue.
+
+    Parameters
+    ----------
+    queue_dir : string
+        Queue directory.
+    poll_interval : float, optional (default: 1.0)
+        Interval between checks of pending jobs, in seconds.
+    max_jobs : int, optional (default: None)
+        Stop after this number of jobs. None means no limit.
+    idle_timeout : float, optional (default: None)
+        Stop after this time without pending job, in seconds.
+        None means no limit.
+
+    Returns
+    -------
+    job_number : int
+        Number of executed jobs.
+
+    Errors of a job are logged. The job is then moved to
+    <queue_dir>/done with an autoclass-run-failure file and
+    the worker continues with the next job.
+
+    """
+    create_queue_dir(queue_dir)
+    job_number = 0
+    idle_since = time.monotonic()
+    while max_jobs is None or job_number < max_jobs:
+        job_dir = claim_job(queue_dir)
+        if job_dir is None:
+            if (idle_timeout is not None
+                    and time.monotonic() - idle_since > idle_timeout):
+                break
+            time.sleep(poll_interval)
+            continue
+        job_id = os.path.basename(job_dir)
+        try:
+            with open(os.path.join(job_dir, JOB_FILE), "r") as job_file:
+                job = json.load(job_file)
+            log.info(f"Running job {job_id}")
+            returncode = execute_job(job_dir, job["script"], job["tag"])
+        except Exception as e:
+            log.error(f"Cannot run job {job_id}: {e}")
+            returncode = WORKER_ERROR_RETURNCODE
+            open(os.path.join(job_dir, RUN_MARKER_FILES[1]), "w").close()
+        with open(os.path.join(job_dir, RETURNCODE_FILE), "w") as rc_file:
+            rc_file.write(f"{returncode}\n")
+        os.rename(job_dir, os.path.join(queue_dir, "done",
+                                        os.path.basename(job_dir)))
+        job_number += 1
+        idle_since = time.monotonic()
+    return job_number
+
+
+def main(args=None):
+    """Start a worker of a directory queue from the command line.
+
+    Parameters
+    ----------
+    args : list of strings, optional (default: None)
+        Command line arguments. If None, sys.argv is used.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m autoclasswrapper",
+        description="Execute AutoClass C runs of a directory queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker = subparsers.add_parser("worker", help="start a worker")
+    worker.add_argument("queue_dir", help="queue directory")
+    worker.add_argument("--poll-interval", type=float, default=1.0,
+                        help="interval between checks of pending jobs (s)")
+    worker.add_argument("--max-jobs", type=int, default=None,
+                        help="stop after this number of jobs")
+    worker.add_argument("--idle-timeout", type=float, default=None,
+                        help="stop after this time without job (s)")
+    options = parser.parse_args(args)
+    run_worker(options.queue_dir,
+               poll_interval=options.poll_interval,
+               max_jobs=options.max_jobs,
+               idle_timeout=options.idle_timeout)
+
@@ -10,8 +10,60 @@ import re
 import chardet
 import pandas as pd
 
+from .cache import (ArtifactCache, hash_dataframe, hash_file, hash_items,
+                    unlink)
+from .metrics import Metrics
+from .profiling import Profiler, profiling_requested
+from .tools import COMPRESSION_EXTENSIONS, REPORT_FILES
+
 log = logging.getLogger(__name__)
 
+# number of columns listed in log messages, unless DEBUG level is enabled
+MAX_LOGGED_COLUMNS = 20
+
+# name of index column of in-memory data without index name
+DEFAULT_INDEX_NAME = "name"
+
+
+def truncate_columns(columns):
+    """Select columns to list in log messages.
+
+    Parameters
+    ----------
+    columns : list
+        Columns (or messages about columns).
+
+    Returns
+    -------
+    shown : list
+        All columns if DEBUG level is enabled,
+        otherwise the first MAX_LOGGED_COLUMNS columns.
+
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        return columns
+    return columns[:MAX_LOGGED_COLUMNS]
+
+
+def log_columns(level, messages, total):
+    """Log messages about columns, with count of columns not listed.
+
+    Parameters
+    ----------
+    level : int
+        Logging level.
+    messages : list of strings
+        Messages to log, usually selected with truncate_columns().
+    total : int
+        Total number of columns.
+
+    """
+    for message in messages:
+        log.log(level, message)
+    if total > len(messages):
+        log.log(level, f"... and {total - len(messages)} more columns "
+                       "(set DEBUG level to list all columns)")
+
 
 def raise_on_duplicates(input_list):
     """Verify duplicated values in a list.
@@ -67,16 +119,58 @@ class Input():
         If True, countinue generation of AutoClass C input files even if an
         error is encounter.
         If False, stop at first error.
+    cache_dir : string, optional (default: None)
+        Directory to cache prepared input files (.db2, .tsv, .hd2, .model).
+        Cache entries are keyed by the content of input data (files or
+        in-memory data) and by the parameters given to add_input_data(),
+        add_dataframe() or add_array().
+        On a cache hit, input data files are not read again and prepared
+        files are restored from cache.
+        If None, no cache is used.
+    cache_max_entries : int or None, optional (default: 20)
+        Maximum number of entries in cache.
+        Least recently used entries are evicted first.
+    cache_max_size : int or None, optional (default: None)
+        Maximum size of cache, in bytes.
+        Least recently used entries are evicted first.
+    tsv_compression : string, optional (default: None)
+        Compression of the .tsv file with all data: "gzip" (.tsv.gz file)
+        or "zstd" (.tsv.zst file, requires zstandard).
+        If None, the .tsv file is not compressed.
+    work_dir : string, optional (default: None)
+        Directory to write input files to, created if needed.
+        The root_name attribute then includes this directory.
+        If None, the current directory is used.
+    metrics : Metrics() object, optional (default: None)
+        Metrics of processing stages. Can be shared with other
+        Input, Run and Output objects.
+        If None, a new Metrics() object is created.
+    profile : bool, optional (default: False)
+        If True, profile each stage with cProfile and write profiles
+        and a summary of hot functions in the "<root_name>-profile" directory.
+        Profiling is also enabled by setting the AUTOCLASSWRAPPER_PROFILE
+        environment variable to 1.
 
     Attributes
     ----------
     had_error : bool (defaut False)
         Set to True if an error has been found in the generation of AutoClass C
         input files.
+    metrics : Metrics() object
+        Wall time, CPU time, memory, rows and bytes of each stage.
+    profiler : Profiler() object
+        Profiler of stages, disabled by default.
     input_datasets : list of Dataset() objects
         List of all input Datasets.
     full_dataset : Dataset() object
         Final Dataset used by AutoClass C.
+        Empty on a cache hit.
+    cache : ArtifactCache() object (default: None)
+        Cache of prepared input files.
+    cache_key : string (default: None)
+        Key of prepared input files in cache.
+    cache_hit : bool (default: False)
+        Set to True if prepared input files were found in cache.
 
     """
 
@@ -84,15 +178,47 @@ class Input():
                  root_name="autoclass",
                  db2_separator_char="\t",
                  db2_missing_char="?",
-                 tolerate_error=False):
+                 tolerate_error=False,
+                 cache_dir=None,
+                 cache_max_entries=20,
+                 cache_max_size=None,
+                 tsv_compression=None,
+                 work_dir=None,
+                 metrics=None,
+                 profile=False):
         """Instantiate object."""
+        if work_dir is not None:
+            os.makedirs(work_dir, exist_ok=True)
+            root_name = os.path.join(work_dir, root_name)
         self.root_name = root_name
         self.db2_separator_char = db2_separator_char
         self.db2_missing_char = db2_missing_char
         self.tolerate_error = tolerate_error
         self.had_error = False
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.profiler = Profiler(
+            self.root_name + "-profile"
+            if profile or profiling_requested() else None)
         self.input_datasets = []
         self.full_dataset = Dataset("", "merged")
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = ArtifactCache(cache_dir,
+                                       max_entries=cache_max_entries,
+                                       max_size=cache_max_size)
+        self.cache_key = None
+        self.cache_hit = False
+        if (tsv_compression is not None
+                and tsv_compression not in COMPRESSION_EXTENSIONS):
+            raise ValueError(f"Unknown compression '{tsv_compression}'. "
+                             "Available: "
+                             f"{', '.join(COMPRESSION_EXTENSIONS)}")
+        self.tsv_compression = tsv_compression
+        self.tsv_extension = ".tsv" + \
+            COMPRESSION_EXTENSIONS.get(tsv_compression, "")
+        # files derived from input data only, reused on cache hit
+        self.cached_extensions = (".db2", self.tsv_extension,
+                                  ".hd2", ".model")
 
     def handle_error(f):
         """Handle error during data parsing and formating.
@@ -110,12 +236,16 @@ class Input():
         """
         def try_function(self, *args, **kwargs):
             if self.tolerate_error or not self.had_error:
-                try:
-                    return f(self, *args, **kwargs)
-                except Exception as e:
-                    for line in str(e).split('\n'):
-                        log.error(line)
-                    self.had_error = True
+                stage = f"{type(self).__name__}.{f.__name__}"
+                with self.metrics.measure(stage) as record, \
+                        self.profiler.profile(stage):
+                    try:
+                        return f(self, *args, **kwargs)
+                    except Exception as e:
+                        for line in str(e).split('\n'):
+                            log.error(line)
+                        self.had_error = True
+                        record["error"] = True
         try_function.__name__ = f.__name__
         try_function.__doc__ = f.__doc__
         return try_function
@@ -143,17 +273,102 @@ class Input():
         input_missing_char : string, optional (default: "")
             Character used to encode missing data in input file.
 
+        Notes
+        -----
+        If a cache is used, reading the data file is delayed
+        to prepare_input_data() and skipped on a cache hit.
+
         """
         dataset = Dataset(input_file,
                           input_type,
                           input_error,
                           input_separator_char,
                           input_missing_char)
-        dataset.read_datafile()
-        dataset.clean_column_names()
-        dataset.check_data_type()
+        if self.cache is None:
+            dataset.load()
+            self.metrics.count(rows=len(dataset.df.index),
+                               bytes=os.path.getsize(input_file))
+        self.input_datasets.append(dataset)
+
+    @handle_error
+    def add_dataframe(self,
+                      df,
+                      input_type,
+                      input_error=0.01):
+        """Append in-memory data to list of datasets.
+
+        Data go through the same checks as data read by add_input_data(),
+        without writing or reading any file.
+
+        Parameters
+        ----------
+        df : Pandas dataframe
+            Data, with one row per case and one column per attribute.
+            Row names are taken from the index.
+            Missing values are encoded as NaN or None.
+        input_type : string
+            Type of data contained in dataframe.
+            Either "real scalar", "real location" or "discrete"
+        input_error : float, optional (default: 0.01)
+            Input error value.
+
+        Notes
+        -----
+        Data are not copied: the dataset shares its values with `df`,
+        which is not modified. Column names are cleaned on a shallow copy.
+        Data are copied only when several datasets are merged.
+
+        If a cache is used, checking data is delayed
+        to prepare_input_data() and skipped on a cache hit.
+
+        """
+        dataset = Dataset(data_type=input_type,
+                          error=input_error,
+                          data=df)
+        if self.cache is None:
+            dataset.load()
+            self.metrics.count(rows=len(dataset.df.index))
         self.input_datasets.append(dataset)
 
+    @handle_error
+    def add_array(self,
+                  array,
+                  row_labels,
+                  col_labels,
+                  input_type,
+                  input_error=0.01,
+                  index_name=DEFAULT_INDEX_NAME):
+        """Append in-memory 2D array to list of datasets.
+
+        Parameters
+        ----------
+        array : 2D Numpy array
+            Data, with one row per case and one column per attribute.
+            Missing values are encoded as NaN (or None for object arrays).
+        row_labels : list of strings
+            Names of rows (cases).
+        col_labels : list of strings
+            Names of columns (attributes).
+        input_type : string
+            Type of data contained in array.
+            Either "real scalar", "real location" or "discrete"
+        input_error : float, optional (default: 0.01)
+            Input error value.
+        index_name : string, optional (default: "name")
+            Name of the column of row names in output files.
+
+        Notes
+        -----
+        The array is wrapped into a dataframe without copy.
+        See add_dataframe().
+
+        """
+        df = pd.DataFrame(array,
+                          index=pd.Index(row_labels, name=index_name),
+                          columns=col_labels,
+                          copy=False)
+        self.add_dataframe(df, input_type, input_error)
+
     @handle_error
     def prepare_input_data(self):
         """Prepare input data.
@@ -169,6 +384,16 @@ class Input():
         - missing data might appear
 
         """
+        if self.cache is not None:
+            self.cache_key = self.get_cache_key()
+            self.cache_hit = self.cache.contains(self.cache_key,
+                                                 self.cached_extensions)
+            if self.cache_hit:
+                log.info("Found prepared input data in cache "
+                         f"(entry {self.cache_key[:12]})")
+                return
+            for dataset in self.input_datasets:
+                dataset.load()
         if len(self.input_datasets) == 1:
             self.full_dataset = self.input_datasets[0]
         else:
@@ -183,35 +408,122 @@ class Input():
             self.full_dataset.df = pd.concat(df_lst, axis=1, join="outer")
         # check for identical column names
         raise_on_duplicates(self.full_dataset.df.columns)
+        self.metrics.count(rows=len(self.full_dataset.df.index))
 
         nrows, ncols = self.full_dataset.df.shape
         log.info(f"Final dataframe has {nrows} lines and {ncols+1} columns")
         self.full_dataset.search_missing_values()
 
+    def get_cache_key(self):
+        """Compute cache key of prepared input files.
+
+        Returns
+        -------
+        key : string
+            Digest of input data files content and parameters.
+
+        """
+        items = [self.db2_separator_char, self.db2_missing_char]
+        for dataset in self.input_datasets:
+            if dataset.data is not None:
+                digest = hash_dataframe(dataset.data)
+            else:
+                digest = hash_file(dataset.input_file)
+            items.append([digest,
+                          dataset.data_type,
+                          dataset.error,
+                          dataset.separator_char,
+                          dataset.missing_char])
+        return hash_items(items)
+
+    def reuse_cached_files(self, *extensions):
+        """Restore prepared input files from cache.
+
+        Otherwise, existing files are removed, even without cache,
+        so that new content never overwrites files hard-linked from cache
+        by a previous Input().
+
+        Parameters
+        ----------
+        extensions : strings
+            Extensions of files to restore.
+
+        Returns
+        -------
+        bool
+            True if files were restored from cache.
+
+        """
+        reuse = self.cache is not None and self.cache_hit
+        for ext in extensions:
+            name = self.root_name + ext
+            if reuse:
+                log.info(f"Reusing {name} file from cache")
+                self.cache.restore(self.cache_key, ext, name)
+            else:
+                unlink(name)
+        return reuse
+
+    def store_cached_files(self, *extensions):
+        """Store prepared input files in cache.
+
+        Parameters
+        ----------
+        extensions : strings
+            Extensions of files to store.
+
+        """
+        if self.cache is None or self.cache_key is None:
+            return
+        for ext in extensions:
+            self.cache.store(self.cache_key, self.root_name + ext, ext)
+
     @handle_error
-    def create_db2_file(self):
+    def create_db2_file(self, snapshot=False):
         """Create .db2 file (AutoClass C data).
 
         Also save all data into a .tsv file for later user.
+
+        Parameters
+        ----------
+        snapshot : bool, optional (default: False)
+            If True, also save all data into a binary .pkl file,
+            read faster than the .tsv file by Output().
+            A previous .pkl file is always removed.
+
         """
-        db2_name = self.root_name + ".db2"
-        tsv_name = self.root_name + ".tsv"
-        log.info(f"Writing {db2_name} file")
-        log.info("If any, missing values will be encoded"
-                 f" as '{self.db2_missing_char}'")
-        self.full_dataset.df.to_csv(db2_name,
-                                    header=False,
-                                    sep=self.db2_separator_char,
-                                    na_rep=self.db2_missing_char)
-        log.debug(f"Writing {tsv_name} file [for later use]")
-        self.full_dataset.df.to_csv(tsv_name,
-                                    header=True,
-                                    sep="\t",
-                                    na_rep="")
+        pkl_name = self.root_name + ".pkl"
+        unlink(pkl_name)
+        if not self.reuse_cached_files(".db2", self.tsv_extension):
+            db2_name = self.root_name + ".db2"
+            tsv_name = self.root_name + self.tsv_extension
+            log.info(f"Writing {db2_name} file")
+            log.info("If any, missing values will be encoded"
+                     f" as '{self.db2_missing_char}'")
+            self.full_dataset.df.to_csv(db2_name,
+                                        header=False,
+                                        sep=self.db2_separator_char,
+                                        na_rep=self.db2_missing_char)
+            log.debug(f"Writing {tsv_name} file [for later use]")
+            self.full_dataset.df.to_csv(tsv_name,
+                                        header=True,
+                                        sep="\t",
+                                        na_rep="",
+                                        compression=self.tsv_compression)
+            self.metrics.count(rows=len(self.full_dataset.df.index),
+                               bytes=os.path.getsize(db2_name)
+                               + os.path.getsize(tsv_name))
+            self.store_cached_files(".db2", self.tsv_extension)
+        # written last: the snapshot is never older than the .tsv file
+        if snapshot and self.full_dataset.df is not None:
+            log.debug(f"Writing {pkl_name} file [for later use]")
+            self.full_dataset.df.to_pickle(pkl_name)
 
     @handle_error
     def create_hd2_file(self):
         """Create .hd2 file (AutoClass C data descriptions)."""
+        if self.reuse_cached_files(".hd2"):
+            return
         log.info("Writing .hd2 file")
         hd2_name = self.root_name + ".hd2"
         column_names = self.full_dataset.df.columns
@@ -228,7 +540,7 @@ class Input():
                 meta = self.full_dataset.column_meta[name]
                 if meta["type"] == "real scalar":
                     # by default minimum value is set to 0.0
-                    assert self.full_dataset.df.min()[idx] >= 0.0, \
+                    assert self.full_dataset.df[name].min() >= 0.0, \
                            f"min value for {name} shoud be >= 0.0"
                     hd2.write(f'{idx+1} real scalar "{name}" '
                               f'zero_point 0.0 rel_error {meta["error"]}\n'
@@ -241,6 +553,7 @@ class Input():
                     hd2.write(f'{idx+1} discrete nominal "{name}" '
                               f'range {self.full_dataset.df[name].nunique()}\n'
                               )
+        self.store_cached_files(".hd2")
 
     @handle_error
     def create_model_file(self):
@@ -248,6 +561,8 @@ class Input():
 
         Choice of model based on data type and missing values
         """
+        if self.reuse_cached_files(".model"):
+            return
         log.info("Writing .model file")
         model_name = self.root_name + ".model"
         # available models:
@@ -285,6 +600,7 @@ class Input():
             if multinomial_values:
                 model.write("single_multinomial "
                             f"{' '.join(multinomial_values)}\n")
+        self.store_cached_files(".model")
 
     @handle_error
     def create_sparams_file(self,
@@ -353,12 +669,50 @@ class Input():
                 sparams.write(f"min_report_period = {max_duration*2}\n")
 
     @handle_error
-    def create_rparams_file(self):
-        """Create .r-params file (AutoClass C report parameters)."""
+    def create_rparams_file(self,
+                            report_type="all",
+                            xref_class_attributes=[0, 1, 2],
+                            max_class_probs=None):
+        """Create .r-params file (AutoClass C report parameters).
+
+        Parameters
+        ----------
+        report_type : string, optional (default: "all")
+            Reports generated by AutoClass C:
+
+            - "all": influence values, case and class cross-reference
+            - "xref_case": case cross-reference (.case-data-1) only,
+              i.e. class memberships needed by Output()
+            - "xref_class": class cross-reference (.class-data-1) only
+            - "influence_values": influence values (.influ-o-data-1) only
+
+            For more details, see AutoClass C documentation:
+            file reports-c.text
+        xref_class_attributes : list of int, optional (default: [0, 1, 2])
+            Attributes listed in class cross-reference report.
+        max_class_probs : int, optional (default: None)
+            Maximum number of class probabilities reported for each case.
+            If None, AutoClass C default (5) is used.
+
+        """
         log.info("Writing .r-params file")
+        if report_type not in REPORT_FILES:
+            raise ValueError(f"Unknown report type '{report_type}'. "
+                             f"Available: {', '.join(REPORT_FILES)}")
+        if ".case-data-1" not in REPORT_FILES[report_type]:
+            log.warning(f"Report type '{report_type}' does not include "
+                        "case data: results cannot be read by Output()")
         rparams_name = self.root_name + ".r-params"
         with open(rparams_name, "w") as rparams:
-            rparams.write('xref_class_report_att_list = 0, 1, 2 \n')
+            if report_type != "all":
+                rparams.write(f'report_type = "{report_type}" \n')
+            if ".class-data-1" in REPORT_FILES[report_type]:
+                att_list = ", ".join(str(att)
+                                     for att in xref_class_attributes)
+                rparams.write(f'xref_class_report_att_list = {att_list} \n')
+            if max_class_probs is not None:
+                rparams.write('max_num_xref_class_probs = '
+                              f'{max_class_probs} \n')
             rparams.write('report_mode = "data" \n')
             rparams.write('comment_data_headers_p = true \n')
 
@@ -405,12 +759,16 @@ class Dataset():
         Character used to separate columns of data in input file.
     missing_char : string, optional (default: "")
         Character used to encode missing data in input file.
+    data : Pandas dataframe, optional (default: None)
+        In-memory data. If given, input_file is not read.
 
 
     Attributes
     ----------
     input_file : string (defaut: "")
         Name of the file to read data from.
+    data : Pandas dataframe (default: None)
+        In-memory data, never modified.
     separator_char : string (defaut: "\t")
         Character used to separate columns of data in input file.
     df : Pandas dataframe (default: None)
@@ -428,13 +786,15 @@ class Dataset():
                  data_type="",
                  error=None,
                  separator_char="\t",
-                 missing_char=""):
+                 missing_char="",
+                 data=None):
         """Instantiate object."""
         self.input_file = input_file
         self.data_type = data_type
         self.error = error
         self.separator_char = separator_char
         self.missing_char = missing_char
+        self.data = data
         self.df = None
         self.column_meta = {}
         # verify data type
@@ -485,8 +845,35 @@ class Dataset():
                               header=0,
                               index_col=0,
                               encoding=encoding)
+        self.set_column_meta()
+
+    def read_dataframe(self):
+        """Use in-memory data as pandas dataframe.
+
+        Data are not copied. Column names are converted to strings
+        and an index without name is named "name".
+        """
+        msg = f"Reading in-memory data as '{self.data_type}'"
+        if self.data_type in ["real scalar", "real location"]:
+            msg += f" with error {self.error}"
+        log.info(msg)
+        if not isinstance(self.data, pd.DataFrame):
+            raise TypeError("In-memory data must be a pandas dataframe, "
+                            f"not {type(self.data).__name__}")
+        # shallow copy: names can change without modifying user data
+        self.df = self.data.copy(deep=False)
+        self.df.columns = self.df.columns.astype(str)
+        # check for duplicate column names
+        raise_on_duplicates(self.df.columns.tolist())
+        if self.df.index.name is None:
+            self.df.index.name = DEFAULT_INDEX_NAME
+        else:
+            self.df.index.name = str(self.df.index.name)
+        self.set_column_meta()
+
+    def set_column_meta(self):
+        """Save column meta data (data type, error, missing values)."""
         nrows, ncols = self.df.shape
-        # save column meta data (data type, error, missing values)
         for col in self.df.columns:
             meta = {"type": self.data_type,
                     "error": self.error,
@@ -494,6 +881,15 @@ class Dataset():
             self.column_meta[col] = meta
         log.info(f"Found {nrows} rows and {ncols+1} columns")
 
+    def load(self):
+        """Read, clean and check data file or in-memory data."""
+        if self.data is not None:
+            self.read_dataframe()
+        else:
+            self.read_datafile()
+        self.clean_column_names()
+        self.check_data_type()
+
     def clean_column_names(self):
         """Clean column names.
 
@@ -508,57 +904,104 @@ class Dataset():
         - `_` (underscore)
 
         Unauthorized characters are replaced by '_'
+
+        Raises
+        ------
+        DuplicateColumnNameError : exception
+            If cleaned column names are not unique.
+            Data are then left unchanged.
+
         """
         # regex = re.compile('[^A-Za-z0-9 ._+-]+')
         regex = re.compile("[^A-Za-z0-9._+-]+")
         log.debug("Checking column names")
+        renamed = []
         # check index column name first
-        col_name = self.df.index.name
-        col_name_new = regex.sub("_", col_name)
-        if col_name_new != col_name:
-            self.df.index.name = col_name_new
-            log.warning(f"Column '{col_name}' renamed to '{col_name_new}'")
-        # then other column names
-        for col_name in self.df.columns:
-            col_name_new = regex.sub("_", col_name)
-            if col_name_new != col_name:
-                self.df.rename(columns={col_name: col_name_new}, inplace=True)
-                log.warning(f"Column '{col_name}' renamed to '{col_name_new}'")
-                # update column meta data
-                self.column_meta[col_name_new] = self.column_meta.pop(col_name)
+        index_name = self.df.index.name
+        index_name_new = regex.sub("_", index_name)
+        if index_name_new != index_name:
+            renamed.append((index_name, index_name_new))
+        # then other column names, all at once
+        col_names = self.df.columns
+        col_names_new = col_names.str.replace(regex, "_", regex=True)
+        is_renamed = col_names != col_names_new
+        renamed += zip(col_names[is_renamed], col_names_new[is_renamed])
+        log_columns(logging.WARNING,
+                    [f"Column '{name}' renamed to '{name_new}'"
+                     for name, name_new in truncate_columns(renamed)],
+                    len(renamed))
+        # cleaning may create new duplicates
+        if is_renamed.any() and col_names_new.has_duplicates:
+            duplicates = col_names_new[col_names_new.duplicated(keep=False)]
+            clashes = {}
+            for name, name_new in zip(col_names, col_names_new):
+                if name_new in duplicates:
+                    clashes.setdefault(name_new, []).append(f"'{name}'")
+            lines = "\n".join(f"{' '.join(names)} -> '{name_new}'"
+                               for name_new, names in clashes.items())
+            raise DuplicateColumnNameError("Cleaned column names "
+                                           f"are not unique:\n{lines}\n"
+                                           "Please clean your header")
+        self.df.index.name = index_name_new
+        if is_renamed.any():
+            # single rename of columns and column meta data
+            self.df.columns = col_names_new
+            self.column_meta = {name_new: self.column_meta[name]
+                                for name, name_new
+                                in zip(col_names, col_names_new)}
         # print all columns names
-        log.debug("Index name '{}'".format(self.df.index.name))
-        for name in self.df.columns:
-            log.debug("Column name '{}'".format(name))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"Index name '{self.df.index.name}'")
+            for name in self.df.columns:
+                log.debug(f"Column name '{name}'")
 
     def check_data_type(self):
         """Check data type.
 
-        Cast 'real scalar' and 'real location' to float64
+        Verify 'real scalar' and 'real location' columns can be cast
+        to float64.
+
+        Statistics of columns are computed and logged as a single table,
+        only if INFO level is enabled.
         """
         log.info("Checking data format")
-        for col in self.df.columns:
-            if self.column_meta[col]["type"] in ["real scalar",
-                                                 "real location"]:
-                try:
-                    self.df[col].astype("float64")
-                    stats = (f"Column '{col}'\n"
-                             + self.df[col]
-                                   .describe(percentiles=[])
-                                   .to_string()
-                             )
-                    for line in stats.split("\n"):
-                        log.info(line)
-                    log.info("---")
-                except Exception as e:
-                    raise CastFloat64Error(
-                        f"Cannot cast column '{col}' to float\n"
-                        f"{str(e)}\n"
-                        "Check your input file!")
-            if self.column_meta[col]['type'] == "discrete":
-                log.info(f"Column '{col}': "
-                         f"{self.df[col].nunique()} different values"
-                         )
+        real_columns = [col for col in self.df.columns
+                        if self.column_meta[col]["type"]
+                        in ["real scalar", "real location"]]
+        discrete_columns = [col for col in self.df.columns
+                            if self.column_meta[col]["type"] == "discrete"]
+        # numeric columns are already valid
+        dtypes = self.df.dtypes
+        for col in real_columns:
+            if pd.api.types.is_numeric_dtype(dtypes[col]):
+                continue
+            try:
+                self.df[col].astype("float64")
+            except Exception as e:
+                raise CastFloat64Error(
+                    f"Cannot cast column '{col}' to float\n"
+                    f"{str(e)}\n"
+                    "Check your input file!")
+        if real_columns and log.isEnabledFor(logging.INFO):
+            shown = truncate_columns(real_columns)
+            values = self.df[shown].astype("float64")
+            stats = pd.DataFrame({"count": values.count(),
+                                  "mean": values.mean(),
+                                  "std": values.std(),
+                                  "min": values.min(),
+                                  "50%": values.median(),
+                                  "max": values.max()})
+            stats.index = [f"Column '{col}'" for col in shown]
+            log.info("Statistics of real values:")
+            log_columns(logging.INFO, stats.to_string().split("\n"),
+                        len(real_columns) + 1)
+        if discrete_columns and log.isEnabledFor(logging.INFO):
+            shown = truncate_columns(discrete_columns)
+            counts = self.df[shown].nunique()
+            log_columns(logging.INFO,
+                        [f"Column '{col}': {count} different values"
+                         for col, count in counts.items()],
+                        len(discrete_columns))
 
     def search_missing_values(self):
         """Search for missing values."""
@@ -567,6 +1010,9 @@ class Dataset():
         if columns_with_missing:
             for col in columns_with_missing:
                 self.column_meta[col]["missing"] = True
-                log.warning(f"Missing values found in column: {col}")
+            log_columns(logging.WARNING,
+                        [f"Missing values found in column: {col}"
+                         for col in truncate_columns(columns_with_missing)],
+                        len(columns_with_missing))
         else:
             log.info("No missing values found")
@@ -0,0 +1,518 @@
+"""autoclasswrapper: Python wrapper for AutoClass C classification.
+
+Local queue of AutoClass C runs with CPU and memory limits
+"""
+
+import collections
+import logging
+import os
+import shutil
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+log = logging.getLogger(__name__)
+
+# states of runs in queue
+JOB_STATES = ("queued", "running", "done", "error", "cancelled")
+
+
+def get_available_cpus():
+    """Get CPU cores available to the current process.
+
+    Returns
+    -------
+    cpus : list of int
+        Identifiers of CPU cores.
+
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def get_available_memory():
+    """Get memory available for new processes.
+
+    Returns
+    -------
+    memory : int or None
+        MemAvailable from /proc/meminfo, or total physical memory
+        if not available, in bytes. None if unknown.
+
+    """
+    try:
+        with open("/proc/meminfo", "r") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def make_limits_command(memory_limit, niceness, cpus):
+    """Build command prefix that sets resource limits of a process.
+
+    Limits are set by prlimit, nice and taskset (util-linux and
+    coreutils). Limits whose command is not available are skipped.
+
+    Parameters
+    ----------
+    memory_limit : int or None
+        Maximum address space (RLIMIT_AS), in bytes.
+        Capped to the current hard limit. None means no limit.
+    niceness : int
+        Increment of niceness.
+    cpus : list of int or None
+        CPU cores the process may run on. None means all cores.
+
+    Returns
+    -------
+    command : list of strings
+        Command prefix, see Run.run().
+
+    """
+    command = []
+    if memory_limit is not None and resource is not None:
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        limit = memory_limit
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        command += get_limit_command("prlimit", f"--as={limit}")
+    if niceness:
+        command += get_limit_command("nice", "-n", str(niceness))
+    if cpus:
+        command += get_limit_command("taskset", "-c",
+                                     ",".join(str(cpu) for cpu in cpus))
+    return command
+
+
+def get_limit_command(name, *args):
+    """Build command that sets a resource limit, if available.
+
+    Parameters
+    ----------
+    name : string
+        Name of command.
+    args : strings
+        Arguments of command.
+
+    Returns
+    -------
+    command : list of strings
+        Command and arguments, empty if the command is not in PATH.
+
+    """
+    if shutil.which(name) is None:
+        log.warning(f"Cannot find {name} in PATH, limit not applied")
+        return []
+    return [name, *args]
+
+
+class RunJob():
+    """AutoClass C run submitted to a RunQueue().
+
+    Parameters
+    ----------
+    run : Run() object
+        Run, with run file already created.
+    tag : string
+        Tag to identify the autoclass run among other processes.
+    memory : int
+        Memory reserved for the run, in bytes.
+    cpus : int
+        Number of CPU cores reserved for the run.
+
+    Attributes
+    ----------
+    state : string
+        "queued", "running", "done", "error" or "cancelled".
+    cpu_ids : list of int
+        CPU cores the run is bound to.
+    submit_time, start_time, end_time : float or None
+        Times of submission, start and end (time.monotonic()).
+    returncode : int or None
+        Exit status of the run script.
+
+    """
+
+    def __init__(self, run, tag, memory, cpus):
+        """Instantiate object."""
+        self.run = run
+        self.tag = tag
+        self.memory = memory
+        self.cpus = cpus
+        self.state = "queued"
+        self.cpu_ids = []
+        self.submit_time = time.monotonic()
+        self.start_time = None
+        self.end_time = None
+        self.returncode = None
+        self.finished = threading.Event()
+
+    @property
+    def wait_time(self):
+        """Time spent in queue before start, in seconds."""
+        end = self.start_time
+        if end is None:
+            end = self.end_time if self.end_time is not None \
+                else time.monotonic()
+        return end - self.submit_time
+
+    @property
+    def run_time(self):
+        """Time spent running, in seconds (None if not started)."""
+        if self.start_time is None:
+            return None
+        end = self.end_time if self.end_time is not None \
+            else time.monotonic()
+        return end - self.start_time
+
+    def wait(self, timeout=None):
+        """Wait for the end of the run.
+
+        Parameters
+        ----------
+        timeout : float, optional (default: None)
+            Maximum time to wait, in seconds.
+
+        Returns
+        -------
+        bool
+            True if the run ended.
+
+        """
+        return self.finished.wait(timeout)
+
+
+class RunQueue():
+    """Local queue of AutoClass C runs with CPU and memory limits.
+
+    Runs are started in submission order, as soon as enough CPU cores
+    and memory are available. Memory of each run is estimated
+    with Run.estimate_memory(). A run larger than max_memory is started
+    alone. Each run is bound to its CPU cores, reniced and its address
+    space is limited (RLIMIT_AS).
+
+    Parameters
+    ----------
+    max_cpus : int, optional (default: None)
+        Number of CPU cores used by runs.
+        If None, all cores available to the current process are used.
+    max_memory : int, optional (default: None)
+        Memory used by runs, in bytes.
+        If None, memory available when the queue is created is used.
+    cpus_per_run : int, optional (default: 1)
+        Number of CPU cores reserved for each run.
+        AutoClass C uses a single core.
+    niceness : int, optional (default: 10)
+        Increment of niceness of runs. 0 keeps the current niceness.
+    memory_limit_factor : float or None, optional (default: 2.0)
+        Address space limit of each run, relative to its estimated memory.
+        If None, address space is not limited.
+    poll_interval : float, optional (default: 1.0)
+        Interval between checks of running runs, in seconds.
+
+    Attributes
+    ----------
+    jobs : list of RunJob() objects
+        All submitted runs.
+
+    """
+
+    def __init__(self,
+                 max_cpus=None,
+                 max_memory=None,
+                 cpus_per_run=1,
+                 niceness=10,
+                 memory_limit_factor=2.0,
+                 poll_interval=1.0):
+        """Instantiate object."""
+        cpus = get_available_cpus()
+        if max_cpus is not None:
+            cpus = cpus[:max_cpus]
+        if cpus_per_run > len(cpus):
+            raise ValueError(f"Cannot reserve {cpus_per_run} CPU cores "
+                             f"per run with {len(cpus)} CPU cores")
+        self.free_cpus = cpus
+        self.max_memory = max_memory if max_memory is not None \
+            else get_available_memory()
+        self.used_memory = 0
+        self.cpus_per_run = cpus_per_run
+        self.niceness = niceness
+        self.memory_limit_factor = memory_limit_factor
+        self.poll_interval = poll_interval
+        self.jobs = []
+        self.queued = collections.deque()
+        self.running = []
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def __enter__(self):
+        """Enter context: return queue."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Exit context: wait for all runs."""
+        self.shutdown(wait=True)
+
+    @property
+    def depth(self):
+        """Number of runs waiting in queue."""
+        return len(self.queued)
+
+    def submit(self, run, tag="", memory=None):
+        """Submit an AutoClass C run.
+
+        Parameters
+        ----------
+        run : Run() object
+            Run, with run file already created.
+        tag : string (default: ""), optional
+            Tag to identify the autoclass run among other processes.
+        memory : int, optional (default: None)
+            Memory reserved for the run, in bytes.
+            If None, memory is estimated with Run.estimate_memory().
+
+        Returns
+        -------
+        job : RunJob() object
+            Submitted run.
+
+        """
+        if memory is None:
+            memory = run.estimate_memory()
+        job = RunJob(run, tag, memory, self.cpus_per_run)
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Cannot submit run to a closed queue")
+            self.jobs.append(job)
+            self.queued.append(job)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.schedule,
+                                               name="autoclass-queue",
+                                               daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+            log.info(f"Queued run {run.root_name} (estimated memory "
+                     f"{memory / 1024**2:.0f} MiB, "
+                     f"{self.depth} runs waiting)")
+        return job
+
+    def can_start(self, job):
+        """Verify resources are available to start a run.
+
+        Parameters
+        ----------
+        job : RunJob() object
+            Run to start.
+
+        Returns
+        -------
+        bool
+            True if the run can start.
+
+        """
+        if len(self.free_cpus) < job.cpus:
+            return False
+        if not self.running or self.max_memory is None:
+            return True
+        return self.used_memory + job.memory <= self.max_memory
+
+    def schedule(self):
+        """Start queued runs when resources are available.
+
+        Runs in a background thread until the queue is shut down.
+        Runs are started without holding the lock of the queue.
+        """
+        with self.condition:
+            while True:
+                self.check_running()
+                starting = []
+                while self.queued and self.can_start(self.queued[0]):
+                    job = self.queued.popleft()
+                    self.reserve(job)
+                    starting.append(job)
+                if starting:
+                    self.condition.release()
+                    try:
+                        for job in starting:
+                            self.start(job)
+                    finally:
+                        self.condition.acquire()
+                    for job in starting:
+                        if (job.run.process is None
+                                and job.run.future is None):
+                            # cache hit or error: nothing is running
+                            self.finish(job, None)
+                    continue
+                if not self.queued and not self.running:
+                    if self.closed:
+                        return
+                    self.condition.wait()
+                else:
+                    self.condition.wait(self.poll_interval)
+
+    def reserve(self, job):
+        """Reserve resources of a run.
+
+        Parameters
+        ----------
+        job : RunJob() object
+            Run to start.
+
+        """
+        job.cpu_ids = self.free_cpus[:job.cpus]
+        del self.free_cpus[:job.cpus]
+        self.used_memory += job.memory
+        job.start_time = time.monotonic()
+        job.state = "running"
+        self.running.append(job)
+
+    def start(self, job):
+        """Start a run with its resource limits.
+
+        Called without holding the lock of the queue.
+        Errors are logged and the run is marked as failed.
+
+        Parameters
+        ----------
+        job : RunJob() object
+            Run to start, with resources reserved.
+
+        """
+        memory_limit = None
+        if self.memory_limit_factor is not None:
+            memory_limit = int(job.memory * self.memory_limit_factor)
+        log.info(f"Starting run {job.run.root_name} on CPU cores "
+                 f"{job.cpu_ids} after {job.wait_time:.1f} s in queue")
+        try:
+            job.run.run(job.tag,
+                        command_prefix=make_limits_command(memory_limit,
+                                                           self.niceness,
+                                                           job.cpu_ids))
+        except Exception as e:
+            log.error(f"Cannot start run {job.run.root_name}: {e}")
+            job.run.had_error = True
+            job.run.process = None
+            job.run.future = None
+
+    def check_running(self):
+        """Release resources of finished runs."""
+        for job in list(self.running):
+            if job.run.future is not None:
+                # run submitted to an executor
+                if job.run.future.done():
+                    returncode = None
+                    if job.run.future.exception() is None:
+                        returncode = job.run.future.result()
+                    else:
+                        job.run.had_error = True
+                    self.finish(job, returncode)
+                continue
+            returncode = job.run.process.poll()
+            if returncode is not None:
+                self.finish(job, returncode)
+
+    def finish(self, job, returncode):
+        """Release resources of a run.
+
+        Parameters
+        ----------
+        job : RunJob() object
+            Finished run.
+        returncode : int or None
+            Exit status of the run script, None if no script was run.
+
+        """
+        self.running.remove(job)
+        self.free_cpus = sorted(self.free_cpus + job.cpu_ids)
+        self.used_memory -= job.memory
+        job.end_time = time.monotonic()
+        job.returncode = returncode
+        failed = (job.run.had_error
+                  or (returncode is None and not job.run.cache_hit)
+                  or (returncode is not None and returncode != 0))
+        job.state = "error" if failed else "done"
+        job.finished.set()
+        log.info(f"Run {job.run.root_name} ended ({job.state}) "
+                 f"after {job.run_time:.1f} s")
+        self.condition.notify_all()
+
+    def get_stats(self):
+        """Get statistics of queue.
+
+        Returns
+        -------
+        stats : dict
+            Number of runs by state ("queued", "running"...),
+            free CPU cores ("free_cpus"), free memory ("free_memory",
+            None if unknown), mean and maximum wait times of all runs
+            ("mean_wait_time" and "max_wait_time", in seconds).
+
+        """
+        with self.condition:
+            stats = {state: 0 for state in JOB_STATES}
+            for job in self.jobs:
+                stats[job.state] += 1
+            stats["free_cpus"] = len(self.free_cpus)
+            stats["free_memory"] = None
+            if self.max_memory is not None:
+                stats["free_memory"] = self.max_memory - self.used_memory
+            wait_times = [job.wait_time for job in self.jobs]
+        stats["mean_wait_time"] = (sum(wait_times) / len(wait_times)
+                                   if wait_times else 0.0)
+        stats["max_wait_time"] = max(wait_times, default=0.0)
+        return stats
+
+    def wait(self, timeout=None):
+        """Wait for the end of all submitted runs.
+
+        Parameters
+        ----------
+        timeout : float, optional (default: None)
+            Maximum time to wait, in seconds.
+
+        Returns
+        -------
+        bool
+            True if all runs ended.
+
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.queued and not self.running, timeout)
+
+    def shutdown(self, wait=True, cancel=False):
+        """Stop accepting runs.
+
+        Parameters
+        ----------
+        wait : bool, optional (default: True)
+            If True, wait for the end of all runs.
+        cancel : bool, optional (default: False)
+            If True, runs waiting in queue are cancelled.
+            Running runs are not stopped.
+
+        """
+        with self.condition:
+            self.closed = True
+            if cancel:
+                while self.queued:
+                    job = self.queued.popleft()
+                    job.state = "cancelled"
+                    job.end_time = time.monotonic()
+                    job.finished.set()
+            self.condition.notify_all()
+        if wait:
+            self.wait()
@@ -0,0 +1,241 @@
+"""autoclasswrapper: Python wrapper for AutoClass C classification.
+
+Timing and memory metrics of processing stages
+"""
+
+import contextlib
+import datetime
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+log = logging.getLogger(__name__)
+
+# Prometheus metric name, help and record field of each stage metric
+PROMETHEUS_METRICS = (
+    ("wall_seconds", "Wall time of stage", "wall_time"),
+    ("cpu_seconds", "CPU time of stage", "cpu_time"),
+    ("peak_rss_delta_bytes", "Increase of peak resident memory during stage",
+     "peak_rss_delta"),
+    ("rows", "Rows processed by stage", "rows"),
+    ("bytes", "Bytes read or written by stage", "bytes"),
+    ("error", "1 if stage failed", "error"),
+)
+
+
+def get_peak_rss():
+    """Get peak resident set size of current process.
+
+    Returns
+    -------
+    peak_rss : int or None
+        Peak resident memory in bytes.
+        None if not available on this platform.
+
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+    return peak_rss
+
+
+class Metrics():
+    """Metrics of processing stages.
+
+    A record is added for each stage (i.e. each method decorated by
+    handle_error() in Input, Run and Output) with:
+
+    - stage: name of stage, like "Input.create_db2_file"
+    - start: start date (ISO format)
+    - wall_time: wall time (seconds)
+    - cpu_time: CPU time of current process (seconds)
+    - peak_rss_delta: increase of peak resident memory (bytes).
+      0 if the stage did not use more memory than previous stages.
+    - rows: number of rows processed, if relevant
+    - bytes: number of bytes read or written, if relevant
+    - error: True if the stage failed
+
+    The same Metrics object can be shared by Input, Run and Output
+    objects to collect metrics of a whole classification.
+    It can also be shared across threads: running stages are tracked
+    per thread, so that count() applies to the stage of the calling thread.
+
+    Parameters
+    ----------
+    callback : function, optional (default: None)
+        Function called with the record (dict) of each finished stage.
+    prometheus_file : string, optional (default: None)
+        File rewritten after each stage with metrics of last run
+        of all stages, in Prometheus text format
+        (for the node exporter textfile collector for instance).
+
+    Attributes
+    ----------
+    records : list of dict
+        Records of finished stages.
+
+    """
+
+    def __init__(self, callback=None, prometheus_file=None):
+        """Instantiate object."""
+        self.callback = callback
+        self.prometheus_file = prometheus_file
+        self.records = []
+        self.local = threading.local()
+
+    @property
+    def running(self):
+        """Records of stages running in the calling thread."""
+        if not hasattr(self.local, "running"):
+            self.local.running = []
+        return self.local.running
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        """Measure a stage.
+
+        Parameters
+        ----------
+        stage : string
+            Name of stage.
+
+        Yields
+        ------
+        record : dict
+            Record of stage, finalized when the stage ends.
+
+        """
+        record = {"stage": stage,
+                  "start": datetime.datetime.now().isoformat(),
+                  "wall_time": None,
+                  "cpu_time": None,
+                  "peak_rss_delta": None,
+                  "rows": None,
+                  "bytes": None,
+                  "error": False}
+        peak_rss = get_peak_rss()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        self.running.append(record)
+        try:
+            yield record
+        except Exception:
+            record["error"] = True
+            raise
+        finally:
+            self.running.pop()
+            record["wall_time"] = time.perf_counter() - start_wall
+            record["cpu_time"] = time.process_time() - start_cpu
+            if peak_rss is not None:
+                record["peak_rss_delta"] = get_peak_rss() - peak_rss
+            self.records.append(record)
+            self.publish(record)
+
+    def count(self, rows=None, bytes=None):
+        """Set rows and bytes processed by the running stage.
+
+        Parameters
+        ----------
+        rows : int, optional (default: None)
+            Number of rows processed.
+        bytes : int, optional (default: None)
+            Number of bytes read or written.
+
+        """
+        if not self.running:
+            return
+        if rows is not None:
+            self.running[-1]["rows"] = int(rows)
+        if bytes is not None:
+            self.running[-1]["bytes"] = int(bytes)
+
+    def publish(self, record):
+        """Send record to callback and Prometheus file.
+
+        Errors are logged and do not interrupt processing.
+
+        Parameters
+        ----------
+        record : dict
+            Record of finished stage.
+
+        """
+        try:
+            if self.callback is not None:
+                self.callback(record)
+            if self.prometheus_file is not None:
+                self.write_prometheus(self.prometheus_file)
+        except Exception as e:
+            log.warning(f"Cannot publish metrics: {e}")
+
+    def to_json(self, filename=None):
+        """Export records as JSON.
+
+        Parameters
+        ----------
+        filename : string, optional (default: None)
+            Name of JSON file to write.
+
+        Returns
+        -------
+        content : string
+            Records in JSON format.
+
+        """
+        content = json.dumps(self.records, indent=2)
+        if filename is not None:
+            with open(filename, "w") as json_file:
+                json_file.write(content)
+        return content
+
+    def to_prometheus(self):
+        """Format metrics of last run of each stage in Prometheus format.
+
+        Returns
+        -------
+        content : string
+            Metrics in Prometheus text format.
+
+        """
+        last_records = {}
+        for record in self.records:
+            last_records[record["stage"]] = record
+        lines = []
+        for name, description, field in PROMETHEUS_METRICS:
+            name = f"autoclasswrapper_stage_{name}"
+            lines.append(f"# HELP {name} {description}.")
+            lines.append(f"# TYPE {name} gauge")
+            for stage, record in last_records.items():
+                if record[field] is not None:
+                    lines.append(f'{name}{{stage="{stage}"}} '
+                                 f"{float(record[field])}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, filename):
+        """Write metrics in Prometheus text format.
+
+        File is written then renamed, so that readers never see
+        partial content.
+
+        Parameters
+        ----------
+        filename : string
+            Name of file.
+
+        """
+        tmp_name = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_name, "w") as prom_file:
+            prom_file.write(self.to_prometheus())
+        os.replace(tmp_name, filename)
@@ -3,18 +3,424 @@
 Prepare output files and results
 """
 
+import concurrent.futures
+import contextlib
 import datetime
+import glob
+import importlib.util
 import logging
+import mmap
 import os
+import re
+import tarfile
+import warnings
 import zipfile
 
 import numpy as np
 import pandas as pd
 import scipy.cluster.hierarchy as hierarchy
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .input import Dataset, Input
+from .metrics import Metrics
+from .profiling import Profiler, profiling_requested
+from .tools import (COMPRESSION_EXTENSIONS, INTERIM_ROOT_SUFFIX, REPORT_FILES,
+                    find_file, import_zstandard, open_text, read_report_type)
 
 log = logging.getLogger(__name__)
 
+# file formats of aggregate_input_data()
+AGGREGATE_FORMATS = ("tsv", "pickle", None)
+# columnar formats of export(): file extension and required module
+EXPORT_FORMATS = {"parquet": (".parquet", "pyarrow"),
+                  "feather": (".feather", "pyarrow"),
+                  "hdf5": (".h5", "tables")}
+# minimal size (in bytes) of .case-data-1 file parsed in parallel
+PARALLEL_PARSING_MIN_SIZE = 32 * 1024**2
+# archive formats of write_archive()
+ARCHIVE_FORMATS = ("tar.gz", "tar.zst", "zip")
+# optional statistics of write_class_stats()
+EXTRA_CLASS_STATS = ("median", "min", "max", "weighted-mean")
+# image formats of write_dendrogram()
+DENDROGRAM_FORMATS = ("png", "svg", "pdf")
+# dimension reduction methods of write_dendrogram()
+DENDROGRAM_REDUCTIONS = ("pca", "random")
+
+
+def reduce_dimension(data, method, n_components, random_state=0):
+    """Reduce number of columns of a matrix.
+
+    Parameters
+    ----------
+    data : Numpy array
+        Matrix with one row per observation.
+    method : string
+        Either "pca" (principal component analysis)
+        or "random" (gaussian random projection).
+    n_components : int
+        Number of columns to keep.
+    random_state : int, optional (default: 0)
+        Seed of random projection.
+
+    Returns
+    -------
+    reduced : Numpy array
+        Matrix with n_components columns (or less).
+
+    """
+    if data.shape[1] <= n_components:
+        return data
+    if method == "pca":
+        # the rank of centered data is lower than the number of rows:
+        # the SVD is cheap and distances are kept for
+        # n_components >= number of rows - 1
+        centered = data - data.mean(axis=0)
+        left, singular, _ = np.linalg.svd(centered, full_matrices=False)
+        return left[:, :n_components] * singular[:n_components]
+    if method == "random":
+        rng = np.random.default_rng(random_state)
+        projection = rng.normal(size=(data.shape[1], n_components))
+        return data @ projection / np.sqrt(n_components)
+    raise ValueError(f"Unknown dimension reduction '{method}'. "
+                     f"Available: {', '.join(DENDROGRAM_REDUCTIONS)}")
+
+
+def weighted_ward_linkage(data, weights):
+    """Ward hierarchical clustering of weighted observations.
+
+    Each observation is a centroid standing for 'weight' points.
+    With unit weights, results are identical to
+    scipy.cluster.hierarchy.linkage(data, "ward").
+
+    Parameters
+    ----------
+    data : Numpy array
+        Matrix with one row per observation.
+    weights : Numpy array
+        Weight of each observation.
+
+    Returns
+    -------
+    Z : Numpy array
+        Linkage matrix, in scipy format.
+
+    """
+    data = np.asarray(data, dtype=float)
+    n_obs = data.shape[0]
+    centroids = data.copy()
+    weights = np.asarray(weights, dtype=float).copy()
+    cluster_ids = np.arange(n_obs)
+    leaf_counts = np.ones(n_obs)
+    active = np.ones(n_obs, dtype=bool)
+    # ward distance between clusters a and b:
+    # sqrt(2 * wa * wb / (wa + wb)) * ||ca - cb||
+    norms = (centroids ** 2).sum(axis=1)
+    sq_dist = np.maximum(norms[:, None] + norms[None, :]
+                         - 2 * centroids @ centroids.T, 0.0)
+    cost = 2 * np.outer(weights, weights) \
+        / (weights[:, None] + weights[None, :]) * sq_dist
+    np.fill_diagonal(cost, np.inf)
+    Z = np.zeros((n_obs - 1, 4))
+    for step in range(n_obs - 1):
+        i, j = sorted(np.unravel_index(np.argmin(cost), cost.shape))
+        Z[step] = [min(cluster_ids[i], cluster_ids[j]),
+                   max(cluster_ids[i], cluster_ids[j]),
+                   np.sqrt(cost[i, j]),
+                   leaf_counts[i] + leaf_counts[j]]
+        # merge cluster j into cluster i
+        total = weights[i] + weights[j]
+        centroids[i] = (weights[i] * centroids[i]
+                        + weights[j] * centroids[j]) / total
+        weights[i] = total
+        leaf_counts[i] += leaf_counts[j]
+        cluster_ids[i] = n_obs + step
+        active[j] = False
+        sq_dist_i = ((centroids - centroids[i]) ** 2).sum(axis=1)
+        cost_i = 2 * weights * total / (weights + total) * sq_dist_i
+        cost_i[~active] = np.inf
+        cost_i[i] = np.inf
+        cost[i, :] = cost_i
+        cost[:, i] = cost_i
+        cost[j, :] = np.inf
+        cost[:, j] = np.inf
+    return Z
+
+
+def read_case_file(case_name):
+    """Read content of .case-data-1 file.
+
+    Uncompressed files are memory-mapped.
+
+    Parameters
+    ----------
+    case_name : string
+        Name of file, possibly compressed.
+
+    Returns
+    -------
+    buffer : bytes-like object
+        File content.
+
+    """
+    if case_name.endswith(tuple(COMPRESSION_EXTENSIONS.values())):
+        with open_text(case_name) as case_file:
+            return case_file.read().encode("utf8")
+    with open(case_name, "rb") as case_file:
+        if os.fstat(case_file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(case_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def split_case_file(case_name, n_chunks):
+    """Split file into byte ranges aligned on line boundaries.
+
+    Parameters
+    ----------
+    case_name : string
+        Name of uncompressed file.
+    n_chunks : int
+        Number of ranges.
+
+    Returns
+    -------
+    ranges : list of tuples
+        (start, end) byte offsets of ranges.
+
+    """
+    with open(case_name, "rb") as case_file, \
+            mmap.mmap(case_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        bounds = [0]
+        for idx in range(1, n_chunks):
+            newline = mm.find(b"\n", max(bounds[-1], idx * size // n_chunks))
+            if newline == -1:
+                break
+            bounds.append(newline + 1)
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:])
+            if start < end]
+
+
+def parse_case_range(case_name, start, end):
+    """Parse a byte range of an AutoClass C case data file.
+
+    Used by worker processes: the file is memory-mapped again
+    so that data are not sent between processes.
+
+    Parameters
+    ----------
+    case_name : string
+        Name of uncompressed file.
+    start, end : int
+        Byte offsets of range, aligned on line boundaries.
+
+    Returns
+    -------
+    Parsed case data, see parse_case_data().
+
+    """
+    with open(case_name, "rb") as case_file, \
+            mmap.mmap(case_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return parse_case_data(view[start:end])
+
+
+def parse_case_file_parallel(case_name, n_jobs):
+    """Parse AutoClass C case data file with several processes.
+
+    Parameters
+    ----------
+    case_name : string
+        Name of uncompressed file.
+    n_jobs : int
+        Number of processes.
+
+    Returns
+    -------
+    Parsed case data, see parse_case_data().
+
+    """
+    ranges = split_case_file(case_name, n_jobs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs) \
+            as executor:
+        futures = [executor.submit(parse_case_range, case_name, start, end)
+                   for start, end in ranges]
+        chunks = [future.result() for future in futures]
+    # line indexes are relative to each chunk
+    line_offsets = np.cumsum([0] + [chunk[0].size for chunk in chunks[:-1]])
+    return (np.concatenate([chunk[0] for chunk in chunks]),
+            np.concatenate([chunk[1] + offset
+                            for chunk, offset in zip(chunks, line_offsets)]),
+            np.concatenate([chunk[2] for chunk in chunks]),
+            np.concatenate([chunk[3] for chunk in chunks]))
+
+
+def parse_case_data(buffer):
+    """Parse AutoClass C case data.
+
+    Data lines contain a case number followed by (class, probability)
+    pairs, the most probable class first. Other lines (comments and
+    headers) are skipped. All lines are processed in bulk with Numpy.
+
+    Parameters
+    ----------
+    buffer : bytes-like object
+        Content of .case-data-1 file.
+
+    Returns
+    -------
+    cases : Numpy array of int
+        Case number of each data line.
+    pair_lines : Numpy array of int
+        Index of data line of each (class, probability) pair.
+    pair_classes : Numpy array of int
+        Class of each pair (AutoClass C numbering, first class is 0).
+    pair_probas : Numpy array of float
+        Probability of each pair.
+
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    # find lines boundaries
+    newlines = np.flatnonzero(data == ord("\n"))
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [data.size]))
+    not_empty = starts < ends
+    starts = starts[not_empty]
+    ends = ends[not_empty]
+    # data lines start with a case number
+    first_chars = data[starts]
+    is_data = (first_chars >= ord("0")) & (first_chars <= ord("9"))
+    starts = starts[is_data]
+    ends = ends[is_data]
+    # blank out other lines
+    # (starts and ends of data lines are all distinct)
+    in_data = np.zeros(data.size + 1, dtype=np.int8)
+    in_data[starts] = 1
+    in_data[ends] = -1
+    in_data = np.cumsum(in_data[:-1], dtype=np.int8) > 0
+    text = np.where(in_data, data, ord(" ")).astype(np.uint8)
+    # count tokens per line
+    space_table = np.zeros(256, dtype=bool)
+    space_table[list(b" \t\r\n\v\f")] = True
+    is_space = space_table[text]
+    token_starts = np.flatnonzero(~is_space
+                                  & np.concatenate(([True], is_space[:-1])))
+    token_lines = np.searchsorted(starts, token_starts, side="right") - 1
+    counts = np.bincount(token_lines, minlength=starts.size)
+    bad_lines = np.flatnonzero((counts < 3) | (counts % 2 == 0))
+    if bad_lines.size:
+        line = bytes(data[starts[bad_lines[0]]:ends[bad_lines[0]]])
+        raise ValueError("Need case#, class and prob in line:\n"
+                         f"{line.decode('utf8', 'replace').rstrip()}")
+    try:
+        with warnings.catch_warnings():
+            # partial parsing is reported with a warning
+            warnings.simplefilter("error")
+            tokens = np.fromstring(text.tobytes(), dtype=float, sep=" ")
+    except (ValueError, DeprecationWarning):
+        tokens = np.empty(0)
+    if tokens.size != counts.sum():
+        raise ValueError("Cannot parse case data: non-numeric values found")
+    # first token of each line is the case number,
+    # then come (class, probability) pairs
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    cases = tokens[offsets].astype(int)
+    is_pair = np.ones(tokens.size, dtype=bool)
+    is_pair[offsets] = False
+    pairs = tokens[is_pair].reshape(-1, 2)
+    pair_lines = np.repeat(np.arange(starts.size), (counts - 1) // 2)
+    return cases, pair_lines, pairs[:, 0].astype(int), pairs[:, 1]
+
+
+def build_case_stats(cases, pair_lines, pair_classes, pair_probas):
+    """Build dataframe of classes and probabilities for all cases.
+
+    Parameters
+    ----------
+    cases, pair_lines, pair_classes, pair_probas : Numpy arrays
+        Parsed case data, see parse_case_data().
+
+    Returns
+    -------
+    stats : Pandas dataframe
+        Main class and probability for all classes, indexed by case
+        number (first case is 1). Classes are numbered from 1.
+    class_number : int
+        Number of classes that are the main class of at least one case.
+
+    """
+    case_number = cases.size
+    if np.any((cases < 1) | (cases > case_number)):
+        raise ValueError(f"Case numbers should range from 1 to {case_number}")
+    rows = cases - 1
+    class_ids = pair_classes + 1
+    # first pair of each line is the most probable class
+    is_main = np.ones(pair_lines.size, dtype=bool)
+    is_main[1:] = pair_lines[1:] != pair_lines[:-1]
+    main_class = np.zeros(case_number, dtype=int)
+    main_proba = np.zeros(case_number)
+    main_class[rows] = class_ids[is_main]
+    main_proba[rows] = pair_probas[is_main]
+    class_number = np.unique(class_ids[is_main]).size
+    column_number = max(class_number,
+                        class_ids.max() if class_ids.size else 0)
+    probas = np.zeros((case_number, column_number))
+    probas[rows[pair_lines], class_ids - 1] = pair_probas
+    stats = pd.DataFrame(probas,
+                         index=np.arange(1, case_number+1),
+                         columns=[f"class-{i+1}-proba"
+                                  for i in range(column_number)],
+                         copy=False)
+    stats.insert(0, "main-class-proba", main_proba)
+    stats.insert(0, "main-class", main_class)
+    return stats, class_number
+
+
+class Results():
+    """In-memory results of a classification.
+
+    Returned by Output.compute_results(). No file is written.
+
+    Parameters
+    ----------
+    assignments : Pandas dataframe
+        Input data (if aggregated) with main class and probability
+        of main class for all cases.
+    probabilities : Pandas dataframe
+        Probability of all cases to belong to each class.
+    class_stats : Pandas dataframe or None
+        Statistics for all classes, see Output.compute_class_stats().
+    class_linkage : Numpy array or None
+        Linkage matrix of hierarchical clustering of classes,
+        see Output.compute_linkage().
+    class_order : list of int
+        Classes ordered as leaves of the dendrogram.
+
+    Attributes
+    ----------
+    case_number : int
+        Number of cases.
+    class_number : int
+        Number of classes.
+
+    """
+
+    def __init__(self,
+                 assignments,
+                 probabilities,
+                 class_stats=None,
+                 class_linkage=None,
+                 class_order=None):
+        """Instantiate object."""
+        self.assignments = assignments
+        self.probabilities = probabilities
+        self.class_stats = class_stats
+        self.class_linkage = class_linkage
+        self.class_order = class_order if class_order is not None else []
+        self.case_number = len(assignments.index)
+        self.class_number = probabilities.shape[1]
+
 
 class Output():
     """AutoClass output files and results.
@@ -33,12 +439,32 @@ class Output():
         If True, countinue generation of autoclass input files even if an
         error is encounter.
         If False, stop at first error.
+    work_dir : string, optional (default: None)
+        Directory to read AutoClass C input and report files from,
+        for instance the work_dir of Run().
+        The root_in_name attribute then includes this directory.
+        Output files are still written relative to the current directory.
+        If None, the current directory is used.
+    metrics : Metrics() object, optional (default: None)
+        Metrics of processing stages. Can be shared with other
+        Input, Run and Output objects.
+        If None, a new Metrics() object is created.
+    profile : bool, optional (default: False)
+        If True, profile each stage with cProfile and write profiles
+        and a summary of hot functions in the "<root_out_name>-profile"
+        directory.
+        Profiling is also enabled by setting the AUTOCLASSWRAPPER_PROFILE
+        environment variable to 1.
 
     Attributes
     ----------
     had_error : bool (defaut False)
         Set to True if an error has been found in the generation of autoclass
         input files.
+    metrics : Metrics() object
+        Wall time, CPU time, memory, rows and bytes of each stage.
+    profiler : Profiler() object
+        Profiler of stages, disabled by default.
     case_number : int (default 0)
         Number of cases (i.e. of genes/proteins).
     class_number : int (default 0)
@@ -51,23 +477,51 @@ class Output():
     experiment_names : list of string (defaut [])
         List of experiment (conditions) names.
         Corresponds to columns in the input data.
+    class_stats : Pandas dataframe (default None)
+        Dataframe that contains statistics for all classes,
+        as written by write_class_stats().
+    class_linkage : Numpy array (default None)
+        Linkage matrix of hierarchical clustering of classes,
+        computed by compute_linkage() or write_dendrogram().
+    linkage_classes : list of int (default [])
+        Classes corresponding to leaves 0, 1, 2... of class_linkage.
+    class_order : list of int (default [])
+        Classes ordered as leaves of the dendrogram,
+        computed by compute_linkage() or write_dendrogram().
+    interim_mtime : float (default None)
+        Modification time of the last interim report
+        read by extract_interim_results().
 
     """
 
     def __init__(self,
                  root_in_name="autoclass",
                  root_out_name="autoclass_out",
-                 tolerate_error=False):
+                 tolerate_error=False,
+                 work_dir=None,
+                 metrics=None,
+                 profile=False):
         """Instantiate object."""
+        if work_dir is not None:
+            root_in_name = os.path.join(work_dir, root_in_name)
         self.root_in_name = root_in_name
         self.root_out_name = root_out_name
         self.tolerate_error = tolerate_error
         self.had_error = False
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.profiler = Profiler(
+            self.root_out_name + "-profile"
+            if profile or profiling_requested() else None)
         self.case_number = 0
         self.class_number = 0
         self.stats = None
         self.df = None
         self.experiment_names = []
+        self.class_stats = None
+        self.class_linkage = None
+        self.linkage_classes = []
+        self.class_order = []
+        self.interim_mtime = None
 
     def handle_error(f):
         """Handle error during data parsing and formating.
@@ -85,18 +539,22 @@ class Output():
         """
         def try_function(self, *args, **kwargs):
             if self.tolerate_error or not self.had_error:
-                try:
-                    return f(self, *args, **kwargs)
-                except Exception as e:
-                    for line in str(e).split("\n"):
-                        log.error(line)
-                    self.had_error = True
+                stage = f"{type(self).__name__}.{f.__name__}"
+                with self.metrics.measure(stage) as record, \
+                        self.profiler.profile(stage):
+                    try:
+                        return f(self, *args, **kwargs)
+                    except Exception as e:
+                        for line in str(e).split("\n"):
+                            log.error(line)
+                        self.had_error = True
+                        record["error"] = True
         try_function.__name__ = f.__name__
         try_function.__doc__ = f.__doc__
         return try_function
 
     @handle_error
-    def extract_results(self):
+    def extract_results(self, n_jobs=1):
         """Extract results from autoclass.
 
         Results extracted are:
@@ -104,61 +562,202 @@ class Output():
         - Number of classes (i.e. clusters)
         - For each case X, most probable class
         - For each case X, probability to belong to class Y
+
+        The .case-data-1 file is memory-mapped and parsed in bulk.
+
+        Parameters
+        ----------
+        n_jobs : int, optional (default: 1)
+            Number of processes used to parse the .case-data-1 file.
+            -1 means all CPU cores.
+            Small and compressed files are always parsed
+            in the current process.
+
         """
         log.info("Extracting autoclass results")
-        case_name = self.root_in_name + ".case-data-1"
-        # first pass:
-        # - get number of cases and classes
-        # - create empty dataframe to store class/cluster probability
-        #   for all cases (i.e gene/protein)
-        classes = set()
-        with open(case_name, "r") as case_file:
-            for line in case_file:
-                if not line:
-                    continue
-                if line.startswith("#") or line.startswith("DATA"):
-                    continue
-                items = line.split()
-                classes.add(int(items[1]))
-                self.case_number += 1
-            self.class_number = len(classes)
+        self.check_case_report()
+        case_name = find_file(self.root_in_name + ".case-data-1")
+        self.stats, self.class_number = self.read_case_data(case_name, n_jobs)
+        self.case_number = len(self.stats.index)
+        self.metrics.count(rows=self.case_number,
+                           bytes=os.path.getsize(case_name))
         log.info(f"Found {self.case_number} cases classified in "
                  f"{self.class_number} classes")
-        columns = ["main-class", "main-class-proba"]
-        for i in range(self.class_number):
-            columns.append(f"class-{i+1}-proba")
-        self.stats = pd.DataFrame(0.0,
-                                  index=np.arange(1, self.case_number+1),
-                                  columns=columns)
-        # second pass: fill the dataframe
-        with open(case_name, "r") as case_file:
-            for line in case_file:
-                if not line:
-                    continue
-                if line.startswith("#") or line.startswith("DATA"):
-                    continue
-                items = line.split()
-                assert len(items) >= 0, \
-                    (f"Need case#, class and prob in {input_file}:\n "
-                     f"{line.rstrip()}\n")
-                case = int(items[0])
-                for idx in range(1, len(items), 2):
-                    class_id = int(items[idx]) + 1
-                    proba = float(items[idx+1])
-                    if idx == 1:
-                        self.stats.loc[case, "main-class"] = class_id
-                        self.stats.loc[case, "main-class-proba"] = proba
-                    label = f"class-{class_id}-proba"
-                    self.stats.loc[case, label] = proba
-        # cast class id to int
-        self.stats["main-class"] = self.stats["main-class"].astype(int)
 
     @handle_error
-    def aggregate_input_data(self):
-        """Aggregate autoclass classes with input data."""
+    def extract_interim_results(self, n_jobs=1):
+        """Extract results from interim reports of a running search.
+
+        Interim reports are generated periodically when the run file is
+        created with Run.create_run_file(interim_period=...).
+        The report is parsed only if it changed since the previous call,
+        so this method can be called repeatedly to monitor a search.
+
+        Parameters
+        ----------
+        n_jobs : int, optional (default: 1)
+            Number of processes used to parse the .case-data-1 file.
+            See extract_results().
+
+        Returns
+        -------
+        bool
+            True if a new interim report was read.
+
+        """
+        self.check_case_report()
+        case_name = self.root_in_name + INTERIM_ROOT_SUFFIX + ".case-data-1"
+        if not os.path.isfile(case_name):
+            log.debug("No interim report available")
+            return False
+        mtime = os.stat(case_name).st_mtime_ns
+        if mtime == self.interim_mtime:
+            return False
+        log.info("Extracting interim autoclass results")
+        self.stats, self.class_number = self.read_case_data(case_name, n_jobs)
+        self.case_number = len(self.stats.index)
+        self.interim_mtime = mtime
+        log.info(f"Found {self.case_number} cases classified in "
+                 f"{self.class_number} classes (interim)")
+        return True
+
+    def get_report_files(self):
+        """Get names of report files expected from AutoClass C.
+
+        Report files depend on report_type in .r-params file.
+
+        Returns
+        -------
+        filenames : list of strings
+            Names of report files.
+
+        """
+        report_type = read_report_type(self.root_in_name + ".r-params")
+        if report_type not in REPORT_FILES:
+            raise ValueError(f"Unknown report type '{report_type}' "
+                             f"in {self.root_in_name}.r-params")
+        return [self.root_in_name + ext for ext in REPORT_FILES[report_type]]
+
+    def check_case_report(self):
+        """Verify AutoClass C reports include case data.
+
+        Raises
+        ------
+        ValueError
+            If case cross-reference report was not requested in .r-params.
+
+        """
+        case_name = self.root_in_name + ".case-data-1"
+        if case_name not in self.get_report_files():
+            report_type = read_report_type(self.root_in_name + ".r-params")
+            raise ValueError(f"No case data report ({case_name}) "
+                             f"with report_type = \"{report_type}\". "
+                             "Use report_type \"all\" or \"xref_case\" "
+                             "in Input.create_rparams_file()")
+
+    def read_case_data(self, case_name, n_jobs=1):
+        """Read AutoClass C case data file.
+
+        Parameters
+        ----------
+        case_name : string
+            Name of .case-data-1 file, possibly compressed.
+        n_jobs : int, optional (default: 1)
+            Number of processes. -1 means all CPU cores.
+
+        Returns
+        -------
+        stats : Pandas dataframe
+            Main class and probabilities of all cases.
+        class_number : int
+            Number of classes.
+
+        """
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        is_compressed = case_name.endswith(
+            tuple(COMPRESSION_EXTENSIONS.values()))
+        if (n_jobs > 1 and not is_compressed
+                and os.path.getsize(case_name) >= PARALLEL_PARSING_MIN_SIZE):
+            log.info(f"Parsing {case_name} with {n_jobs} processes")
+            parsed = parse_case_file_parallel(case_name, n_jobs)
+        else:
+            buffer = read_case_file(case_name)
+            try:
+                parsed = parse_case_data(buffer)
+            finally:
+                if isinstance(buffer, mmap.mmap):
+                    buffer.close()
+        return build_case_stats(*parsed)
+
+    def is_snapshot_current(self):
+        """Verify the .pkl snapshot of input data is up to date.
+
+        Returns
+        -------
+        bool
+            True if the .pkl snapshot exists and is not older
+            than the .tsv file (possibly compressed).
+
+        """
+        pkl_name = self.root_in_name + ".pkl"
+        if not os.path.exists(pkl_name):
+            return False
+        tsv_name = find_file(self.root_in_name + ".tsv")
+        if not os.path.exists(tsv_name):
+            return True
+        if os.path.getmtime(pkl_name) < os.path.getmtime(tsv_name):
+            log.warning(f"Ignoring {pkl_name} snapshot, "
+                        f"older than {tsv_name}")
+            return False
+        return True
+
+    @handle_error
+    def aggregate_input_data(self, input_data=None, output_format="tsv"):
+        """Aggregate autoclass classes with input data.
+
+        Input data are taken, by order of preference, from:
+
+        - the input_data parameter,
+        - the .pkl snapshot written by Input.create_db2_file(snapshot=True),
+          if not older than the .tsv file,
+        - the .tsv file written by Input.create_db2_file(),
+          possibly compressed (.tsv.gz or .tsv.zst).
+          Column types are then read from the .hd2 file, if available.
+
+        Parameters
+        ----------
+        input_data : Input(), Dataset() or Pandas dataframe, optional
+            In-memory input data (default: None).
+            Data are not copied.
+        output_format : string or None, optional (default: "tsv")
+            Format of file with classes and probabilities:
+            "tsv", "pickle" or None (no file).
+            With None, the file can be written later
+            with write_aggregate().
+
+        """
         log.info("Aggregating input data")
-        input_name = self.root_in_name + ".tsv"
-        self.df = pd.read_csv(input_name, sep="\t", header=0, index_col=0)
+        self.check_aggregate_format(output_format)
+        if isinstance(input_data, Input):
+            input_data = input_data.full_dataset
+        if isinstance(input_data, Dataset):
+            input_data = input_data.df
+        if input_data is not None:
+            if not isinstance(input_data, pd.DataFrame):
+                raise TypeError("Input data must be an Input, a Dataset "
+                                "or a pandas dataframe, "
+                                f"not {type(input_data).__name__}")
+            input_name = "in-memory input data"
+            self.df = input_data
+        elif self.is_snapshot_current():
+            input_name = self.root_in_name + ".pkl"
+            log.info(f"Reading {input_name} snapshot")
+            self.df = pd.read_pickle(input_name)
+        else:
+            input_name = find_file(self.root_in_name + ".tsv")
+            self.df = pd.read_csv(input_name, sep="\t", header=0, index_col=0,
+                                  dtype=self.read_column_types())
         nrows, ncols = self.df.shape
         self.experiment_names = list(self.df.columns)
         assert len(self.stats.index) == nrows, \
@@ -166,152 +765,798 @@ class Output():
              f"should match number of rows in input file ({input_name})!")
         self.stats.index = self.df.index
         self.df = pd.concat([self.df, self.stats], axis=1)
-        # prepare data for export
-        log.info("Writing classes + probabilities .tsv file")
-        self.df.to_csv(self.root_out_name + ".tsv",
-                       sep="\t",
-                       header=True,
-                       index=True)
+        self.metrics.count(rows=nrows)
+        self.write_aggregate_file(output_format)
+
+    @handle_error
+    def write_aggregate(self, output_format="tsv"):
+        """Write input data aggregated with classes and probabilities.
+
+        Use after aggregate_input_data(output_format=None).
+
+        Parameters
+        ----------
+        output_format : string, optional (default: "tsv")
+            Format of file: "tsv" or "pickle".
+
+        """
+        self.check_aggregate_format(output_format)
+        if self.df is None:
+            raise ValueError("No aggregated data. "
+                             "Run aggregate_input_data() first")
+        self.write_aggregate_file(output_format)
+        self.metrics.count(rows=len(self.df.index))
+
+    def check_aggregate_format(self, output_format):
+        """Verify format of file with classes and probabilities.
+
+        Parameters
+        ----------
+        output_format : string or None
+            Format of file.
+
+        Raises
+        ------
+        ValueError
+            If format is not in AGGREGATE_FORMATS.
+
+        """
+        if output_format not in AGGREGATE_FORMATS:
+            formats = ", ".join(map(str, AGGREGATE_FORMATS))
+            raise ValueError(f"Unknown output format '{output_format}'. "
+                             f"Available: {formats}")
+
+    def write_aggregate_file(self, output_format):
+        """Write file with classes and probabilities.
+
+        Parameters
+        ----------
+        output_format : string or None
+            Format of file: "tsv", "pickle" or None (no file).
+
+        """
+        if output_format == "tsv":
+            log.info("Writing classes + probabilities .tsv file")
+            self.df.to_csv(self.root_out_name + ".tsv",
+                           sep="\t",
+                           header=True,
+                           index=True)
+        elif output_format == "pickle":
+            log.info("Writing classes + probabilities .pkl file")
+            self.df.to_pickle(self.root_out_name + ".pkl")
+
+    def read_column_types(self):
+        """Read column types from .hd2 file.
+
+        Returns
+        -------
+        dtypes : dict
+            Column names as keys, "float64" for real values.
+            Empty if .hd2 file is not available.
+
+        """
+        hd2_name = self.root_in_name + ".hd2"
+        dtypes = {}
+        if not os.path.exists(hd2_name):
+            return dtypes
+        regex = re.compile(r'^\d+ real \w+ "(.*)"')
+        with open(hd2_name, "r") as hd2:
+            for line in hd2:
+                match = regex.match(line)
+                if match:
+                    dtypes[match.group(1)] = "float64"
+        return dtypes
+
+    @handle_error
+    def export(self, file_format="parquet", compression=None,
+               compression_level=None):
+        """Export results in a columnar file format.
+
+        Exported tables are:
+
+        - results: input data with classes and probabilities
+          if aggregate_input_data() was called, otherwise
+          main class and probabilities for all cases,
+        - class statistics, if write_class_stats() was called.
+
+        With "parquet" and "feather" formats, tables are written in
+        <root_out>.<ext> and <root_out>_stats.<ext> files.
+        With "hdf5" format, tables are written in <root_out>.h5 file
+        with "results" and "class_stats" keys.
+
+        Parameters
+        ----------
+        file_format : string, optional (default: "parquet")
+            Either "parquet", "feather" (require pyarrow)
+            or "hdf5" (requires PyTables).
+        compression : string, optional (default: None)
+            Compression codec.
+            For parquet: "snappy", "gzip", "brotli", "lz4" or "zstd".
+            For feather: "lz4" or "zstd".
+            For hdf5: "zlib", "lzo", "bzip2" or "blosc".
+            If None, the default of each format is used.
+        compression_level : int, optional (default: None)
+            Compression level, if supported by codec.
+
+        Returns
+        -------
+        filenames : list of string
+            Names of written files.
+
+        """
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown file format '{file_format}'. "
+                             f"Available: {', '.join(EXPORT_FORMATS)}")
+        extension, module = EXPORT_FORMATS[file_format]
+        if importlib.util.find_spec(module) is None:
+            raise ImportError(f"Exporting to {file_format} requires "
+                              f"the '{module}' package")
+        tables = {"results": self.df if self.df is not None else self.stats}
+        if self.class_stats is not None:
+            tables["class_stats"] = self.class_stats
+        filenames = []
+        if file_format == "hdf5":
+            if compression is not None and compression_level is None:
+                # PyTables does not compress with level 0
+                compression_level = 5
+            filename = self.root_out_name + extension
+            log.info(f"Exporting results to {filename}")
+            for key, table in tables.items():
+                table.to_hdf(filename, key=key,
+                             mode="w" if key == "results" else "a",
+                             complib=compression,
+                             complevel=compression_level)
+            filenames.append(filename)
+            return filenames
+        for key, table in tables.items():
+            filename = self.root_out_name + extension
+            if key == "class_stats":
+                filename = self.root_out_name + "_stats" + extension
+            log.info(f"Exporting {key.replace('_', ' ')} to {filename}")
+            if file_format == "parquet":
+                table.to_parquet(filename,
+                                 compression=compression or "snappy",
+                                 compression_level=compression_level)
+            else:
+                # feather files do not store index
+                table.reset_index().to_feather(
+                    filename,
+                    compression=compression,
+                    compression_level=compression_level)
+            filenames.append(filename)
+        return filenames
 
     @handle_error
-    def write_cdt(self, with_proba=False):
+    def write_cdt(self, with_proba=False, class_order=None):
         """Write .cdt file for visualisation.
 
         Parameters
         ----------
         with_proba : bool (default False), optional
             If True, also writes probability of case to belong to each class.
+        class_order : list of int (default None), optional
+            Order of classes in file, for instance class_order attribute
+            computed by write_dendrogram().
+            If None, classes are written by increasing number.
 
         """
-        df_tmp = self.df.copy(deep=True)
-        if not with_proba:
-            log.info("Writing .cdt file")
-            filename = self.root_out_name + ".cdt"
+        self._write_cdt_files([with_proba], class_order)
+
+    @handle_error
+    def write_cdt_all(self, class_order=None):
+        """Write .cdt files without and with probabilities.
+
+        Cases are sorted and formatted once for both files.
+        Equivalent to write_cdt() followed by write_cdt(with_proba=True).
+
+        Parameters
+        ----------
+        class_order : list of int (default None), optional
+            Order of classes in files, see write_cdt().
+
+        """
+        self._write_cdt_files([False, True], class_order)
+
+    def _write_cdt_files(self, variants, class_order=None):
+        """Write .cdt files for visualisation.
+
+        Parameters
+        ----------
+        variants : list of bool
+            For each file to write, True to also write probability
+            of case to belong to each class.
+        class_order : list of int (default None), optional
+            Order of classes in files.
+            If None, classes are written by increasing number.
+
+        """
+        filenames = {}
+        for with_proba in variants:
+            if not with_proba:
+                log.info("Writing .cdt file")
+                filenames[with_proba] = self.root_out_name + ".cdt"
+            else:
+                log.info("Writing .cdt file (with probabilities)")
+                filenames[with_proba] = self.root_out_name + "_withproba.cdt"
+        proba_names = [f"class-{i+1}-proba" for i in range(self.class_number)]
+        # sort by increasing class then decreasing probability
+        # lexsort is stable: ties keep input order
+        main_class = self.df["main-class"].to_numpy()
+        order = np.lexsort((-self.df["main-class-proba"].to_numpy(),
+                            main_class))
+        sorted_class = main_class[order]
+        # build gid from case index (in input order) and class
+        case_idx = pd.Series(np.arange(1, len(order)+1)).astype(str)
+        gid = ("GENE" + case_idx.str.zfill(4)
+               + "-CL" + pd.Series(main_class).astype(str).str.zfill(3)
+               + "X")
+        # only keep columns to export
+        names = self.df.index.to_numpy()[order]
+        df_cdt = pd.concat([
+            pd.DataFrame({"gid": gid.to_numpy()[order],
+                          "name1": names,
+                          "name2": names,
+                          "gweight": 1}),
+            self.df[self.experiment_names].take(order).reset_index(drop=True)
+            ], axis=1)
+        df_cdt_proba = None
+        if True in filenames:
+            # rows of both variants are written from whole frames
+            df_cdt_proba = pd.concat([
+                df_cdt,
+                self.df[proba_names].take(order).reset_index(drop=True)
+                ], axis=1)
+        # cases are sorted by class: each class is a contiguous block
+        if class_order is None:
+            class_ids = np.arange(1, self.class_number+1)
         else:
-            log.info("Writing .cdt file (with probabilities)")
-            filename = self.root_out_name + "_withproba.cdt"
-        # add GWEIGHT
-        df_tmp["gweight"] = 1
-        # add gene name twice for formatting purpose
-        df_tmp["name1"] = df_tmp.index
-        df_tmp["name2"] = df_tmp.index
-        # build gid
-        df_tmp["idx"] = np.arange(1, df_tmp.shape[0]+1, dtype=int)
-        df_tmp["gid"] = df_tmp.apply(
-            lambda x: f"GENE{x['idx']:04d}-CL{x['main-class']:03.0f}X",
-            axis=1)
-        # sort by increasing class
-        df_tmp.sort_values(by=["main-class", "main-class-proba"],
-                           ascending=[True, False],
-                           inplace=True)
-        with open(filename, "w") as cdtfile:
-            # write header line
-            headers = ["GID", "UNIQID", "NAME", "GWEIGHT"]
-            headers += self.experiment_names
-            if with_proba:
-                headers += [f"class-{i+1}-proba"
-                            for i in range(self.class_number)]
-            content = "\t".join(headers)
-            cdtfile.write(f"{content}\n")
-            # write 'EWEIGHT' line
-            eweight = "EWEIGHT\t\t\t"+"\t1"*len(self.experiment_names)
-            if with_proba:
-                eweight += "\t1"*self.class_number
-            cdtfile.write(eweight + "\n")
+            class_ids = np.asarray(class_order, dtype=int)
+        starts = np.searchsorted(sorted_class, class_ids, side="left")
+        ends = np.searchsorted(sorted_class, class_ids, side="right")
+        with contextlib.ExitStack() as stack:
+            cdtfiles = {with_proba: stack.enter_context(open(filename, "w"))
+                        for with_proba, filename in filenames.items()}
+            for with_proba, cdtfile in cdtfiles.items():
+                # write header line
+                headers = ["GID", "UNIQID", "NAME", "GWEIGHT"]
+                headers += self.experiment_names
+                if with_proba:
+                    headers += proba_names
+                content = "\t".join(headers)
+                cdtfile.write(f"{content}\n")
+                # write 'EWEIGHT' line
+                eweight = "EWEIGHT\t\t\t"+"\t1"*len(self.experiment_names)
+                if with_proba:
+                    eweight += "\t1"*self.class_number
+                cdtfile.write(eweight + "\n")
             # write classes
-            col_names = ["gid", "name1", "name2", "gweight"]
-            col_names += self.experiment_names
-            if with_proba:
-                col_names += [f"class-{i+1}-proba"
-                              for i in range(self.class_number)]
-            for class_idx in range(1, self.class_number+1):
-                cluster = df_tmp[df_tmp["main-class"] == class_idx]
-                cdtfile.write(cluster.to_csv(sep="\t",
-                                             columns=col_names,
-                                             index=False,
-                                             header=False,
-                                             na_rep=""))
+            for class_idx, start, end in zip(class_ids, starts, ends):
+                cluster = df_cdt.iloc[start:end].to_csv(sep="\t",
+                                                        index=False,
+                                                        header=False,
+                                                        na_rep="",
+                                                        lineterminator="\n")
+                if False in cdtfiles:
+                    cdtfiles[False].write(cluster)
+                if True in cdtfiles:
+                    df_cdt_proba.iloc[start:end].to_csv(cdtfiles[True],
+                                                        sep="\t",
+                                                        index=False,
+                                                        header=False,
+                                                        na_rep="",
+                                                        lineterminator="\n")
                 # add spacer between clusters
-                for dummy in range(1, 6):
-                    cdtfile.write(f"GENE{dummy:04d}-{class_idx:03.0f}S\n")
+                for cdtfile in cdtfiles.values():
+                    for dummy in range(1, 6):
+                        cdtfile.write(f"GENE{dummy:04d}-{class_idx:03.0f}S\n")
+        self.metrics.count(rows=len(self.df.index),
+                           bytes=sum(os.path.getsize(name)
+                                     for name in filenames.values()))
 
     @handle_error
-    def write_class_stats(self):
+    def write_class_stats(self, extra_stats=None):
         """Write class stat file.
 
         Number of elements per class.
         Mean and standard deviation values per experiment.
         Missing values are skipped.
+
+        Parameters
+        ----------
+        extra_stats : list of strings, optional (default: None)
+            Additional statistics to compute, among:
+            "median", "min", "max" and "weighted-mean".
+            "weighted-mean" is the mean of all cases weighted by
+            their probability to belong to the class.
+
         """
         log.info("Writing class statistics")
-        stat_name = self.root_out_name + "_stats.tsv"
+        if self.get_class_stats(extra_stats) is None:
+            return 0
+        self.write_class_stats_file()
+
+    @handle_error
+    def compute_class_stats(self, extra_stats=None):
+        """Compute class statistics without writing any file.
+
+        See write_class_stats().
+
+        Parameters
+        ----------
+        extra_stats : list of strings, optional (default: None)
+            Additional statistics to compute.
+
+        Returns
+        -------
+        class_stats : Pandas dataframe or None
+            Statistics for all classes, also stored in class_stats.
+            None if there is no numerical column.
+
+        """
+        log.info("Computing class statistics")
+        class_stats = self.get_class_stats(extra_stats)
+        self.metrics.count(rows=len(self.df.index))
+        return class_stats
+
+    def get_class_stats(self, extra_stats=None):
+        """Compute class statistics in a single groupby aggregation.
+
+        Parameters
+        ----------
+        extra_stats : list of strings, optional (default: None)
+            Additional statistics to compute.
+
+        Returns
+        -------
+        class_stats : Pandas dataframe or None
+            Statistics for all classes, also stored in class_stats.
+            None if there is no numerical column.
+
+        """
+        if extra_stats is None:
+            extra_stats = []
+        for stat in extra_stats:
+            if stat not in EXTRA_CLASS_STATS:
+                raise ValueError(f"Unknown statistic '{stat}'. "
+                                 f"Available: {', '.join(EXTRA_CLASS_STATS)}")
         # Select experiment columns with numerical values only.
         target_columns = []
         for column_name in self.experiment_names:
-            if self.df[column_name].dtype != object:
+            if pd.api.types.is_numeric_dtype(self.df[column_name]):
                 target_columns.append(column_name)
         if len(target_columns) == 0:
             log.warning("No numerical column available for statistics")
-            return 0
+            return None
+        # stats are sorted by name within each class
+        stat_names = sorted(set(["count", "mean", "std", *extra_stats]))
+        agg_names = [stat for stat in stat_names if stat != "weighted-mean"]
+        # compute metrics in a single groupby aggregation
         df_tmp = self.df[["main-class"] + target_columns]
-        # compute metrics
-        df_count = df_tmp.groupby("main-class").count()
-        df_count["stat"] = "count"
-        df_mean = df_tmp.groupby("main-class").mean()
-        df_mean["stat"] = "mean"
-        df_std = df_tmp.groupby("main-class").std()
-        df_std["stat"] = "std"
-        # concat
-        df_stats = pd.concat([df_count, df_mean, df_std], axis=0, join="inner")
-        # add cluster
-        df_stats["class"] = df_stats.index
-        # sort by cluster and metric
-        df_stats.sort_values(by=["class", "stat"], inplace=True)
-        # save file with ordered columns
-        col = list(df_stats.columns)
-        df_stats = df_stats[[col[-1], col[-2], *col[:-2]]]
-        df_stats.to_csv(stat_name, sep="\t", header=True, index=False)
+        df_agg = df_tmp.groupby("main-class").agg(agg_names)
+        class_ids = df_agg.index.to_numpy()
+        values = {stat: df_agg.xs(stat, axis=1, level=1)[target_columns]
+                              .to_numpy(dtype=float)
+                  for stat in agg_names}
+        if "weighted-mean" in stat_names:
+            values["weighted-mean"] = \
+                self.get_weighted_means(target_columns, class_ids)
+        # one row per class and stat
+        data = (np.stack([values[stat] for stat in stat_names], axis=1)
+                  .reshape(-1, len(target_columns)))
+        df_stats = pd.DataFrame(data, columns=target_columns)
+        df_stats.insert(0, "stat", np.tile(stat_names, len(class_ids)))
+        df_stats.insert(0, "class", np.repeat(class_ids, len(stat_names)))
+        self.class_stats = df_stats
+        return df_stats
+
+    def write_class_stats_file(self):
+        """Write class statistics stored in class_stats to file."""
+        stat_name = self.root_out_name + "_stats.tsv"
+        self.class_stats.to_csv(stat_name, sep="\t", header=True, index=False)
+        self.metrics.count(rows=len(self.df.index),
+                           bytes=os.path.getsize(stat_name))
+
+    def get_weighted_means(self, columns, class_ids=None):
+        """Compute means of all cases weighted by class probabilities.
+
+        Missing values are skipped.
+
+        Parameters
+        ----------
+        columns : list of strings
+            Names of numerical columns.
+        class_ids : list of int, optional (default: None)
+            Class numbers. Class numbers may have gaps.
+            If None, all classes with a class-<N>-proba column are used.
+
+        Returns
+        -------
+        means : Numpy array
+            Weighted means, with one row per class (in the order of
+            class_ids) and one column per input column.
+
+        """
+        if class_ids is None:
+            proba_names = [name for name in self.df.columns
+                           if re.fullmatch(r"class-\d+-proba", name)]
+        else:
+            proba_names = [f"class-{class_id}-proba"
+                           for class_id in class_ids]
+        proba = self.df[proba_names].to_numpy(dtype=float)
+        data = self.df[columns].to_numpy(dtype=float)
+        is_valid = ~np.isnan(data)
+        weighted_sums = proba.T @ np.where(is_valid, data, 0.0)
+        weights = proba.T @ is_valid
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return weighted_sums / weights
 
     @handle_error
-    def write_dendrogram(self):
-        """Write dendrogram of hierarchical clustering of classes to file."""
+    def write_dendrogram(self,
+                         image_format="png",
+                         render=True,
+                         method="ward",
+                         metric="euclidean",
+                         reduce_dim=None,
+                         n_components=50,
+                         weight_by_size=False,
+                         random_state=0):
+        """Write dendrogram of hierarchical clustering of classes to file.
+
+        Class statistics computed by write_class_stats() are used.
+        If not available, they are read from the stats file.
+
+        The figure is drawn without pyplot and without global state,
+        so several dendrograms can be written from threads or processes.
+
+        Parameters
+        ----------
+        image_format : string, optional (default: "png")
+            Format of dendrogram image: "png", "svg" or "pdf".
+        render : bool, optional (default: True)
+            If False, only compute hierarchical clustering.
+        method : string, optional (default: "ward")
+            Linkage method, see scipy.cluster.hierarchy.linkage().
+        metric : string, optional (default: "euclidean")
+            Distance metric, see scipy.cluster.hierarchy.linkage().
+        reduce_dim : string, optional (default: None)
+            Reduce the number of experiments before clustering,
+            either with "pca" (principal component analysis)
+            or "random" (gaussian random projection).
+            If None, all experiments are used.
+        n_components : int, optional (default: 50)
+            Number of dimensions kept by reduce_dim.
+        weight_by_size : bool, optional (default: False)
+            If True, weight classes by their number of cases.
+            Only available for "ward" method and "euclidean" metric.
+        random_state : int, optional (default: 0)
+            Seed of random projection.
+
+        Returns
+        -------
+        Z : Numpy array
+            Linkage matrix of hierarchical clustering of classes.
+
+        """
         log.info("Writing dendrogram")
-        stat_name = self.root_out_name + "_stats.tsv"
-        if not os.path.exists(stat_name):
-            log.error(f"Cannot find {stat_name}")
+        Z = self.get_linkage(method, metric, reduce_dim, n_components,
+                             weight_by_size, random_state)
+        if Z is None:
             return 0
-        df = pd.read_csv(stat_name, sep="\t")
-        # keep cluster labels and counts
-        class_names_values = {val[0]: val[1]
-                              for val
-                              in df[df["stat"] == "count"][
-                                    ["class", df.columns[-1]]].values
-                              }
+        if render:
+            self.draw_dendrogram(image_format)
+        return Z
+
+    @handle_error
+    def compute_linkage(self,
+                        method="ward",
+                        metric="euclidean",
+                        reduce_dim=None,
+                        n_components=50,
+                        weight_by_size=False,
+                        random_state=0):
+        """Compute hierarchical clustering of classes without drawing.
+
+        Class statistics are used, see write_dendrogram() for parameters.
+        The dendrogram can be drawn later with draw_dendrogram().
+
+        Returns
+        -------
+        Z : Numpy array
+            Linkage matrix of hierarchical clustering of classes,
+            also stored in class_linkage.
+
+        """
+        log.info("Computing hierarchical clustering of classes")
+        return self.get_linkage(method, metric, reduce_dim, n_components,
+                                weight_by_size, random_state)
+
+    def get_linkage(self, method, metric, reduce_dim, n_components,
+                    weight_by_size, random_state):
+        """Compute hierarchical clustering of classes.
+
+        See write_dendrogram() for parameters.
+
+        Returns
+        -------
+        Z : Numpy array or None
+            Linkage matrix of hierarchical clustering of classes.
+            None if class statistics are not available.
+
+        """
+        if self.class_stats is not None:
+            df = self.class_stats
+        else:
+            stat_name = self.root_out_name + "_stats.tsv"
+            if not os.path.exists(stat_name):
+                log.error(f"Cannot find {stat_name}")
+                return None
+            df = pd.read_csv(stat_name, sep="\t")
+            self.class_stats = df
         # prepare dataframe:
         # 1. isolate 'mean' values
         # 2. remove NA
         # 3. keep only columns with values
-        df_clean = (df.query("stat == 'mean'")
-                      .dropna()
-                      .drop(labels=["stat", "class"], axis=1)
-                    )
-        Z = hierarchy.linkage(df_clean, "ward")
-        plt.rcParams["lines.linewidth"] = 2.5
-        plt.rcParams["font.size"] = 16
-        plt.rcParams["xtick.labelsize"] = 14
-        plt.figure(figsize=(10, 6))
-        plt.title("Hierarchical Clustering of Classes")
-        plt.xlabel("Classes")
-        plt.ylabel("Distance")
+        df_clean = df[df["stat"] == "mean"].dropna()
+        class_names = list(df_clean["class"])
+        data = (df_clean.drop(labels=["stat", "class"], axis=1)
+                        .to_numpy(dtype=float))
+        if reduce_dim is not None:
+            data = reduce_dimension(data, reduce_dim, n_components,
+                                    random_state)
+        if weight_by_size:
+            if method != "ward" or metric != "euclidean":
+                raise ValueError("Classes can be weighted by size with "
+                                 "'ward' method and 'euclidean' metric only")
+            class_sizes = self.get_class_sizes()
+            Z = weighted_ward_linkage(data,
+                                      [class_sizes[name]
+                                       for name in class_names])
+        else:
+            Z = hierarchy.linkage(data, method=method, metric=metric)
+        self.class_linkage = Z
+        self.linkage_classes = [int(name) for name in class_names]
+        self.class_order = [self.linkage_classes[leaf]
+                            for leaf in hierarchy.leaves_list(Z)]
+        return Z
+
+    def get_class_sizes(self):
+        """Get number of cases of classes from class statistics.
+
+        Returns
+        -------
+        sizes : dict
+            Class numbers as keys, number of cases as values.
+
+        """
+        df = self.class_stats
+        df_count = df[df["stat"] == "count"]
+        return dict(zip(df_count["class"], df_count[df.columns[-1]]))
+
+    @handle_error
+    def draw_dendrogram(self, image_format="png"):
+        """Draw dendrogram of hierarchical clustering of classes to file.
+
+        Hierarchical clustering computed by compute_linkage()
+        or write_dendrogram() is used.
+
+        Parameters
+        ----------
+        image_format : string, optional (default: "png")
+            Format of dendrogram image: "png", "svg" or "pdf".
+
+        Returns
+        -------
+        filename : string
+            Name of image file.
+
+        """
+        if self.class_linkage is None:
+            raise ValueError("No hierarchical clustering of classes. "
+                             "Run compute_linkage() first")
+        if image_format not in DENDROGRAM_FORMATS:
+            raise ValueError(f"Unknown image format '{image_format}'. "
+                             f"Available: {', '.join(DENDROGRAM_FORMATS)}")
+        class_sizes = self.get_class_sizes()
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        # sizes of former rcParams: font.size 16, title "large" (x1.2)
+        ax.set_title("Hierarchical Clustering of Classes", fontsize=19.2)
+        ax.set_xlabel("Classes", fontsize=16)
+        ax.set_ylabel("Distance", fontsize=16)
         hierarchy.dendrogram(
-            Z,
+            self.class_linkage,
+            ax=ax,
             color_threshold=0.0,
             leaf_font_size=12,
             leaf_rotation=90,
             above_threshold_color="grey",
-            labels=[f"{name:.0f} [{value:.0f}]"
-                    for name, value in class_names_values.items()
+            labels=[f"{name:.0f} [{class_sizes[name]:.0f}]"
+                    for name in self.linkage_classes
                     ]
         )
-        plt.savefig(self.root_out_name + "_dendrogram.png",
+        for lines in ax.collections:
+            lines.set_linewidth(2.5)
+        ax.tick_params(axis="y", labelsize=16)
+        filename = f"{self.root_out_name}_dendrogram.{image_format}"
+        fig.savefig(filename,
+                    format=image_format,
                     bbox_inches="tight")
+        return filename
+
+    def compute_results(self,
+                        input_data=None,
+                        n_jobs=1,
+                        extra_stats=None,
+                        linkage=True,
+                        method="ward",
+                        metric="euclidean"):
+        """Compute all results in memory, without writing any file.
+
+        Results are extracted and aggregated with input data (if not
+        already done), then class statistics and hierarchical clustering
+        of classes are computed.
+        Files can be written afterwards with write_results().
+
+        Parameters
+        ----------
+        input_data : Input(), Dataset() or Pandas dataframe, optional
+            In-memory input data (default: None).
+            See aggregate_input_data().
+        n_jobs : int, optional (default: 1)
+            Number of processes used to parse the .case-data-1 file.
+        extra_stats : list of strings, optional (default: None)
+            Additional class statistics, see write_class_stats().
+        linkage : bool, optional (default: True)
+            If False, hierarchical clustering of classes is not computed.
+        method : string, optional (default: "ward")
+            Linkage method, see write_dendrogram().
+        metric : string, optional (default: "euclidean")
+            Distance metric, see write_dendrogram().
+
+        Returns
+        -------
+        results : Results() object or None
+            In-memory results. None if an error occured.
+
+        """
+        if self.stats is None:
+            self.extract_results(n_jobs)
+        if self.df is None:
+            self.aggregate_input_data(input_data, output_format=None)
+        self.compute_class_stats(extra_stats)
+        if linkage and self.class_stats is not None:
+            self.compute_linkage(method=method, metric=metric)
+        if self.had_error:
+            return None
+        return self.get_results()
+
+    def get_results(self):
+        """Get results computed so far as a Results() object.
+
+        Data are not copied.
+
+        Returns
+        -------
+        results : Results() object
+
+        """
+        if self.stats is None:
+            raise ValueError("No results. Run extract_results() first")
+        df = self.df if self.df is not None else self.stats
+        proba_names = [name for name in self.stats.columns
+                       if name not in ("main-class", "main-class-proba")]
+        assignments = df.drop(columns=proba_names)
+        return Results(assignments,
+                       df[proba_names],
+                       class_stats=self.class_stats,
+                       class_linkage=self.class_linkage,
+                       class_order=self.class_order)
+
+    @handle_error
+    def write_results(self,
+                      output_format="tsv",
+                      cdt=True,
+                      image_format="png"):
+        """Write results computed by compute_results() to files.
+
+        Written files are:
+
+        - input data with classes and probabilities,
+        - .cdt files without and with probabilities, with classes
+          ordered as leaves of the dendrogram if available,
+        - class statistics, if computed,
+        - dendrogram image, if hierarchical clustering was computed.
+
+        Parameters
+        ----------
+        output_format : string or None, optional (default: "tsv")
+            Format of file with classes and probabilities:
+            "tsv", "pickle" or None (no file).
+        cdt : bool, optional (default: True)
+            If False, .cdt files are not written.
+        image_format : string or None, optional (default: "png")
+            Format of dendrogram image: "png", "svg", "pdf"
+            or None (no image).
+
+        """
+        self.check_aggregate_format(output_format)
+        if self.df is None:
+            raise ValueError("No aggregated data. "
+                             "Run compute_results() first")
+        self.write_aggregate_file(output_format)
+        if cdt:
+            self.write_cdt_all(class_order=self.class_order or None)
+        if self.class_stats is not None:
+            log.info("Writing class statistics")
+            self.write_class_stats_file()
+        if image_format is not None and self.class_linkage is not None:
+            log.info("Writing dendrogram")
+            self.draw_dendrogram(image_format)
+
+    @handle_error
+    def write_archive(self, archive_format="tar.gz",
+                      include_autoclass_files=False,
+                      compression_level=None, threads=-1):
+        """Write all result files into a compressed archive.
+
+        Result files are all files starting with <root_out>.
+        Files are streamed into the archive: they are not loaded in memory.
+
+        Parameters
+        ----------
+        archive_format : string, optional (default: "tar.gz")
+            Either "tar.gz", "tar.zst" (requires zstandard) or "zip".
+        include_autoclass_files : bool, optional (default: False)
+            If True, also archive AutoClass C input and report files
+            (all files starting with <root_in>.).
+        compression_level : int, optional (default: None)
+            Compression level. If None, the default of each codec is used.
+        threads : int, optional (default: -1)
+            Number of compression threads, for "tar.zst" only.
+            -1 means all CPU cores.
+
+        Returns
+        -------
+        archive_name : string
+            Name of archive.
+
+        """
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{archive_format}'. "
+                             f"Available: {', '.join(ARCHIVE_FORMATS)}")
+        archive_name = f"{self.root_out_name}.{archive_format}"
+        patterns = [self.root_out_name + ".*", self.root_out_name + "_*"]
+        if include_autoclass_files:
+            patterns.append(self.root_in_name + ".*")
+        filenames = sorted(set(name
+                               for pattern in patterns
+                               for name in glob.glob(pattern)
+                               if os.path.isfile(name)
+                               and name != archive_name))
+        log.info(f"Writing {len(filenames)} files into {archive_name}")
+        if archive_format == "zip":
+            with zipfile.ZipFile(archive_name, "w",
+                                 compression=zipfile.ZIP_DEFLATED,
+                                 compresslevel=compression_level) as archive:
+                for name in filenames:
+                    archive.write(name)
+        elif archive_format == "tar.gz":
+            if compression_level is None:
+                compression_level = 9
+            with tarfile.open(archive_name, "w:gz",
+                              compresslevel=compression_level) as archive:
+                for name in filenames:
+                    archive.add(name)
+        else:
+            zstandard = import_zstandard()
+            if compression_level is None:
+                compression_level = 3
+            compressor = zstandard.ZstdCompressor(level=compression_level,
+                                                  threads=threads)
+            with open(archive_name, "wb") as archive_file, \
+                    compressor.stream_writer(archive_file) as writer, \
+                    tarfile.open(fileobj=writer, mode="w|") as archive:
+                for name in filenames:
+                    archive.add(name)
+        return archive_name
@@ -0,0 +1,139 @@
+"""autoclasswrapper: Python wrapper for AutoClass C classification.
+
+Opt-in profiling of processing stages
+"""
+
+import contextlib
+import cProfile
+import logging
+import os
+import pstats
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# environment variable that enables profiling of all objects
+PROFILE_ENV_VARIABLE = "AUTOCLASSWRAPPER_PROFILE"
+
+
+def profiling_requested():
+    """Verify profiling is enabled by environment variable.
+
+    Returns
+    -------
+    bool
+        True if AUTOCLASSWRAPPER_PROFILE is set to a value
+        other than "", "0", "false" or "no".
+
+    """
+    value = os.environ.get(PROFILE_ENV_VARIABLE, "")
+    return value.strip().lower() not in ("", "0", "false", "no")
+
+
+class Profiler():
+    """Profile processing stages with cProfile.
+
+    For each stage, a profile file "<stage>.prof" is written,
+    that can be read with pstats or visualised with snakeviz.
+    Functions with the highest internal time are appended
+    to a "summary.txt" file.
+    When stages are nested, only the outermost stage is profiled.
+    Nesting is tracked per thread: stages running in different threads
+    are profiled separately.
+
+    Parameters
+    ----------
+    profile_dir : string or None
+        Directory to write profiles to.
+        If None, profiling is disabled.
+    top_n : int, optional (default: 20)
+        Number of functions listed in summary for each stage.
+
+    """
+
+    def __init__(self, profile_dir, top_n=20):
+        """Instantiate object."""
+        self.profile_dir = profile_dir
+        self.top_n = top_n
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    @property
+    def depth(self):
+        """Number of stages running in the calling thread."""
+        return getattr(self.local, "depth", 0)
+
+    @depth.setter
+    def depth(self, value):
+        self.local.depth = value
+
+    @property
+    def enabled(self):
+        """Profiling is enabled."""
+        return self.profile_dir is not None
+
+    @contextlib.contextmanager
+    def profile(self, stage):
+        """Profile a stage.
+
+        Parameters
+        ----------
+        stage : string
+            Name of stage.
+
+        """
+        if not self.enabled or self.depth > 0:
+            self.depth += 1
+            try:
+                yield
+            finally:
+                self.depth -= 1
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # another profiler (or coverage tool) is already active
+            log.warning(f"Cannot profile {stage}: {e}")
+            profiler = None
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if profiler is not None:
+                profiler.disable()
+                self.write(stage, profiler, time.perf_counter() - start)
+
+    def write(self, stage, profiler, duration):
+        """Write profile and summary of a stage.
+
+        Parameters
+        ----------
+        stage : string
+            Name of stage.
+        profiler : cProfile.Profile() object
+            Profile of stage.
+        duration : float
+            Wall time of stage, in seconds.
+
+        """
+        os.makedirs(self.profile_dir, exist_ok=True)
+        with self.lock:
+            # stages run several times get numbered profiles
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            name = stage
+            if self.counts[stage] > 1:
+                name += f".{self.counts[stage]}"
+            prof_name = os.path.join(self.profile_dir, name + ".prof")
+            profiler.dump_stats(prof_name)
+            summary_name = os.path.join(self.profile_dir, "summary.txt")
+            with open(summary_name, "a") as summary:
+                summary.write(f"{'=' * 79}\n{name} ({duration:.3f} s)\n")
+                stats = pstats.Stats(profiler, stream=summary)
+                stats.strip_dirs().sort_stats("tottime").print_stats(
+                    self.top_n)
+        log.debug(f"Wrote profile of {stage} in {prof_name}")
@@ -3,7 +3,12 @@
 Create run script and run classification
 """
 
-from .tools import get_autoclass_version
+from .cache import ArtifactCache, hash_file, hash_items, unlink
+from .metrics import Metrics
+from .profiling import Profiler, profiling_requested
+from .scratch import SCRATCH_CLEANUP, ScratchDir
+from .tools import (INTERIM_ROOT_SUFFIX, REPORT_FILES, get_autoclass_version,
+                    read_report_type)
 
 import logging
 import os
@@ -16,7 +21,7 @@ RUN_SCRIPT_CONTENT = """
 autoclass -search {0}.db2 {0}.hd2 {0}.model {0}.s-params >autoclass-search.log 2>&1 <<EOF
 y
 EOF
-autoclass -reports {0}.results-bin {0}.search {0}.r-params >autoclass-report.log 2>&1
+{1}autoclass -reports {0}.results-bin {0}.search {0}.r-params >autoclass-report.log 2>&1
 
 if [ $? -eq 0 ]
 then
@@ -26,6 +31,122 @@ else
 fi
 """
 
+# started in background before the search when interim reports are requested
+# {0} is the root name, {1} the interim root name, {2} the period (seconds)
+# reports are generated from a copy of the current results,
+# then renamed so that readers never see partial report files
+# sleep and autoclass run in background so that the TERM trap
+# stops them immediately instead of leaving them orphaned
+RUN_SCRIPT_INTERIM_CONTENT = """
+(
+child=
+trap 'kill $child 2>/dev/null; wait $child 2>/dev/null; exit 0' TERM
+while true
+do
+    sleep {2} &
+    child=$!
+    wait $child
+    if [ -e {0}.results-bin ] && [ -e {0}.search ]
+    then
+        for ext in .results-bin .search .r-params
+        do
+            cp {0}$ext {1}.tmp$ext
+        done
+        autoclass -reports {1}.tmp.results-bin {1}.tmp.search \\
+            {1}.tmp.r-params >autoclass-interim-report.log 2>&1 &
+        child=$!
+        if wait $child
+        then
+            for ext in .case-data-1 .class-data-1 .influ-o-data-1
+            do
+                if [ -e {1}.tmp$ext ]
+                then
+                    mv {1}.tmp$ext {1}$ext
+                fi
+            done
+        fi
+    fi
+done
+) &
+interim_pid=$!
+"""
+
+# stops interim reports after the search,
+# before the final reports and the run markers
+RUN_SCRIPT_INTERIM_STOP_CONTENT = """kill $interim_pid 2>/dev/null
+wait $interim_pid 2>/dev/null
+"""
+
+# appended to run script when results are cached
+# $2 is the cache entry directory
+RUN_SCRIPT_CACHE_CONTENT = """
+if [ -n "$2" ] && [ -e autoclass-run-success ]
+then
+    tmp_entry="$2.tmp$$"
+    mkdir -p "$tmp_entry"
+    for ext in {1}
+    do
+        if [ -e {0}$ext ]
+        then
+            cp {0}$ext "$tmp_entry/$ext"
+        fi
+    done
+    cp {2} "$tmp_entry/"
+    chmod a-w "$tmp_entry"/*
+    rm -rf "$2"
+    mv "$tmp_entry" "$2"
+fi
+"""
+
+# appended to run script when AutoClass C runs in a scratch directory
+# $3 is the directory to copy artifacts back to, $4 the cleanup policy
+# markers are copied last: artifacts are complete when they appear
+RUN_SCRIPT_SCRATCH_CONTENT = """
+if [ -n "$3" ]
+then
+    for name in {0}
+    do
+        if [ -e "$name" ]
+        then
+            cp "$name" "$3/"
+        fi
+    done
+    for name in {1}
+    do
+        if [ -e $name ]
+        then
+            cp $name "$3/"
+        fi
+    done
+    if [ "$4" = "always" ] \\
+        || ( [ "$4" = "on_success" ] && [ -e autoclass-run-success ] )
+    then
+        scratch_dir=$(pwd)
+        cd "$3" && rm -rf "$scratch_dir"
+    fi
+fi
+"""
+
+# files that define a classification
+RUN_INPUT_EXTENSIONS = (".db2", ".hd2", ".model", ".s-params", ".r-params")
+# files produced by AutoClass C
+RUN_RESULT_EXTENSIONS = (".results-bin", ".search", ".log", ".rlog",
+                         ".case-data-1", ".class-data-1", ".influ-o-data-1")
+# search results required in cache, report files depend on .r-params
+RUN_REQUIRED_EXTENSIONS = (".results-bin", ".search")
+RUN_LOG_FILES = ("autoclass-search.log", "autoclass-report.log")
+# files created at the end of the run script
+RUN_MARKER_FILES = ("autoclass-run-success", "autoclass-run-failure")
+# files copied back from scratch directory by default
+RUN_SCRATCH_ARTIFACTS = RUN_RESULT_EXTENSIONS + RUN_LOG_FILES
+# AutoClass C default numbers of classes to start the search with
+DEFAULT_START_J_LIST = (2, 3, 5, 7, 10, 15, 25)
+# heuristic memory model of AutoClass C (in bytes):
+# fixed overhead + parsed data + case/class membership weights
+MEMORY_BASE = 64 * 1024**2
+MEMORY_PER_DB2_BYTE = 4
+MEMORY_PER_CASE_CLASS = 16
+
 log = logging.getLogger(__name__)
 
 
@@ -42,22 +163,148 @@ class Run():
         If True, countinue generation of autoclass input files even if an
         error is encounter.
         If False, stop at first error.
+    cache_dir : string, optional (default: None)
+        Directory to cache results of reproducible runs.
+        Cache entries are keyed by the content of .db2, .hd2, .model,
+        .s-params and .r-params files.
+        On a cache hit, results are restored and AutoClass C is not run.
+        Only runs with reproducible parameters are cached
+        (see Input.create_sparams_file()).
+        If None, no cache is used.
+    cache_max_entries : int or None, optional (default: 20)
+        Maximum number of entries in cache.
+        Least recently used entries are evicted first.
+    cache_max_size : int or None, optional (default: None)
+        Maximum size of cache, in bytes.
+        Least recently used entries are evicted first.
+    work_dir : string, optional (default: None)
+        Directory of AutoClass C input files, where the run script is
+        written and results are collected.
+        If None, the current directory is used.
+    scratch_dir : string, optional (default: None)
+        Base directory of a scratch directory (for instance on a local
+        disk or on tmpfs) where AutoClass C runs.
+        Input files are staged into a new scratch directory before the
+        run, and artifacts are copied back into work_dir at the end.
+        "auto" means /dev/shm if available, otherwise $TMPDIR.
+        If None, AutoClass C runs in work_dir.
+    scratch_artifacts : list of strings, optional (default: None)
+        Files copied back from the scratch directory.
+        Items starting with "." are extensions of root_name
+        (".results-bin", ".case-data-1"...), others are file names.
+        If None, all results, reports and log files are copied back.
+    scratch_cleanup : string, optional (default: "on_success")
+        When to remove the scratch directory at the end of the run:
+        "always", "on_success" or "never".
+    executor : Executor() object, optional (default: None)
+        Executor that runs AutoClass C on a worker: local process pool,
+        remote host through SSH or directory queue on a shared file system
+        (see autoclasswrapper.executors).
+        Input files are shipped to the worker and results are pulled back
+        into work_dir. Cannot be used with a scratch directory.
+        If None, AutoClass C runs as a local background process.
+    metrics : Metrics() object, optional (default: None)
+        Metrics of processing stages. Can be shared with other
+        Input, Run and Output objects.
+        If None, a new Metrics() object is created.
+    profile : bool, optional (default: False)
+        If True, profile each stage with cProfile and write profiles
+        and a summary of hot functions in the "<root_name>-profile" directory.
+        Profiling is also enabled by setting the AUTOCLASSWRAPPER_PROFILE
+        environment variable to 1.
 
     Attributes
     ----------
     had_error : bool (defaut False)
         Set to True if an error has been found in the generation of autoclass
         input files.
+    metrics : Metrics() object
+        Wall time, CPU time, memory, rows and bytes of each stage.
+    profiler : Profiler() object
+        Profiler of stages, disabled by default.
+    cache : ArtifactCache() object (default: None)
+        Cache of AutoClass C results.
+    cache_hit : bool (default: False)
+        Set to True if results were restored from cache.
+    scratch : ScratchDir() object (default: None)
+        Scratch directory of the current run.
+    process : subprocess.Popen() object (default: None)
+        Process of the run script started by run().
+    future : concurrent.futures.Future() object (default: None)
+        Future of the exit status of the run script submitted
+        to an executor by run().
+    run_dir : string
+        Directory where AutoClass C runs: work_dir,
+        or the scratch directory once run() is called.
 
     """
 
     def __init__(self,
                  root_name="autoclass",
-                 tolerate_error=False):
+                 tolerate_error=False,
+                 cache_dir=None,
+                 cache_max_entries=20,
+                 cache_max_size=None,
+                 work_dir=None,
+                 scratch_dir=None,
+                 scratch_artifacts=None,
+                 scratch_cleanup="on_success",
+                 executor=None,
+                 metrics=None,
+                 profile=False):
         """Instantiate object."""
         self.root_name = root_name
+        self.work_dir = work_dir if work_dir is not None else os.curdir
         self.tolerate_error = tolerate_error
         self.had_error = False
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.profiler = Profiler(
+            self.root_name + "-profile"
+            if profile or profiling_requested() else None)
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = ArtifactCache(cache_dir,
+                                       max_entries=cache_max_entries,
+                                       max_size=cache_max_size)
+        self.cache_hit = False
+        if scratch_cleanup not in SCRATCH_CLEANUP:
+            raise ValueError(f"Unknown cleanup policy '{scratch_cleanup}'. "
+                             f"Available: {', '.join(SCRATCH_CLEANUP)}")
+        if scratch_dir is not None and os.path.dirname(root_name):
+            raise ValueError("Root name cannot contain a directory "
+                             "with a scratch directory. Use work_dir")
+        if executor is not None and scratch_dir is not None:
+            raise ValueError("Cannot use a scratch directory "
+                             "with an executor")
+        if executor is not None and os.path.dirname(root_name):
+            raise ValueError("Root name cannot contain a directory "
+                             "with an executor. Use work_dir")
+        self.scratch_dir = scratch_dir
+        self.scratch_artifacts = (scratch_artifacts
+                                  if scratch_artifacts is not None
+                                  else RUN_SCRATCH_ARTIFACTS)
+        self.scratch_cleanup = scratch_cleanup
+        self.scratch = None
+        self.run_dir = self.work_dir
+        self.executor = executor
+        self.process = None
+        self.future = None
+
+    def get_path(self, name):
+        """Get path of a file in work directory.
+
+        Parameters
+        ----------
+        name : string
+            Name of file.
+
+        Returns
+        -------
+        path : string
+            Path of file.
+
+        """
+        return os.path.join(self.work_dir, name)
 
     def handle_error(f):
         """Handle error during data parsing and formating.
@@ -75,25 +322,75 @@ class Run():
         """
         def try_function(self, *args, **kwargs):
             if self.tolerate_error or not self.had_error:
-                try:
-                    return f(self, *args, **kwargs)
-                except Exception as e:
-                    for line in str(e).split("\n"):
-                        log.error(line)
-                    self.had_error = True
+                stage = f"{type(self).__name__}.{f.__name__}"
+                with self.metrics.measure(stage) as record, \
+                        self.profiler.profile(stage):
+                    try:
+                        return f(self, *args, **kwargs)
+                    except Exception as e:
+                        for line in str(e).split("\n"):
+                            log.error(line)
+                        self.had_error = True
+                        record["error"] = True
         try_function.__name__ = f.__name__
         try_function.__doc__ = f.__doc__
         return try_function
 
     @handle_error
-    def create_run_file(self):
-        """Create bash script that runs AutoClass C."""
+    def create_run_file(self, interim_period=None):
+        """Create bash script that runs AutoClass C.
+
+        Parameters
+        ----------
+        interim_period : int, optional (default: None)
+            Period in seconds to generate interim reports
+            from current results while the search is running.
+            Interim reports are written with the root name
+            "<root_name>-interim" and can be read with
+            Output.extract_interim_results().
+            If None, reports are only generated at the end of the search.
+
+        """
         log.info("Writing run file")
-        run_name = self.root_name + ".sh"
+        run_name = self.get_path(self.root_name + ".sh")
         with open(run_name, "w") as runfile:
+            interim_stop = ""
+            if interim_period is not None:
+                if interim_period <= 0:
+                    raise ValueError("Period of interim reports "
+                                     "must be positive")
+                log.info("Interim reports will be generated "
+                         f"every {interim_period} seconds")
+                runfile.write(RUN_SCRIPT_INTERIM_CONTENT.format(
+                    self.root_name,
+                    self.root_name + INTERIM_ROOT_SUFFIX,
+                    interim_period))
+                interim_stop = RUN_SCRIPT_INTERIM_STOP_CONTENT
             # the "y" parameter is to validate warning
             # in case of a reproducible run
-            runfile.write(RUN_SCRIPT_CONTENT.format(self.root_name))
+            runfile.write(RUN_SCRIPT_CONTENT.format(self.root_name,
+                                                    interim_stop))
+            if self.cache is not None:
+                runfile.write(RUN_SCRIPT_CACHE_CONTENT.format(
+                    self.root_name,
+                    " ".join(RUN_RESULT_EXTENSIONS),
+                    " ".join(RUN_LOG_FILES)))
+            if self.scratch_dir is not None:
+                runfile.write(RUN_SCRIPT_SCRATCH_CONTENT.format(
+                    " ".join(self.get_scratch_artifacts()),
+                    " ".join(RUN_MARKER_FILES)))
+
+    def get_scratch_artifacts(self):
+        """Get names of files copied back from scratch directory.
+
+        Returns
+        -------
+        filenames : list of strings
+            Names of files.
+
+        """
+        return [self.root_name + name if name.startswith(".") else name
+                for name in self.scratch_artifacts]
 
     @handle_error
     def create_run_file_test(self, time=60):
@@ -109,7 +406,7 @@ class Run():
 
         """
         log.info("Writing dummy run file")
-        run_name = self.root_name + ".sh"
+        run_name = self.get_path(self.root_name + ".sh")
         log_name = self.root_name + ".log"
         rlog_name = self.root_name + ".rlog"
         with open(run_name, "w") as runfile:
@@ -120,20 +417,242 @@ class Run():
             runfile.write("done \n")
             runfile.write(f"touch {rlog_name} \n")
 
+    def is_reproducible(self):
+        """Verify search parameters lead to a reproducible run.
+
+        Returns
+        -------
+        bool
+            True if random seed is fixed and start function is "block".
+
+        """
+        sparams_name = self.get_path(self.root_name + ".s-params")
+        with open(sparams_name, "r") as sparams:
+            params = [line.replace(" ", "").strip() for line in sparams]
+        return ("randomize_random_p=false" in params
+                and 'start_fn_type="block"' in params)
+
+    def get_start_j_list(self):
+        """Read numbers of classes to start the search with.
+
+        Returns
+        -------
+        start_j_list : list of int
+            Values of start_j_list in .s-params file,
+            or AutoClass C default values.
+
+        """
+        sparams_name = self.get_path(self.root_name + ".s-params")
+        with open(sparams_name, "r") as sparams:
+            for line in sparams:
+                name, _, value = line.partition("=")
+                if name.strip() == "start_j_list" and value.strip():
+                    return [int(j) for j in value.split(",")]
+        return list(DEFAULT_START_J_LIST)
+
+    def estimate_memory(self):
+        """Estimate memory used by AutoClass C.
+
+        The estimate grows with the size of the .db2 file (parsed data)
+        and with the number of cases times the largest number of classes
+        in start_j_list (membership weights).
+        This is a rough upper bound, meant for admission of runs
+        in a RunQueue().
+
+        Returns
+        -------
+        memory : int
+            Estimated memory, in bytes.
+
+        """
+        db2_name = self.get_path(self.root_name + ".db2")
+        db2_size = os.path.getsize(db2_name)
+        case_number = 0
+        with open(db2_name, "rb") as db2:
+            for chunk in iter(lambda: db2.read(1 << 20), b""):
+                case_number += chunk.count(b"\n")
+        class_number = max(self.get_start_j_list())
+        return (MEMORY_BASE
+                + MEMORY_PER_DB2_BYTE * db2_size
+                + MEMORY_PER_CASE_CLASS * case_number * class_number)
+
+    def get_cache_key(self):
+        """Compute cache key of AutoClass C results.
+
+        Returns
+        -------
+        key : string
+            Digest of AutoClass C input files content.
+
+        """
+        return hash_items([hash_file(self.get_path(self.root_name + ext))
+                           for ext in RUN_INPUT_EXTENSIONS])
+
+    def get_report_extensions(self):
+        """Get extensions of report files expected from AutoClass C.
+
+        Returns
+        -------
+        extensions : tuple of strings
+            Extensions of report files, according to report_type
+            in .r-params file.
+
+        """
+        report_type = read_report_type(
+            self.get_path(self.root_name + ".r-params"))
+        return REPORT_FILES.get(report_type, REPORT_FILES["all"])
+
+    def restore_cached_results(self, key):
+        """Restore AutoClass C results from cache.
+
+        Parameters
+        ----------
+        key : string
+            Cache key.
+
+        """
+        for ext in RUN_RESULT_EXTENSIONS:
+            if self.cache.contains(key, [ext]):
+                self.cache.restore(key, ext,
+                                   self.get_path(self.root_name + ext))
+        for name in RUN_LOG_FILES:
+            if self.cache.contains(key, [name]):
+                self.cache.restore(key, name, self.get_path(name))
+        unlink(self.get_path("autoclass-run-failure"))
+        open(self.get_path("autoclass-run-success"), "w").close()
+
+    def remove_previous_results(self):
+        """Remove results and log files of a previous run from work_dir.
+
+        Results restored from cache are hard links: new results
+        are written into new files so that cache entries are never
+        overwritten.
+        """
+        for ext in RUN_RESULT_EXTENSIONS:
+            unlink(self.get_path(self.root_name + ext))
+        for name in RUN_LOG_FILES:
+            unlink(self.get_path(name))
+
+    def store_cached_results(self, key):
+        """Store AutoClass C results of a successful run in cache.
+
+        Used with executors, since the cache directory may not be
+        available on workers.
+
+        Parameters
+        ----------
+        key : string
+            Cache key.
+
+        """
+        if not os.path.exists(self.get_path("autoclass-run-success")):
+            return
+        for ext in RUN_RESULT_EXTENSIONS:
+            filename = self.get_path(self.root_name + ext)
+            if os.path.isfile(filename):
+                self.cache.store(key, filename, ext)
+        for name in RUN_LOG_FILES:
+            if os.path.isfile(self.get_path(name)):
+                self.cache.store(key, self.get_path(name), name)
+        log.info(f"Stored results in cache (entry {key[:12]})")
+
+    def stage_input_files(self):
+        """Stage input files and run script into a new scratch directory.
+
+        Markers of a previous run are removed from work_dir,
+        since markers are copied back at the end of the run.
+        """
+        base_dir = self.scratch_dir
+        if base_dir == "auto":
+            base_dir = None
+        self.scratch = ScratchDir(base_dir, prefix=self.root_name + "-")
+        self.run_dir = self.scratch.path
+        names = [self.root_name + ext
+                 for ext in RUN_INPUT_EXTENSIONS + (".sh",)]
+        size = self.scratch.stage([self.get_path(name) for name in names])
+        self.metrics.count(bytes=size)
+        for name in RUN_MARKER_FILES:
+            unlink(self.get_path(name))
+
     @handle_error
-    def run(self, tag=""):
+    def run(self, tag="", command_prefix=None):
         """Run AutoClass C classification.
 
         autoclass-c executable must be in PATH!
 
+        If a cache is used and search parameters are reproducible,
+        results are restored from cache when available.
+        Otherwise, results are stored in cache at the end of the run.
+        Results of a previous run are removed before AutoClass C starts.
+
+        If a scratch directory is used, input files are staged into it
+        and AutoClass C runs there. Artifacts and the
+        autoclass-run-success (or autoclass-run-failure) file are copied
+        back into work_dir at the end of the run.
+
+        If an executor is used, the run is submitted to it and
+        the exit status of the run script is available from future.
+        autoclass-c executable must be in PATH of workers.
+
         Parameters
         ----------
         tag : string (default: ""), optional
             Tag to identify the autoclass run among other processes
+        command_prefix : list of strings (default: None), optional
+            Command that starts the run script, for instance to set
+            resource limits: ["nice", "-n", "10"].
+            Not used with an executor.
 
         """
+        self.process = None
+        self.future = None
+        key = None
+        cache_entry = ""
+        if self.cache is not None:
+            if self.is_reproducible():
+                key = self.get_cache_key()
+                self.cache_hit = self.cache.contains(
+                    key,
+                    RUN_REQUIRED_EXTENSIONS + self.get_report_extensions())
+                if self.cache_hit:
+                    log.info("Found results in cache "
+                             f"(entry {key[:12]}), skipping AutoClass C")
+                    self.restore_cached_results(key)
+                    return
+                self.cache.evict()
+                cache_entry = os.path.abspath(self.cache.entry_path(key))
+            else:
+                key = None
+                log.info("Search parameters are not reproducible, "
+                         "results will not be cached")
+        if self.executor is not None:
+            log.info("Submitting clustering to "
+                     f"{type(self.executor).__name__}...")
+            self.remove_previous_results()
+            for name in RUN_MARKER_FILES:
+                unlink(self.get_path(name))
+            callback = None
+            if key is not None:
+                def callback(returncode):
+                    self.store_cached_results(key)
+            self.future = self.executor.submit(self, tag, callback)
+            return
         if get_autoclass_version():
             log.info("Running clustering...")
+            self.remove_previous_results()
             run_name = self.root_name + ".sh"
-            proc = subprocess.Popen(["nohup", "bash", run_name, tag],
-                                    env=os.environ)
+            if cache_entry:
+                # results are cached only after a successful run
+                unlink(self.get_path("autoclass-run-success"))
+            scratch_args = []
+            if self.scratch_dir is not None:
+                self.stage_input_files()
+                scratch_args = [os.path.abspath(self.work_dir),
+                                self.scratch_cleanup]
+            if command_prefix is None:
+                command_prefix = []
+            self.process = subprocess.Popen(["nohup", *command_prefix,
+                                             "bash", run_name, tag,
+                                             cache_entry, *scratch_args],
+                                            cwd=self.run_dir,
+                                            env=os.environ)
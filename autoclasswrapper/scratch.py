@@ -0,0 +1,89 @@
+"""autoclasswrapper: Python wrapper for AutoClass C classification.
+
+Scratch directories to run AutoClass C on fast local storage
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+
+log = logging.getLogger(__name__)
+
+# policies to remove scratch directories at the end of a run
+SCRATCH_CLEANUP = ("always", "on_success", "never")
+# memory-backed file system, used by default if available
+SHM_DIR = "/dev/shm"
+
+
+def default_scratch_base():
+    """Get default base directory of scratch directories.
+
+    Returns
+    -------
+    base_dir : string
+        /dev/shm (tmpfs) if available and writable,
+        otherwise $TMPDIR (or the system temporary directory).
+
+    """
+    if os.path.isdir(SHM_DIR) and os.access(SHM_DIR, os.W_OK | os.X_OK):
+        return SHM_DIR
+    return tempfile.gettempdir()
+
+
+class ScratchDir():
+    """Unique temporary directory on fast local storage.
+
+    Parameters
+    ----------
+    base_dir : string, optional (default: None)
+        Directory in which the scratch directory is created.
+        If None, /dev/shm is used if available, otherwise $TMPDIR.
+    prefix : string, optional (default: "autoclasswrapper-")
+        Prefix of the scratch directory name.
+
+    Attributes
+    ----------
+    path : string
+        Absolute path of the scratch directory.
+
+    """
+
+    def __init__(self,
+                 base_dir=None,
+                 prefix="autoclasswrapper-"):
+        """Instantiate object."""
+        if base_dir is None:
+            base_dir = default_scratch_base()
+        os.makedirs(base_dir, exist_ok=True)
+        self.path = os.path.abspath(tempfile.mkdtemp(prefix=prefix,
+                                                     dir=base_dir))
+        log.debug(f"Created scratch directory {self.path}")
+
+    def stage(self, filenames):
+        """Copy files into the scratch directory.
+
+        Parameters
+        ----------
+        filenames : list of strings
+            Names of files to copy. Missing files are skipped.
+
+        Returns
+        -------
+        size : int
+            Number of bytes copied.
+
+        """
+        size = 0
+        for name in filenames:
+            if not os.path.isfile(name):
+                continue
+            shutil.copy2(name, self.path)
+            size += os.path.getsize(name)
+        log.info(f"Staged {size} bytes into {self.path}")
+        return size
+
+    def remove(self):
+        """Remove the scratch directory and its content."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        log.debug(f"Removed scratch directory {self.path}")
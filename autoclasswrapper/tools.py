@@ -3,12 +3,25 @@
 Utilities.
 """
 
+import gzip
+import importlib
 import logging
+import os
 import shutil
 import subprocess
 
 log = logging.getLogger(__name__)
 
+# supported compression codecs and file extensions
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# appended to root name of interim report files
+INTERIM_ROOT_SUFFIX = "-interim"
+# report files written by AutoClass C for each report_type of .r-params
+REPORT_FILES = {"all": (".influ-o-data-1", ".case-data-1", ".class-data-1"),
+                "influence_values": (".influ-o-data-1",),
+                "xref_case": (".case-data-1",),
+                "xref_class": (".class-data-1",)}
+
 
 def search_autoclass_in_path():
     """Search if AutoClass C executable is in PATH.
@@ -49,3 +62,95 @@ def get_autoclass_version():
         log.error("AutoClass C is in PATH but cannot be run (unknown reason)")
     finally:
         return version
+
+
+def import_zstandard():
+    """Import zstandard module (optional dependency).
+
+    Returns
+    -------
+    module
+        zstandard module.
+
+    Raises
+    ------
+    ImportError
+        If zstandard is not installed.
+
+    """
+    try:
+        return importlib.import_module("zstandard")
+    except ImportError:
+        raise ImportError("zstd compression requires "
+                          "the 'zstandard' package")
+
+
+def find_file(filename):
+    """Find file, possibly compressed.
+
+    Parameters
+    ----------
+    filename : string
+        Name of uncompressed file.
+
+    Returns
+    -------
+    filename : string
+        Name of existing file, with compression extension if the
+        uncompressed file does not exist and a compressed file does.
+
+    """
+    if os.path.exists(filename):
+        return filename
+    for extension in COMPRESSION_EXTENSIONS.values():
+        if os.path.exists(filename + extension):
+            return filename + extension
+    return filename
+
+
+def read_report_type(rparams_name):
+    """Read report type from AutoClass C report parameters.
+
+    Parameters
+    ----------
+    rparams_name : string
+        Name of .r-params file.
+
+    Returns
+    -------
+    report_type : string
+        Value of report_type parameter.
+        "all" (AutoClass C default) if the parameter
+        or the file is missing.
+
+    """
+    if not os.path.isfile(rparams_name):
+        return "all"
+    with open(rparams_name, "r") as rparams:
+        for line in rparams:
+            name, _, value = line.partition("=")
+            if name.strip() == "report_type":
+                return value.strip().strip('"')
+    return "all"
+
+
+def open_text(filename):
+    """Open text file for reading, possibly compressed.
+
+    Compression is guessed from file extension (.gz or .zst).
+
+    Parameters
+    ----------
+    filename : string
+        Name of file.
+
+    Returns
+    -------
+    file object
+
+    """
+    if filename.endswith(COMPRESSION_EXTENSIONS["gzip"]):
+        return gzip.open(filename, "rt")
+    if filename.endswith(COMPRESSION_EXTENSIONS["zstd"]):
+        return import_zstandard().open(filename, "rt")
+    return open(filename, "r")
@@ -0,0 +1,54 @@
+"""Benchmark parallel parsing of .case-data-1 files by extract_results().
+
+Usage:
+
+    python benchmarks/bench_case_data.py [--cases 1000000] [--classes 100]
+                                         [--max-jobs 8]
+
+A synthetic .case-data-1 file is parsed with 1, 2, 4... processes.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+if __name__ == "__main__":
+    # benchmark the working tree rather than an installed release
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_write_cdt import timeit, wrapper
+from synthetic import write_case_data
+
+
+def main():
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--cases", type=int, default=1_000_000)
+    parser.add_argument("--classes", type=int, default=100)
+    parser.add_argument("--max-jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    logging.getLogger("autoclasswrapper").setLevel(logging.WARNING)
+    # parse in parallel whatever the file size
+    wrapper.output.PARALLEL_PARSING_MIN_SIZE = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        write_case_data("autoclass.case-data-1", args.cases, args.classes)
+        size = os.path.getsize("autoclass.case-data-1") / 1e6
+        print(f"{args.cases} cases, {args.classes} classes, {size:.1f} MB "
+              f"({os.cpu_count()} CPU cores)")
+        print(f"{'jobs':>5} {'time (s)':>10} {'speedup':>8}")
+        n_jobs = 1
+        reference = None
+        while n_jobs <= args.max_jobs:
+            results = wrapper.Output()
+            duration = timeit(results.extract_results, n_jobs=n_jobs)
+            reference = reference or duration
+            print(f"{n_jobs:>5} {duration:>10.2f} "
+                  f"{reference / duration:>8.2f}")
+            n_jobs *= 2
+
+
+if __name__ == "__main__":
+    main()
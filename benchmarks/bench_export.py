@@ -0,0 +1,75 @@
+"""Benchmark file size and load time of Output.export() formats.
+
+Usage:
+
+    python benchmarks/bench_export.py [--rows 1000000] [--classes 100]
+                                      [--columns 10]
+
+Formats whose dependencies are missing are skipped.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+if __name__ == "__main__":
+    # benchmark the working tree rather than an installed release
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_write_cdt import make_output, timeit
+
+
+# format, compression, required module, reader
+CASES = [
+    ("parquet", "snappy", "pyarrow", pd.read_parquet),
+    ("parquet", "zstd", "pyarrow", pd.read_parquet),
+    ("feather", "lz4", "pyarrow", pd.read_feather),
+    ("feather", "zstd", "pyarrow", pd.read_feather),
+    ("hdf5", None, "tables", lambda name: pd.read_hdf(name, "results")),
+    ("hdf5", "blosc", "tables", lambda name: pd.read_hdf(name, "results")),
+]
+
+
+def main():
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--classes", type=int, default=100)
+    parser.add_argument("--columns", type=int, default=10)
+    args = parser.parse_args()
+    logging.getLogger("autoclasswrapper").setLevel(logging.WARNING)
+    results = make_output(args.rows, args.classes, args.columns)
+    print(f"{args.rows} rows, {args.classes} classes, "
+          f"{args.columns} columns")
+    print(f"{'format':<10} {'codec':<8} {'write (s)':>10} "
+          f"{'load (s)':>10} {'size (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        filename = results.root_out_name + ".tsv"
+        write = timeit(results.df.to_csv, filename, sep="\t")
+        load = timeit(pd.read_csv, filename, sep="\t", index_col=0)
+        size = os.path.getsize(filename) / 1e6
+        print(f"{'tsv':<10} {'-':<8} {write:>10.2f} {load:>10.2f} "
+              f"{size:>10.1f}")
+        for file_format, codec, module, reader in CASES:
+            if importlib.util.find_spec(module) is None:
+                print(f"{file_format:<10} skipped ({module} not installed)")
+                continue
+            start = time.perf_counter()
+            filename = results.export(file_format, compression=codec)[0]
+            write = time.perf_counter() - start
+            load = timeit(reader, filename)
+            size = os.path.getsize(filename) / 1e6
+            print(f"{file_format:<10} {str(codec):<8} {write:>10.2f} "
+                  f"{load:>10.2f} {size:>10.1f}")
+            os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Benchmark time and peak memory of every stage of a classification.
+
+This module is an asv (airspeed velocity) benchmark suite:
+
+    asv run            # benchmark commits, see asv.conf.json
+    asv compare HEAD~1 HEAD
+
+It can also be run directly on the working tree:
+
+    python benchmarks/bench_stages.py [--rows 10000 100000]
+        [--output results.json] [--compare previous.json]
+
+Results saved with --output include the current commit, so that
+timings of several commits can be compared with --compare.
+AutoClass C itself is not run: results are synthetic.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+if __name__ == "__main__":
+    # benchmark the working tree rather than an installed release
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import autoclasswrapper as wrapper
+from synthetic import (DATA_TYPES, make_dataset, write_case_data,
+                       write_dataset)
+
+logging.getLogger("autoclasswrapper").setLevel(logging.ERROR)
+
+ROWS = (10_000, 100_000)
+COLUMNS = 10
+CLASSES = 20
+MISSING_RATE = 0.01
+
+
+def dataset_name(rows, data_type):
+    """Name of synthetic input data file."""
+    return f"bench-{data_type.replace(' ', '-')}-{rows}.tsv"
+
+
+def results_root(rows):
+    """Root name of synthetic AutoClass C results."""
+    return f"bench-results-{rows}"
+
+
+class DatasetStages:
+    """Reading and checking one input data file."""
+
+    params = (ROWS, DATA_TYPES)
+    param_names = ("rows", "data_type")
+    timeout = 600
+
+    def setup_cache(self):
+        for rows in ROWS:
+            for data_type in DATA_TYPES:
+                write_dataset(dataset_name(rows, data_type),
+                              make_dataset(rows, COLUMNS, data_type,
+                                           classes=CLASSES,
+                                           missing_rate=MISSING_RATE))
+
+    def setup(self, rows, data_type):
+        self.dataset = wrapper.input.Dataset(dataset_name(rows, data_type),
+                                             data_type, 0.01)
+        self.dataset.read_datafile()
+
+    def time_read_datafile(self, rows, data_type):
+        self.dataset.read_datafile()
+
+    def peakmem_read_datafile(self, rows, data_type):
+        self.dataset.read_datafile()
+
+    def time_check_data_type(self, rows, data_type):
+        self.dataset.check_data_type()
+
+
+class InputStages:
+    """Preparation of AutoClass C input files."""
+
+    params = (ROWS,)
+    param_names = ("rows",)
+    timeout = 600
+
+    def setup_cache(self):
+        DatasetStages.setup_cache(self)
+
+    def setup(self, rows):
+        self.clust = wrapper.Input(f"bench-input-{rows}", tolerate_error=True)
+        for data_type in DATA_TYPES:
+            self.clust.add_input_data(dataset_name(rows, data_type),
+                                      data_type)
+        self.clust.prepare_input_data()
+
+    def time_prepare_input_data(self, rows):
+        self.clust.prepare_input_data()
+
+    def peakmem_prepare_input_data(self, rows):
+        self.clust.prepare_input_data()
+
+    def time_create_db2_file(self, rows):
+        self.clust.create_db2_file()
+
+    def time_create_hd2_file(self, rows):
+        self.clust.create_hd2_file()
+
+    def time_create_model_file(self, rows):
+        self.clust.create_model_file()
+
+    def time_create_sparams_file(self, rows):
+        self.clust.create_sparams_file()
+
+    def time_create_rparams_file(self, rows):
+        self.clust.create_rparams_file()
+
+
+class OutputStages:
+    """Extraction and formatting of AutoClass C results."""
+
+    params = (ROWS,)
+    param_names = ("rows",)
+    timeout = 600
+
+    def setup_cache(self):
+        for rows in ROWS:
+            root_name = results_root(rows)
+            write_dataset(root_name + ".tsv",
+                          make_dataset(rows, COLUMNS, "real location",
+                                       classes=CLASSES,
+                                       missing_rate=MISSING_RATE))
+            write_case_data(root_name + ".case-data-1", rows, CLASSES)
+
+    def setup(self, rows):
+        self.results = wrapper.Output(results_root(rows),
+                                      results_root(rows) + "_out",
+                                      tolerate_error=True)
+        self.results.extract_results()
+        self.results.aggregate_input_data(output_format=None)
+        # used by write_dendrogram(), so that it does not depend
+        # on a previous write_class_stats()
+        self.results.get_class_stats()
+
+    def time_extract_results(self, rows):
+        self.results.extract_results()
+
+    def peakmem_extract_results(self, rows):
+        self.results.extract_results()
+
+    def time_aggregate_input_data(self, rows):
+        self.results.aggregate_input_data()
+
+    def peakmem_aggregate_input_data(self, rows):
+        self.results.aggregate_input_data()
+
+    def time_write_cdt(self, rows):
+        self.results.write_cdt()
+
+    def time_write_cdt_with_proba(self, rows):
+        self.results.write_cdt(with_proba=True)
+
+    def time_write_class_stats(self, rows):
+        self.results.write_class_stats()
+
+    def time_write_dendrogram(self, rows):
+        self.results.write_dendrogram()
+
+
+SUITES = (DatasetStages, InputStages, OutputStages)
+
+
+def iter_params(suite):
+    """Iterate over parameter combinations of a benchmark class."""
+    combinations = [()]
+    for values in suite.params:
+        combinations = [combination + (value,)
+                        for combination in combinations
+                        for value in values]
+    return combinations
+
+
+def run_stage(suite, name, params):
+    """Run one stage, return time (s) and peak memory (MB).
+
+    Peak memory is the peak of memory allocated during the stage,
+    as traced by tracemalloc (numpy and pandas buffers included).
+    """
+    bench = suite()
+    bench.setup(*params)
+    start = time.perf_counter()
+    getattr(bench, name)(*params)
+    duration = time.perf_counter() - start
+    bench = suite()
+    bench.setup(*params)
+    tracemalloc.start()
+    getattr(bench, name)(*params)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return duration, peak
+
+
+def git_commit():
+    """Current commit of the working tree, if any."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """Run all stages on the working tree."""
+    global ROWS
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=list(ROWS))
+    parser.add_argument("--output", help="save results in JSON file")
+    parser.add_argument("--compare", help="compare with saved results")
+    args = parser.parse_args()
+    ROWS = tuple(args.rows)
+    for suite in SUITES:
+        suite.params = (ROWS,) + suite.params[1:]
+    previous = {}
+    if args.compare:
+        with open(args.compare, "r") as saved:
+            previous = json.load(saved)["stages"]
+    output_dir = os.getcwd()
+    stages = {}
+    print(f"{'stage':<55} {'time (s)':>9} {'peak (MB)':>10} {'ratio':>6}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        for suite in SUITES:
+            suite().setup_cache()
+            names = [name for name in dir(suite)
+                     if name.startswith(("time_", "peakmem_"))]
+            stage_names = sorted({name.split("_", 1)[1] for name in names})
+            for params in iter_params(suite):
+                for stage in stage_names:
+                    name = f"time_{stage}"
+                    if not hasattr(suite, name):
+                        name = f"peakmem_{stage}"
+                    key = f"{suite.__name__}.{stage}" + "".join(
+                        f"[{param}]" for param in params)
+                    duration, peak = run_stage(suite, name, params)
+                    stages[key] = {"time": duration, "peakmem": peak}
+                    ratio = ""
+                    if key in previous:
+                        ratio = f"{duration / previous[key]['time']:.2f}"
+                    print(f"{key:<55} {duration:>9.3f} {peak:>10.1f} "
+                          f"{ratio:>6}")
+        os.chdir(output_dir)
+    if args.output:
+        with open(args.output, "w") as saved:
+            json.dump({"commit": git_commit(),
+                       "date": datetime.datetime.now().isoformat(),
+                       "stages": stages},
+                      saved, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark Output.write_cdt() on a large synthetic classification.
+
+Usage:
+
+    python benchmarks/bench_write_cdt.py [--rows 1000000] [--classes 100]
+                                         [--columns 10] [--legacy]
+
+With --legacy, the previous row-wise implementation is also timed.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+if __name__ == "__main__":
+    # benchmark the working tree rather than an installed release
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import autoclasswrapper as wrapper
+
+
+def make_output(rows, classes, columns, seed=0):
+    """Build Output() object with synthetic results.
+
+    Parameters
+    ----------
+    rows : int
+        Number of cases.
+    classes : int
+        Number of classes.
+    columns : int
+        Number of experiment columns.
+    seed : int, optional (default: 0)
+        Seed of random generator.
+
+    Returns
+    -------
+    results : Output() object
+
+    """
+    rng = np.random.default_rng(seed)
+    experiment_names = [f"exp{i+1}" for i in range(columns)]
+    df = pd.DataFrame(rng.normal(size=(rows, columns)),
+                      index=pd.Index([f"case{i+1}" for i in range(rows)],
+                                     name="name"),
+                      columns=experiment_names)
+    proba = rng.dirichlet(np.ones(classes) * 0.1, size=rows)
+    df["main-class"] = proba.argmax(axis=1) + 1
+    df["main-class-proba"] = proba.max(axis=1)
+    df = pd.concat([df,
+                    pd.DataFrame(proba,
+                                 index=df.index,
+                                 columns=[f"class-{i+1}-proba"
+                                          for i in range(classes)])],
+                   axis=1)
+    results = wrapper.Output()
+    results.df = df
+    results.experiment_names = experiment_names
+    results.case_number = rows
+    results.class_number = classes
+    return results
+
+
+def legacy_write_cdt(results, with_proba=False):
+    """Row-wise implementation of Output.write_cdt() (version 1.5.1)."""
+    df_tmp = results.df.copy(deep=True)
+    filename = results.root_out_name + "_legacy.cdt"
+    df_tmp["gweight"] = 1
+    df_tmp["name1"] = df_tmp.index
+    df_tmp["name2"] = df_tmp.index
+    df_tmp["idx"] = np.arange(1, df_tmp.shape[0]+1, dtype=int)
+    df_tmp["gid"] = df_tmp.apply(
+        lambda x: f"GENE{x['idx']:04d}-CL{x['main-class']:03.0f}X",
+        axis=1)
+    df_tmp.sort_values(by=["main-class", "main-class-proba"],
+                       ascending=[True, False],
+                       inplace=True)
+    col_names = ["gid", "name1", "name2", "gweight"]
+    col_names += results.experiment_names
+    if with_proba:
+        col_names += [f"class-{i+1}-proba"
+                      for i in range(results.class_number)]
+    with open(filename, "w") as cdtfile:
+        for class_idx in range(1, results.class_number+1):
+            cluster = df_tmp[df_tmp["main-class"] == class_idx]
+            cdtfile.write(cluster.to_csv(sep="\t",
+                                         columns=col_names,
+                                         index=False,
+                                         header=False,
+                                         na_rep=""))
+
+
+def timeit(function, *args, **kwargs):
+    """Time function call in seconds."""
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--classes", type=int, default=100)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+    logging.getLogger("autoclasswrapper").setLevel(logging.WARNING)
+    results = make_output(args.rows, args.classes, args.columns)
+    print(f"{args.rows} rows, {args.classes} classes, "
+          f"{args.columns} columns")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        for with_proba in (False, True):
+            duration = timeit(results.write_cdt, with_proba=with_proba)
+            print(f"write_cdt(with_proba={with_proba}): {duration:.2f} s")
+            if args.legacy:
+                duration = timeit(legacy_write_cdt, results,
+                                  with_proba=with_proba)
+                print(f"legacy write_cdt(with_proba={with_proba}): "
+                      f"{duration:.2f} s")
+        duration = timeit(results.write_cdt_all)
+        print(f"write_cdt_all(): {duration:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Generate synthetic datasets and AutoClass C results for benchmarks.
+
+Usage:
+
+    python benchmarks/synthetic.py dataset data.tsv [--type "real location"]
+        [--rows 10000] [--columns 10] [--classes 5] [--missing-rate 0.0]
+        [--seed 0]
+    python benchmarks/synthetic.py case-data autoclass.case-data-1
+        [--cases 10000] [--classes 5] [--seed 0]
+
+Datasets are mixtures of gaussian clusters, one cluster per class.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+DATA_TYPES = ("real scalar", "real location", "discrete")
+
+
+def make_dataset(rows, columns, data_type="real location", classes=5,
+                 missing_rate=0.0, seed=0):
+    """Build synthetic dataset.
+
+    Parameters
+    ----------
+    rows : int
+        Number of cases.
+    columns : int
+        Number of columns.
+    data_type : string, optional (default: "real location")
+        Either "real scalar" (positive values), "real location"
+        or "discrete" (categories "v1", "v2"...).
+    classes : int, optional (default: 5)
+        Number of clusters in data.
+    missing_rate : float, optional (default: 0.0)
+        Fraction of missing values.
+    seed : int, optional (default: 0)
+        Seed of random generator.
+
+    Returns
+    -------
+    df : Pandas dataframe
+        Dataset with case names as index.
+
+    """
+    if data_type not in DATA_TYPES:
+        raise ValueError(f"Unknown data type '{data_type}'. "
+                         f"Available: {', '.join(DATA_TYPES)}")
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(classes, size=rows)
+    centers = rng.uniform(-10, 10, size=(classes, columns))
+    values = centers[labels] + rng.normal(size=(rows, columns))
+    prefix = data_type.split()[-1]
+    df = pd.DataFrame(values,
+                      index=pd.Index([f"case{i+1:07d}" for i in range(rows)],
+                                     name="name"),
+                      columns=[f"{prefix}{i+1}" for i in range(columns)])
+    if data_type == "real scalar":
+        df = np.exp(df / 5)
+    elif data_type == "discrete":
+        # categories follow clusters, with about 10% noise
+        categories = np.array([f"v{i+1}" for i in range(classes)])
+        codes = np.where(rng.random((rows, columns)) < 0.1,
+                         rng.integers(classes, size=(rows, columns)),
+                         labels[:, None])
+        df = pd.DataFrame(categories[codes], index=df.index,
+                          columns=df.columns)
+    if missing_rate > 0:
+        df = df.mask(rng.random(df.shape) < missing_rate)
+    return df
+
+
+def write_dataset(filename, df):
+    """Write dataset as tab-separated file read by Input.add_input_data().
+
+    Parameters
+    ----------
+    filename : string
+        Name of output file.
+    df : Pandas dataframe
+        Dataset.
+
+    """
+    df.to_csv(filename, sep="\t", na_rep="")
+
+
+def write_case_data(case_name, cases, classes, seed=0):
+    """Write synthetic AutoClass C case data file.
+
+    Each case has up to 3 (class, probability) pairs.
+
+    Parameters
+    ----------
+    case_name : string
+        Name of .case-data-1 file.
+    cases : int
+        Number of cases.
+    classes : int
+        Number of classes.
+    seed : int, optional (default: 0)
+        Seed of random generator.
+
+    """
+    rng = np.random.default_rng(seed)
+    header = ("# synthetic case data\n"
+              "DATA_CASE_TO_CLASS\n"
+              "#Case# Class  Prob    (Class  Prob)\n")
+    with open(case_name, "w") as case_file:
+        case_file.write(header)
+        for start in range(0, cases, 100_000):
+            lines = []
+            for case in range(start + 1, min(start + 100_000, cases) + 1):
+                n_pairs = rng.integers(1, min(classes, 3) + 1)
+                pair_classes = rng.choice(classes, n_pairs, replace=False)
+                probas = np.sort(rng.dirichlet(np.ones(n_pairs)))[::-1]
+                pairs = " ".join(f"{klass:4d}   {proba:.3f}"
+                                 for klass, proba in zip(pair_classes, probas))
+                lines.append(f"{case:06d} {pairs}\n")
+            case_file.write("".join(lines))
+
+
+def main():
+    """Generate files from command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    dataset = subparsers.add_parser("dataset", help="input data file")
+    dataset.add_argument("filename")
+    dataset.add_argument("--type", default="real location",
+                         choices=DATA_TYPES)
+    dataset.add_argument("--rows", type=int, default=10_000)
+    dataset.add_argument("--columns", type=int, default=10)
+    dataset.add_argument("--classes", type=int, default=5)
+    dataset.add_argument("--missing-rate", type=float, default=0.0)
+    dataset.add_argument("--seed", type=int, default=0)
+    case_data = subparsers.add_parser("case-data",
+                                      help="AutoClass C .case-data-1 file")
+    case_data.add_argument("filename")
+    case_data.add_argument("--cases", type=int, default=10_000)
+    case_data.add_argument("--classes", type=int, default=5)
+    case_data.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.command == "dataset":
+        write_dataset(args.filename,
+                      make_dataset(args.rows, args.columns, args.type,
+                                   classes=args.classes,
+                                   missing_rate=args.missing_rate,
+                                   seed=args.seed))
+    else:
+        write_case_data(args.filename, args.cases, args.classes,
+                        seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
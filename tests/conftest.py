@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+
+# writes results and report files, and records its resource limits
+# the search lasts FAKE_AUTOCLASS_SLEEP seconds (default: 0)
+FAKE_AUTOCLASS = """#!/bin/bash
+[ -z "$1" ] && echo 'AUTOCLASS C fake' && exit 0
+root=${2%.*}
+if [ "$1" = "-search" ]
+then
+    pwd > $root.results-bin
+    cat $root.db2 $root.s-params > $root.search
+    touch $root.log
+    ulimit -v > $root.limits
+    nice >> $root.limits
+    grep Cpus_allowed_list /proc/self/status >> $root.limits
+    sleep ${FAKE_AUTOCLASS_SLEEP:-0}
+else
+    printf '001 1 1.000\\n002 2 1.000\\n' > $root.case-data-1
+    touch $root.class-data-1 $root.influ-o-data-1
+fi
+"""
+
+
+@pytest.fixture
+def fake_autoclass(tmp_dir, monkeypatch):
+    """Fake AutoClass C binary, first in PATH.
+
+    Returns the directory of the fake binary.
+    """
+    bin_dir = os.path.abspath("fakebin")
+    os.makedirs(bin_dir, exist_ok=True)
+    with open(os.path.join(bin_dir, "autoclass"), "w") as fake:
+        fake.write(FAKE_AUTOCLASS)
+    os.chmod(os.path.join(bin_dir, "autoclass"), 0o755)
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    return bin_dir
@@ -0,0 +1,71 @@
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+import autoclasswrapper as wrapper
+from autoclasswrapper import cache
+
+here = os.path.abspath(os.path.dirname(__file__))
+dir_data = "test_data"
+
+@pytest.fixture(scope='session')
+def tmp_dir(tmpdir_factory):
+    """Create temp dir and cd in it."""
+    tmpd = tmpdir_factory.mktemp("cache")
+    os.chdir(str(tmpd))
+
+
+def test_hash_file(tmp_dir):
+    name = os.path.join(here, dir_data, "sample-real-location.tsv")
+    assert cache.hash_file(name) == cache.hash_file(name, chunk_size=7)
+
+
+def test_hash_items():
+    assert cache.hash_items([1, "a"]) == cache.hash_items([1, "a"])
+    assert cache.hash_items([1, "a"]) != cache.hash_items([1, "b"])
+
+
+class TestArtifactCacheClass(object):
+    """Tests for the ArtifactCache class."""
+
+    def test_store_restore(self, tmp_dir):
+        store = wrapper.ArtifactCache("cache-store")
+        with open("file.db2", "w") as f_out:
+            f_out.write("content")
+        store.store("key", "file.db2", ".db2")
+        assert store.contains("key", [".db2"])
+        assert not store.contains("key", [".db2", ".hd2"])
+        store.restore("key", ".db2", "restored.db2")
+        with open("restored.db2") as f_in:
+            assert f_in.read() == "content"
+        # stored files are read-only
+        entry = os.path.join(store.entry_path("key"), ".db2")
+        assert os.stat(entry).st_mode & 0o777 == 0o444
+
+    def test_evict_lru(self, tmp_dir):
+        store = wrapper.ArtifactCache("cache-lru", max_entries=2)
+        with open("file.db2", "w") as f_out:
+            f_out.write("content")
+        for key in ("a", "b"):
+            store.store(key, "file.db2", ".db2")
+            # make sure access times differ
+            time.sleep(0.01)
+        # 'a' becomes most recently used
+        store.restore("a", ".db2", "restored.db2")
+        time.sleep(0.01)
+        store.store("c", "file.db2", ".db2")
+        assert store.contains("a", [".db2"])
+        assert not store.contains("b", [".db2"])
+        assert store.contains("c", [".db2"])
+
+    def test_evict_max_size(self, tmp_dir):
+        store = wrapper.ArtifactCache("cache-size", max_size=10)
+        with open("file.db2", "w") as f_out:
+            f_out.write("content")
+        store.store("a", "file.db2", ".db2")
+        time.sleep(0.01)
+        store.store("b", "file.db2", ".db2")
+        assert [key for key, _, _ in store.entries()] == ["b"]
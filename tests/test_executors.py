@@ -0,0 +1,190 @@
+import sys
+import os
+import multiprocessing
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+import autoclasswrapper as wrapper
+from autoclasswrapper import executors
+
+here = os.path.abspath(os.path.dirname(__file__))
+dir_data = "test_data"
+
+@pytest.fixture(scope='session')
+def tmp_dir(tmpdir_factory):
+    """Create temp dir and cd in it."""
+    tmpd = tmpdir_factory.mktemp("executors")
+    os.chdir(str(tmpd))
+
+
+@pytest.fixture
+def fake_ssh(fake_autoclass):
+    """Fake ssh command that runs commands locally, ignoring the host."""
+    ssh_name = os.path.join(fake_autoclass, "ssh")
+    with open(ssh_name, "w") as fake:
+        fake.write("#!/bin/bash\n"
+                   "shift\n"
+                   "exec bash -c \"$*\"\n")
+    os.chmod(ssh_name, 0o755)
+
+
+def create_run(work_dir, root_name, executor, **kwargs):
+    os.makedirs(work_dir, exist_ok=True)
+    with open(os.path.join(work_dir, root_name + ".db2"), "w") as db2:
+        db2.write(f"{root_name}\t1.0\n")
+    for ext in (".hd2", ".model", ".s-params", ".r-params"):
+        open(os.path.join(work_dir, root_name + ext), "w").close()
+    run = wrapper.Run(root_name, work_dir=work_dir, executor=executor,
+                      **kwargs)
+    run.create_run_file()
+    return run
+
+
+def check_results(run, job_dir_prefix):
+    with open(run.get_path(run.root_name + ".search")) as search:
+        assert search.read() == f"{run.root_name}\t1.0\n"
+    with open(run.get_path(run.root_name + ".results-bin")) as results:
+        job_dir = results.read().strip()
+    # AutoClass C ran in a job directory, not in work_dir
+    assert job_dir != os.path.abspath(run.work_dir)
+    assert os.path.basename(job_dir).startswith(job_dir_prefix)
+    assert os.path.exists(run.get_path(run.root_name + ".case-data-1"))
+    assert os.path.exists(run.get_path("autoclass-search.log"))
+    assert os.path.exists(run.get_path("autoclass-run-success"))
+    return job_dir
+
+
+class TestExecutors(object):
+    """Tests for executors."""
+
+    def test_local_pool(self, fake_autoclass):
+        with executors.LocalPoolExecutor(max_workers=2,
+                                         base_dir="pool-scratch") as pool:
+            runs = [create_run(f"pool{idx}", "pool", pool)
+                    for idx in range(3)]
+            for run in runs:
+                run.run()
+            assert [run.future.result() for run in runs] == [0, 0, 0]
+        for run in runs:
+            job_dir = check_results(run, "pool-")
+            # cleaned up after success
+            assert not os.path.exists(job_dir)
+
+    def test_directory_queue(self, fake_autoclass):
+        queue_dir = os.path.abspath("queue")
+        worker = multiprocessing.Process(target=executors.run_worker,
+                                         args=(queue_dir, 0.1, None, 5))
+        worker.start()
+        # second worker started from the command line
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(here))
+        worker_cli = subprocess.Popen([sys.executable, "-m",
+                                       "autoclasswrapper", "worker",
+                                       queue_dir, "--poll-interval", "0.1",
+                                       "--idle-timeout", "5"],
+                                      env=env)
+        with executors.DirectoryQueueExecutor(queue_dir, poll_interval=0.1,
+                                              cleanup="never") as queue:
+            runs = [create_run(f"queued{idx}", "queued", queue)
+                    for idx in range(4)]
+            for run in runs:
+                run.run(tag="queued")
+            assert [run.future.result() for run in runs] == [0, 0, 0, 0]
+        for run in runs:
+            job_dir = check_results(run, "queued-")
+            assert os.path.dirname(job_dir) == os.path.join(queue_dir,
+                                                            "running")
+            # kept with cleanup="never"
+            done_dir = os.path.join(queue_dir, "done",
+                                    os.path.basename(job_dir))
+            assert os.path.exists(os.path.join(done_dir, "returncode"))
+        worker.join()
+        assert worker_cli.wait() == 0
+        assert os.listdir(os.path.join(queue_dir, "pending")) == []
+        assert os.listdir(os.path.join(queue_dir, "running")) == []
+
+    def test_directory_queue_errors(self, fake_autoclass):
+        queue_dir = os.path.abspath("queue-errors")
+        # no worker
+        with executors.DirectoryQueueExecutor(queue_dir, poll_interval=0.1,
+                                              timeout=0.5) as queue:
+            run = create_run("timeout", "timeout", queue)
+            run.run()
+            with pytest.raises(TimeoutError):
+                run.future.result()
+        assert os.listdir(os.path.join(queue_dir, "pending")) == []
+        # invalid job does not stop the worker
+        os.makedirs(os.path.join(queue_dir, "pending", "invalid"))
+        with executors.DirectoryQueueExecutor(queue_dir, poll_interval=0.1,
+                                              timeout=30) as queue:
+            run = create_run("valid", "valid", queue)
+            run.run()
+            assert executors.run_worker(queue_dir, 0.1, max_jobs=2) == 2
+            assert run.future.result() == 0
+        invalid_dir = os.path.join(queue_dir, "done", "invalid")
+        with open(os.path.join(invalid_dir, "returncode")) as rc_file:
+            assert int(rc_file.read()) == executors.WORKER_ERROR_RETURNCODE
+        assert os.path.exists(os.path.join(invalid_dir,
+                                           "autoclass-run-failure"))
+
+    def test_claim_job(self, tmp_dir):
+        executors.create_queue_dir("claim")
+        assert executors.claim_job("claim") is None
+        os.makedirs(os.path.join("claim", "pending", "job1"))
+        job_dir = executors.claim_job("claim")
+        assert job_dir == os.path.join("claim", "running", "job1")
+        assert os.path.isdir(job_dir)
+        assert executors.claim_job("claim") is None
+
+    def test_ssh(self, fake_ssh):
+        remote_dir = os.path.abspath("remote")
+        with executors.SSHExecutor(["node01", "node02"],
+                                   remote_dir=remote_dir) as ssh:
+            runs = [create_run(f"ssh{idx}", "ssh", ssh) for idx in range(2)]
+            for run in runs:
+                run.run()
+            assert [run.future.result() for run in runs] == [0, 0]
+        for run in runs:
+            check_results(run, "ssh-")
+        assert os.listdir(remote_dir) == []
+
+    def test_cache(self, fake_autoclass):
+        with executors.LocalPoolExecutor(max_workers=1,
+                                         base_dir="pool-scratch") as pool:
+            run = create_run("cached", "cached", pool, cache_dir="cache")
+            with open(run.get_path("cached.s-params"), "w") as sparams:
+                sparams.write("randomize_random_p = false\n"
+                              "start_fn_type = \"block\"\n")
+            run.run()
+            assert run.future.result() == 0
+            # results stored in cache before the future is done
+            run = create_run("cached", "cached", pool, cache_dir="cache")
+            with open(run.get_path("cached.s-params"), "w") as sparams:
+                sparams.write("randomize_random_p = false\n"
+                              "start_fn_type = \"block\"\n")
+            run.run()
+            assert run.cache_hit
+            assert run.future is None
+
+    def test_run_queue(self, fake_autoclass):
+        with executors.LocalPoolExecutor(max_workers=2,
+                                         base_dir="pool-scratch") as pool, \
+                wrapper.RunQueue(max_cpus=1, poll_interval=0.1) as queue:
+            runs = [create_run(f"pool{idx}", "runqueue", pool)
+                    for idx in range(2)]
+            jobs = [queue.submit(run, memory=1) for run in runs]
+        assert [job.state for job in jobs] == ["done", "done"]
+        assert [job.returncode for job in jobs] == [0, 0]
+
+    def test_errors(self, tmp_dir):
+        with pytest.raises(ValueError, match="Unknown cleanup policy"):
+            executors.LocalPoolExecutor(cleanup="sometimes")
+        with pytest.raises(TypeError):
+            executors.Executor(max_workers=1)
+        pool = executors.LocalPoolExecutor(max_workers=1)
+        with pytest.raises(ValueError, match="scratch directory"):
+            wrapper.Run("errors", executor=pool, scratch_dir="auto")
+        with pytest.raises(ValueError, match="Use work_dir"):
+            wrapper.Run("dir/errors", executor=pool)
+        pool.shutdown()
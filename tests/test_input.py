@@ -75,6 +75,27 @@ class TestDatasetClass(object):
         assert "Column 'colD': 2 different values" in caplog.text
         assert "Column 'colE': 3 different values" in caplog.text
 
+    def test_check_data_type_truncated_log(self, caplog, monkeypatch):
+        monkeypatch.setattr(wrapper.input, "MAX_LOGGED_COLUMNS", 2)
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        ds = wrapper.Dataset(name, "real location", error=0.01)
+        ds.read_datafile()
+        ds.check_data_type()
+        assert "Column 'colB'" in caplog.text
+        assert "Column 'colC'" not in caplog.text
+        assert "... and 1 more columns" in caplog.text
+
+    def test_set_log_level(self, caplog):
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        ds = wrapper.Dataset(name, "real location", error=0.01)
+        ds.read_datafile()
+        wrapper.set_log_level("WARNING")
+        try:
+            ds.check_data_type()
+        finally:
+            wrapper.set_log_level("INFO")
+        assert "Column 'colA'" not in caplog.text
+
     def test_search_missing_values(self, caplog):
         name = os.path.join(here, dir_data, "sample-missing-values.tsv")
         ds = wrapper.Dataset(name, "real location", error=0.01)
@@ -87,10 +108,30 @@ class TestDatasetClass(object):
         name = os.path.join(here, dir_data, "sample-column-names.tsv")
         ds = wrapper.Dataset(name, "real location", error=0.01)
         ds.read_datafile()
-        ds.clean_column_names()
+        with pytest.raises(wrapper.DuplicateColumnNameError,
+                           match="'coléèà' 'col\\[\\]\\(\\)/' -> 'col_'"):
+            ds.clean_column_names()
         assert "Column 'gene(name)' renamed to 'gene_name_'" in caplog.text
         assert "Column 'coléèà' renamed to 'col_'" in caplog.text
         assert "Column 'col[]()/' renamed to 'col_'" in caplog.text
+        # data are left unchanged
+        assert list(ds.df.columns) == list(ds.column_meta)
+        assert "coléèà" in ds.df.columns
+
+    def test_clean_column_names_meta(self, caplog, tmpdir):
+        name = str(tmpdir.join("names.tsv"))
+        with open(name, "w") as data_file:
+            data_file.write("gene(name)\tcol A\tcol-B\tcol(C)\n"
+                            "gene00\t1\t2\ta\n")
+        ds = wrapper.Dataset(name, "real location", error=0.01)
+        ds.read_datafile()
+        ds.column_meta["col(C)"]["type"] = "discrete"
+        ds.clean_column_names()
+        assert ds.df.index.name == "gene_name_"
+        assert list(ds.df.columns) == ["col_A", "col-B", "col_C_"]
+        assert list(ds.column_meta) == ["col_A", "col-B", "col_C_"]
+        assert ds.column_meta["col_C_"]["type"] == "discrete"
+        assert "Column 'col-B' renamed" not in caplog.text
 
 
 class TestInputClass(object):
@@ -198,6 +239,25 @@ class TestInputClass(object):
             content = f.read()
         assert content == content_ref
 
+    def test_create_rparams_file_report_type(self, caplog):
+        clust = wrapper.Input()
+        clust.create_rparams_file(report_type="xref_case", max_class_probs=2)
+        with open("autoclass.r-params", "r") as rparams:
+            content = rparams.read()
+        assert content == ('report_type = "xref_case" \n'
+                           'max_num_xref_class_probs = 2 \n'
+                           'report_mode = "data" \n'
+                           'comment_data_headers_p = true \n')
+        clust.create_rparams_file(report_type="xref_class",
+                                  xref_class_attributes=[0, 3])
+        assert "results cannot be read by Output()" in caplog.text
+        with open("autoclass.r-params", "r") as rparams:
+            assert "xref_class_report_att_list = 0, 3 \n" in rparams.read()
+        clust.create_rparams_file(report_type="summary")
+        assert clust.had_error
+        assert "Unknown report type 'summary'" in caplog.text
+        os.remove("autoclass.r-params")
+
     def test_print_files(self):
         clust = wrapper.Input()
         name = os.path.join(here, dir_data, "sample-real-location.tsv")
@@ -212,3 +272,108 @@ class TestInputClass(object):
         assert "autoclass.model" in content
         assert "autoclass.s-params" in content
         assert "autoclass.r-params" in content
+
+    def test_input_cache(self, caplog, tmp_dir, tmpdir):
+        cache_dir = str(tmpdir.join("cache"))
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        contents = {}
+        for run in range(2):
+            clust = wrapper.Input("cached", cache_dir=cache_dir)
+            clust.add_input_data(name, "real location")
+            clust.prepare_input_data()
+            clust.create_db2_file()
+            clust.create_hd2_file()
+            clust.create_model_file()
+            clust.create_sparams_file(max_duration=run+1)
+            assert clust.cache_hit == bool(run)
+            for ext in (".db2", ".tsv", ".hd2", ".model"):
+                with open("cached" + ext) as f_in:
+                    content = f_in.read()
+                assert contents.setdefault(ext, content) == content
+        assert "Reusing cached.db2 file from cache" in caplog.text
+        assert "max_duration = 2" in open("cached.s-params").read()
+        # files written without cache never overwrite cache entries
+        clust = wrapper.Input("cached")
+        clust.add_input_data(os.path.join(here, dir_data,
+                                          "sample-real-scalar.tsv"),
+                              "real scalar")
+        clust.prepare_input_data()
+        clust.create_db2_file()
+        assert open("cached.db2").read() != contents[".db2"]
+        clust = wrapper.Input("cached", cache_dir=cache_dir)
+        clust.add_input_data(name, "real location")
+        clust.prepare_input_data()
+        clust.create_db2_file()
+        assert clust.cache_hit
+        assert open("cached.db2").read() == contents[".db2"]
+
+    def test_create_db2_file_compressed(self, caplog, tmp_dir):
+        clust = wrapper.Input("compressed", tsv_compression="gzip")
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        clust.add_input_data(name, "real location")
+        clust.prepare_input_data()
+        clust.create_db2_file()
+        assert os.path.isfile("compressed.tsv.gz")
+        assert not os.path.isfile("compressed.tsv")
+
+    def test_add_dataframe(self, caplog, tmp_dir):
+        import numpy as np
+        import pandas as pd
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        clust_file = wrapper.Input("from_file")
+        clust_file.add_input_data(name, "real location")
+        clust_file.prepare_input_data()
+        clust_file.create_db2_file()
+        df = pd.read_csv(name, sep="\t", index_col=0)
+        df.columns = ["col A", "colB", "colC"]
+        clust = wrapper.Input("from_df")
+        clust.add_dataframe(df, "real location")
+        assert "Column 'col A' renamed to 'col_A'" in caplog.text
+        # user data are not modified
+        assert df.columns.tolist() == ["col A", "colB", "colC"]
+        clust.prepare_input_data()
+        clust.create_db2_file()
+        assert not clust.had_error
+        assert (open("from_df.db2").read()
+                == open("from_file.db2").read())
+        assert np.shares_memory(clust.full_dataset.df["colB"].to_numpy(),
+                                df["colB"].to_numpy())
+
+    def test_add_array(self):
+        import numpy as np
+        array = np.array([[1.0, np.nan], [3.0, 4.0], [5.0, 6.0]])
+        clust = wrapper.Input("from_array")
+        clust.add_array(array, ["a", "b", "c"], ["x", "y"], "real scalar")
+        clust.prepare_input_data()
+        assert not clust.had_error
+        df = clust.full_dataset.df
+        assert df.index.name == "name"
+        assert np.shares_memory(df.to_numpy(), array)
+        assert clust.full_dataset.column_meta["y"]["missing"]
+        assert not clust.full_dataset.column_meta["x"]["missing"]
+
+    def test_add_array_dup_col_names(self, caplog):
+        import numpy as np
+        clust = wrapper.Input()
+        clust.add_array(np.zeros((2, 2)), ["a", "b"], ["x", "x"],
+                        "real scalar")
+        assert clust.had_error
+        assert "Found duplicate column names" in caplog.text
+
+    def test_input_cache_dataframe(self, caplog, tmp_dir, tmpdir):
+        import pandas as pd
+        cache_dir = str(tmpdir.join("cache"))
+        df = pd.DataFrame({"x": [1.0, 2.0], "y": [3.0, 4.0]},
+                          index=pd.Index(["a", "b"], name="name"))
+        keys = []
+        for values in ([1.0, 2.0], [1.0, 2.0], [1.0, 5.0]):
+            df["x"] = values
+            clust = wrapper.Input("cached_df", cache_dir=cache_dir)
+            clust.add_dataframe(df, "real scalar")
+            clust.prepare_input_data()
+            clust.create_db2_file()
+            clust.create_hd2_file()
+            clust.create_model_file()
+            keys.append((clust.cache_key, clust.cache_hit))
+        assert keys[0][0] == keys[1][0] != keys[2][0]
+        assert [hit for key, hit in keys] == [False, True, False]
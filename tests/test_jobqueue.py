@@ -0,0 +1,112 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+import autoclasswrapper as wrapper
+
+here = os.path.abspath(os.path.dirname(__file__))
+dir_data = "test_data"
+
+@pytest.fixture(scope='session')
+def tmp_dir(tmpdir_factory):
+    """Create temp dir and cd in it."""
+    tmpd = tmpdir_factory.mktemp("jobqueue")
+    os.chdir(str(tmpd))
+
+
+def create_run(root_name):
+    with open(root_name + ".db2", "w") as db2:
+        db2.write("a\t1.0\nb\t2.0\n")
+    with open(root_name + ".s-params", "w") as sparams:
+        sparams.write("start_j_list = 2, 3, 50\n")
+    for ext in (".hd2", ".model", ".r-params"):
+        open(root_name + ext, "w").close()
+    run = wrapper.Run(root_name)
+    run.create_run_file()
+    return run
+
+
+def test_estimate_memory(tmp_dir):
+    run = create_run("estimate")
+    assert run.get_start_j_list() == [2, 3, 50]
+    assert run.estimate_memory() == (wrapper.run.MEMORY_BASE
+                                     + wrapper.run.MEMORY_PER_DB2_BYTE * 12
+                                     + wrapper.run.MEMORY_PER_CASE_CLASS
+                                     * 2 * 50)
+    open("estimate.s-params", "w").close()
+    assert run.get_start_j_list() == list(wrapper.run.DEFAULT_START_J_LIST)
+
+
+class TestRunQueueClass(object):
+    """Tests for the RunQueue class."""
+
+    def test_queue(self, caplog, monkeypatch, fake_autoclass):
+        monkeypatch.setenv("FAKE_AUTOCLASS_SLEEP", "1")
+        runs = [create_run(f"queued{idx}") for idx in range(2)]
+        with wrapper.RunQueue(max_cpus=1, niceness=5,
+                              poll_interval=0.1) as queue:
+            jobs = [queue.submit(run, memory=100 * 1024**2) for run in runs]
+            assert queue.depth >= 1
+            assert jobs[1].state == "queued"
+        assert [job.state for job in jobs] == ["done", "done"]
+        # single CPU core: second run waits for the first one
+        assert jobs[1].wait_time >= jobs[0].run_time - 0.1
+        assert jobs[1].start_time >= jobs[0].end_time
+        stats = queue.get_stats()
+        assert stats["done"] == 2
+        assert stats["queued"] == stats["running"] == 0
+        assert stats["max_wait_time"] == pytest.approx(jobs[1].wait_time)
+        assert stats["free_cpus"] == 1
+        with open("queued0.limits") as limits:
+            address_space, niceness, affinity = limits.read().splitlines()
+        assert int(address_space) == 200 * 1024
+        assert int(niceness) >= 5
+        assert affinity.split()[-1] == str(jobs[0].cpu_ids[0])
+        assert "after" in caplog.text
+
+    def test_memory_admission(self, tmp_dir):
+        queue = wrapper.RunQueue(max_memory=100)
+        job = wrapper.RunJob(None, "", 60, 1)
+        assert queue.can_start(job)
+        queue.running.append(wrapper.RunJob(None, "", 60, 0))
+        queue.used_memory = 60
+        # not enough memory left
+        assert not queue.can_start(job)
+        queue.used_memory = 40
+        assert queue.can_start(job)
+        # larger than max_memory: started alone
+        queue.running = []
+        assert queue.can_start(wrapper.RunJob(None, "", 500, 1))
+
+    def test_start_error(self, tmp_dir):
+        class FailingRun(object):
+            root_name = "failing"
+            had_error = False
+            cache_hit = False
+            process = None
+            future = None
+
+            def run(self, tag, command_prefix=None):
+                raise OSError("cannot start")
+
+        with wrapper.RunQueue(max_cpus=1, poll_interval=0.1) as queue:
+            jobs = [queue.submit(FailingRun(), memory=1) for _ in range(2)]
+        # scheduler survives errors
+        assert [job.state for job in jobs] == ["error", "error"]
+        assert all(job.finished.is_set() for job in jobs)
+
+    def test_make_limits_command(self, tmp_dir):
+        command = wrapper.jobqueue.make_limits_command(1024**2, 5, [0, 1])
+        assert command == ["prlimit", f"--as={1024**2}", "nice", "-n", "5",
+                           "taskset", "-c", "0,1"]
+        assert wrapper.jobqueue.make_limits_command(None, 0, None) == []
+
+    def test_shutdown(self, tmp_dir):
+        queue = wrapper.RunQueue()
+        queue.shutdown(cancel=True)
+        with pytest.raises(RuntimeError, match="closed queue"):
+            queue.submit(None, memory=1)
+        with pytest.raises(ValueError, match="Cannot reserve"):
+            wrapper.RunQueue(max_cpus=1, cpus_per_run=2)
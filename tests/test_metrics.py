@@ -0,0 +1,119 @@
+import sys
+import os
+import json
+import threading
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+import autoclasswrapper as wrapper
+from autoclasswrapper import metrics
+
+here = os.path.abspath(os.path.dirname(__file__))
+dir_data = "test_data"
+
+@pytest.fixture(scope='session')
+def tmp_dir(tmpdir_factory):
+    """Create temp dir and cd in it."""
+    tmpd = tmpdir_factory.mktemp("metrics")
+    os.chdir(str(tmpd))
+
+
+def test_get_peak_rss():
+    if metrics.resource is None:
+        assert metrics.get_peak_rss() is None
+    else:
+        assert metrics.get_peak_rss() > 0
+
+
+class TestMetricsClass(object):
+    """Test for the Metrics class."""
+
+    def test_measure(self):
+        records = []
+        stage_metrics = wrapper.Metrics(callback=records.append)
+        with stage_metrics.measure("outer"):
+            with stage_metrics.measure("inner"):
+                stage_metrics.count(rows=10)
+            stage_metrics.count(rows=3, bytes=100)
+        assert [record["stage"] for record in records] == ["inner", "outer"]
+        assert records == stage_metrics.records
+        assert records[0]["rows"] == 10 and records[0]["bytes"] is None
+        assert records[1]["rows"] == 3 and records[1]["bytes"] == 100
+        assert records[1]["wall_time"] >= records[0]["wall_time"] >= 0
+        assert not records[1]["error"]
+        # no running stage
+        stage_metrics.count(rows=1)
+
+    def test_measure_threads(self):
+        stage_metrics = wrapper.Metrics()
+        entered = threading.Event()
+        finished = threading.Event()
+
+        def first_stage():
+            with stage_metrics.measure("first"):
+                entered.set()
+                finished.wait(5)
+                stage_metrics.count(rows=1)
+
+        thread = threading.Thread(target=first_stage)
+        thread.start()
+        entered.wait(5)
+        # second stage starts while the first one runs in another thread
+        with stage_metrics.measure("second"):
+            finished.set()
+            thread.join()
+            stage_metrics.count(rows=2)
+        records = {record["stage"]: record for record in stage_metrics.records}
+        assert records["first"]["rows"] == 1
+        assert records["second"]["rows"] == 2
+
+    def test_measure_error(self):
+        stage_metrics = wrapper.Metrics()
+        with pytest.raises(ValueError):
+            with stage_metrics.measure("failing"):
+                raise ValueError("failure")
+        assert stage_metrics.records[0]["error"]
+
+    def test_callback_error(self, caplog):
+        def callback(record):
+            raise RuntimeError("unavailable")
+        stage_metrics = wrapper.Metrics(callback=callback)
+        with stage_metrics.measure("stage"):
+            pass
+        assert "Cannot publish metrics: unavailable" in caplog.text
+
+    def test_export(self, tmp_dir):
+        stage_metrics = wrapper.Metrics(prometheus_file="metrics.prom")
+        with stage_metrics.measure("Input.create_db2_file"):
+            stage_metrics.count(rows=5)
+        stage_metrics.to_json("metrics.json")
+        with open("metrics.json", "r") as json_file:
+            assert json.load(json_file) == stage_metrics.records
+        with open("metrics.prom", "r") as prom_file:
+            content = prom_file.read()
+        assert "# TYPE autoclasswrapper_stage_wall_seconds gauge" in content
+        assert ('autoclasswrapper_stage_rows{stage="Input.create_db2_file"} '
+                '5.0') in content
+        assert 'autoclasswrapper_stage_bytes{' not in content
+
+    def test_stages(self, caplog, tmp_dir):
+        stage_metrics = wrapper.Metrics()
+        clust = wrapper.Input(metrics=stage_metrics)
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        clust.add_input_data(name, "real location")
+        clust.prepare_input_data()
+        clust.create_db2_file()
+        run = wrapper.Run(metrics=stage_metrics)
+        run.create_run_file()
+        stages = [record["stage"] for record in stage_metrics.records]
+        assert stages == ["Input.add_input_data",
+                          "Input.prepare_input_data",
+                          "Input.create_db2_file",
+                          "Run.create_run_file"]
+        db2_record = stage_metrics.records[2]
+        assert db2_record["rows"] == 10
+        assert db2_record["bytes"] == (os.path.getsize("autoclass.db2")
+                                       + os.path.getsize("autoclass.tsv"))
+        clust.create_rparams_file(report_type="unknown")
+        assert stage_metrics.records[-1]["error"]
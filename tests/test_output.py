@@ -1,8 +1,14 @@
 import sys
 import os
 import shutil
+import gzip
+import tarfile
+import zipfile
 import filecmp
 
+import numpy as np
+import pandas as pd
+import scipy.cluster.hierarchy as hierarchy
 import pytest
 
 sys.path.insert(0,os.getcwd())
@@ -28,6 +34,71 @@ def tmp_dir(tmpdir_factory):
     print("Tests are in: {}".format(str(tmpd)))
 
 
+def test_weighted_ward_linkage():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(12, 5))
+    Z = wrapper.output.weighted_ward_linkage(data, np.ones(12))
+    Z_ref = hierarchy.linkage(data, "ward")
+    assert np.allclose(Z[:, 2], Z_ref[:, 2])
+    assert np.allclose(Z[:, 3], Z_ref[:, 3])
+    # uniform weights scale distances
+    Z = wrapper.output.weighted_ward_linkage(data, np.full(12, 4.0))
+    assert np.allclose(Z[:, 2], 2 * Z_ref[:, 2])
+
+
+def test_reduce_dimension():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(6, 100))
+    reduced = wrapper.output.reduce_dimension(data, "pca", 10)
+    assert reduced.shape == (6, 6)
+    # distances are preserved
+    assert np.allclose(hierarchy.distance.pdist(reduced),
+                       hierarchy.distance.pdist(data))
+    reduced = wrapper.output.reduce_dimension(data, "random", 10)
+    assert reduced.shape == (6, 10)
+
+
+def test_parse_case_data():
+    content = (b"# comment\n"
+               b"DATA_CASE_TO_CLASS\n"
+               b"#Case# Class  Prob    (Class  Prob)\n"
+               b"001     1   0.800    0   0.200\n"
+               b"\n"
+               b"002     0   1.000    \n"
+               b"003     2   0.600    0   0.300   1  0.100")
+    parsed = wrapper.output.parse_case_data(content)
+    cases, pair_lines, pair_classes, pair_probas = parsed
+    assert list(cases) == [1, 2, 3]
+    assert list(pair_lines) == [0, 0, 1, 2, 2, 2]
+    assert list(pair_classes) == [1, 0, 0, 2, 0, 1]
+    assert list(pair_probas) == [0.8, 0.2, 1.0, 0.6, 0.3, 0.1]
+    stats, class_number = wrapper.output.build_case_stats(*parsed)
+    assert class_number == 3
+    assert list(stats["main-class"]) == [2, 1, 3]
+    assert list(stats["class-1-proba"]) == [0.2, 1.0, 0.3]
+
+
+def test_parse_case_data_malformed():
+    with pytest.raises(ValueError, match="Need case#, class and prob"):
+        wrapper.output.parse_case_data(b"001     1   0.800    0\n")
+    with pytest.raises(ValueError, match="non-numeric"):
+        wrapper.output.parse_case_data(b"001     1   x.800\n")
+
+
+def test_split_case_file(tmp_path):
+    case_name = str(tmp_path / "test.case-data-1")
+    with open(case_name, "wb") as case_file:
+        case_file.write(b"".join(b"%03d     1   1.000\n" % idx
+                                 for idx in range(1, 101)))
+    ranges = wrapper.output.split_case_file(case_name, 3)
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == os.path.getsize(case_name)
+    for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+        assert end == start
+        assert end % 18 == 0
+    assert len(wrapper.output.split_case_file(case_name, 500)) == 100
+
+
 class TestOutputClass(object):
     """Test for the Output class
     """
@@ -50,6 +121,28 @@ class TestOutputClass(object):
         assert res.stats["main-class"].nunique() == 3
         assert res.stats.shape == (600, 5)
 
+    def test_get_report_files(self, caplog, tmp_dir):
+        res = wrapper.Output("reports")
+        assert res.get_report_files() == ["reports.influ-o-data-1",
+                                          "reports.case-data-1",
+                                          "reports.class-data-1"]
+        with open("reports.r-params", "w") as rparams:
+            rparams.write('report_type = "influence_values" \n')
+        assert res.get_report_files() == ["reports.influ-o-data-1"]
+        res.extract_results()
+        assert res.had_error
+        assert "No case data report" in caplog.text
+
+    def test_extract_results_parallel(self, caplog, tmp_dir, monkeypatch):
+        ref = wrapper.Output(target_root_name)
+        ref.extract_results()
+        monkeypatch.setattr(wrapper.output, "PARALLEL_PARSING_MIN_SIZE", 0)
+        res = wrapper.Output(target_root_name)
+        res.extract_results(n_jobs=3)
+        assert "with 3 processes" in caplog.text
+        pd.testing.assert_frame_equal(res.stats, ref.stats)
+        assert res.class_number == ref.class_number
+
     def test_aggregate_input_data(self, caplog, tmp_dir):
         res = wrapper.Output(target_root_name)
         res.extract_results()
@@ -79,6 +172,44 @@ class TestOutputClass(object):
                            res.root_out_name + "_withproba.cdt",
                            shallow=False)
 
+    def test_write_cdt_all(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "cdt_all")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_cdt_all()
+        ref = wrapper.Output(target_root_name, "cdt_ref")
+        ref.extract_results()
+        ref.aggregate_input_data()
+        ref.write_cdt()
+        ref.write_cdt(with_proba=True)
+        for suffix in (".cdt", "_withproba.cdt"):
+            assert filecmp.cmp(ref.root_out_name + suffix,
+                               res.root_out_name + suffix,
+                               shallow=False)
+
+    def test_write_cdt_line_separators(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "separators")
+        # form feed is a line boundary for str.splitlines()
+        res.df = pd.DataFrame({"label": ["a\x0cb", "c", "d"],
+                               "x": [1.0, 2.0, 3.0],
+                               "main-class": [1, 1, 2],
+                               "main-class-proba": [0.9, 0.8, 1.0],
+                               "class-1-proba": [0.9, 0.8, 0.0],
+                               "class-2-proba": [0.1, 0.2, 1.0]},
+                              index=pd.Index(["g1", "g2", "g3"], name="name"))
+        res.experiment_names = ["label", "x"]
+        res.class_number = 2
+        res.write_cdt_all()
+        assert not res.had_error
+        with open(res.root_out_name + "_withproba.cdt", newline="\n") as cdt:
+            rows = [line.split("\t") for line in cdt.read().split("\n")
+                    if line.startswith("GENE") and "X\t" in line]
+        assert [row[1] for row in rows] == ["g1", "g2", "g3"]
+        assert [row[4] for row in rows] == ["a\x0cb", "c", "d"]
+        assert [row[-2:] for row in rows] == [["0.9", "0.1"],
+                                              ["0.8", "0.2"],
+                                              ["0.0", "1.0"]]
+
     def test_write_dendrogram_no_stats(self, caplog, tmp_dir):
         res = wrapper.Output(target_root_name)
         res.extract_results()
@@ -98,9 +229,285 @@ class TestOutputClass(object):
                            res.root_out_name + "_stats.tsv",
                            shallow=False)
 
+    def test_write_cluster_stats_extra(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "extra")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_class_stats(extra_stats=["max", "median", "min",
+                                           "weighted-mean"])
+        df = pd.read_csv(res.root_out_name + "_stats.tsv", sep="\t")
+        assert list(df["stat"][:7]) == ["count", "max", "mean", "median",
+                                        "min", "std", "weighted-mean"]
+        class1 = res.df[res.df["main-class"] == 1]
+        stats1 = df[df["class"] == 1].set_index("stat")
+        assert stats1.loc["median", "x"] == pytest.approx(class1["x"].median())
+        assert stats1.loc["max", "y"] == pytest.approx(class1["y"].max())
+        # probabilities are 0 or 1 in this dataset
+        assert stats1.loc["weighted-mean", "x"] == \
+            pytest.approx(stats1.loc["mean", "x"])
+
+    def test_class_stats_class_gap(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "gap")
+        # no case in class 2
+        res.df = pd.DataFrame({"x": [1.0, 3.0, 5.0],
+                               "main-class": [1, 3, 3],
+                               "main-class-proba": [1.0, 0.5, 1.0],
+                               "class-1-proba": [1.0, 0.5, 0.0],
+                               "class-2-proba": [0.0, 0.0, 0.0],
+                               "class-3-proba": [0.0, 0.5, 1.0]})
+        res.experiment_names = ["x"]
+        res.class_number = 2
+        stats = res.get_class_stats(extra_stats=["weighted-mean"])
+        means = stats[stats["stat"] == "weighted-mean"]
+        assert list(means["class"]) == [1, 3]
+        assert list(means["x"]) == pytest.approx([2.5 / 1.5, 6.5 / 1.5])
+
+    def test_write_cluster_stats_unknown(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "unknown")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_class_stats(extra_stats=["mode"])
+        assert "Unknown statistic 'mode'" in caplog.text
+
     def test_write_dendrogram(self, caplog, tmp_dir):
         res = wrapper.Output(target_root_name)
         res.extract_results()
         res.aggregate_input_data()
         res.write_dendrogram()
         assert os.path.isfile(res.root_out_name + "_dendrogram.png")
+
+    def test_write_dendrogram_in_memory(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "in_memory")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_class_stats()
+        assert list(res.class_stats["stat"][:3]) == ["count", "mean", "std"]
+        # stats file is not read again
+        os.remove(res.root_out_name + "_stats.tsv")
+        res.write_dendrogram()
+        assert os.path.isfile(res.root_out_name + "_dendrogram.png")
+
+    def test_write_dendrogram_formats(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "formats")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_class_stats()
+        Z = res.write_dendrogram(render=False)
+        assert Z.shape == (2, 4)
+        assert not os.path.isfile(res.root_out_name + "_dendrogram.png")
+        for image_format in ("svg", "pdf"):
+            res.write_dendrogram(image_format=image_format)
+            assert os.path.isfile(f"{res.root_out_name}_dendrogram."
+                                  f"{image_format}")
+
+    def test_write_dendrogram_threads(self, caplog, tmp_dir):
+        from concurrent.futures import ThreadPoolExecutor
+        outputs = []
+        for idx in range(4):
+            res = wrapper.Output(target_root_name, f"thread{idx}")
+            res.extract_results()
+            res.aggregate_input_data()
+            res.write_class_stats()
+            outputs.append(res)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda res: res.write_dendrogram(), outputs))
+        for res in outputs:
+            assert not res.had_error
+            assert os.path.isfile(res.root_out_name + "_dendrogram.png")
+
+    def test_write_dendrogram_options(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "options")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_class_stats()
+        Z_ref = res.write_dendrogram(render=False)
+        Z = res.write_dendrogram(render=False, reduce_dim="pca",
+                                 n_components=1, weight_by_size=True)
+        assert Z.shape == Z_ref.shape
+        Z = res.write_dendrogram(render=False, method="average",
+                                 metric="cityblock")
+        assert sorted(res.class_order) == [1, 2, 3]
+        res.write_dendrogram(render=False, method="average",
+                             weight_by_size=True)
+        assert "'ward' method and 'euclidean' metric only" in caplog.text
+
+    def test_write_cdt_class_order(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "ordered")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_cdt(class_order=[3, 1, 2])
+        with open(res.root_out_name + ".cdt") as cdt_file:
+            spacers = [line.strip() for line in cdt_file
+                       if line.strip().endswith("S")]
+        assert spacers[0] == "GENE0001-003S"
+        assert spacers[-1] == "GENE0005-002S"
+
+    def test_aggregate_input_data_in_memory(self, caplog, tmp_dir):
+        ref = wrapper.Output(target_root_name, "ref")
+        ref.extract_results()
+        ref.aggregate_input_data(output_format=None)
+        assert not os.path.isfile(ref.root_out_name + ".tsv")
+        clust = wrapper.Input("snapshot")
+        clust.add_input_data(target_root_name + ".tsv", "real location")
+        clust.prepare_input_data()
+        # from Input object
+        res = wrapper.Output(target_root_name, "memory")
+        res.extract_results()
+        res.aggregate_input_data(clust, output_format="pickle")
+        pd.testing.assert_frame_equal(res.df, ref.df)
+        assert os.path.isfile(res.root_out_name + ".pkl")
+        # from dataframe with a column named "df"
+        res = wrapper.Output(target_root_name, "memory_df")
+        res.extract_results()
+        df = clust.full_dataset.df.rename(columns={"x": "df"})
+        res.aggregate_input_data(df, output_format=None)
+        assert not res.had_error
+        assert list(res.df.columns[:2]) == ["df", "y"]
+        # other types are rejected
+        res = wrapper.Output(target_root_name, "memory_series")
+        res.extract_results()
+        res.aggregate_input_data(df["y"], output_format=None)
+        assert res.had_error
+        assert "not Series" in caplog.text
+        # from snapshot
+        clust.create_db2_file(snapshot=True)
+        shutil.copy2(target_root_name + ".case-data-1",
+                     "snapshot.case-data-1")
+        res = wrapper.Output("snapshot", "snapshot_out")
+        res.extract_results()
+        res.aggregate_input_data()
+        assert "Reading snapshot.pkl snapshot" in caplog.text
+        pd.testing.assert_frame_equal(res.df, ref.df)
+        # snapshot older than .tsv file is ignored
+        os.utime("snapshot.pkl", (0, 0))
+        assert not res.is_snapshot_current()
+        assert "Ignoring snapshot.pkl snapshot" in caplog.text
+        # snapshot removed when .db2 file is written again
+        clust.create_db2_file()
+        assert not os.path.isfile("snapshot.pkl")
+
+    def test_compute_results(self, caplog, tmp_dir):
+        import glob
+        res = wrapper.Output(target_root_name, "computed")
+        results = res.compute_results(extra_stats=["median"])
+        assert glob.glob("computed*") == []
+        assert results.case_number == 600
+        assert results.class_number == 3
+        assert list(results.assignments.columns) == ["x", "y", "main-class",
+                                                     "main-class-proba"]
+        assert list(results.probabilities.columns) == [
+            "class-1-proba", "class-2-proba", "class-3-proba"]
+        assert "median" in set(results.class_stats["stat"])
+        assert results.class_linkage.shape == (2, 4)
+        assert sorted(results.class_order) == [1, 2, 3]
+        # files are written in a separate step
+        ref = wrapper.Output(target_root_name, "computed_ref")
+        ref.extract_results()
+        ref.aggregate_input_data()
+        ref.write_class_stats(extra_stats=["median"])
+        ref.write_dendrogram()
+        ref.write_cdt_all(class_order=ref.class_order)
+        res.write_results()
+        assert not res.had_error
+        for suffix in (".tsv", ".cdt", "_withproba.cdt", "_stats.tsv",
+                       "_dendrogram.png"):
+            assert os.path.isfile(res.root_out_name + suffix)
+        for suffix in (".tsv", ".cdt", "_withproba.cdt", "_stats.tsv"):
+            assert filecmp.cmp(ref.root_out_name + suffix,
+                               res.root_out_name + suffix,
+                               shallow=False)
+
+    def test_write_results_without_results(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "no_results")
+        res.write_results()
+        assert "Run compute_results() first" in caplog.text
+        res = wrapper.Output(target_root_name, "no_linkage")
+        res.extract_results()
+        res.draw_dendrogram()
+        assert "Run compute_linkage() first" in caplog.text
+
+    def test_read_column_types(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "types")
+        assert res.read_column_types() == {}
+        shutil.copy2(target_root_path + ".hd2", ".")
+        assert res.read_column_types() == {"x": "float64", "y": "float64"}
+        os.remove(target_root_name + ".hd2")
+
+    @pytest.mark.parametrize("file_format, module, reader", [
+        ("parquet", "pyarrow", pd.read_parquet),
+        ("feather", "pyarrow", pd.read_feather),
+        ("hdf5", "tables", pd.read_hdf),
+    ])
+    def test_export(self, caplog, tmp_dir, file_format, module, reader):
+        pytest.importorskip(module)
+        res = wrapper.Output(target_root_name, f"export_{file_format}")
+        res.extract_results()
+        res.aggregate_input_data(output_format=None)
+        res.write_class_stats()
+        filenames = res.export(file_format)
+        assert not res.had_error
+        if file_format == "hdf5":
+            df = reader(filenames[0], key="results")
+            stats = reader(filenames[0], key="class_stats")
+        else:
+            df = reader(filenames[0])
+            stats = reader(filenames[1])
+        if file_format == "feather":
+            df = df.set_index(res.df.index.name)
+        pd.testing.assert_frame_equal(df, res.df, check_dtype=False,
+                                      check_index_type=False)
+        assert len(stats) == len(res.class_stats)
+
+    def test_export_unknown_format(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "export_unknown")
+        res.extract_results()
+        res.export("xlsx")
+        assert "Unknown file format 'xlsx'" in caplog.text
+
+    def test_read_compressed(self, caplog, tmp_dir):
+        ref = wrapper.Output(target_root_name, "uncompressed")
+        ref.extract_results()
+        ref.aggregate_input_data(output_format=None)
+        for ext in (".case-data-1", ".tsv"):
+            with open(target_root_name + ext, "rb") as f_in, \
+                    gzip.open("compressed" + ext + ".gz", "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        res = wrapper.Output("compressed", "compressed_out")
+        res.extract_results()
+        res.aggregate_input_data(output_format=None)
+        assert not res.had_error
+        pd.testing.assert_frame_equal(res.df, ref.df)
+
+    @pytest.mark.parametrize("archive_format", ["tar.gz", "tar.zst", "zip"])
+    def test_write_archive(self, caplog, tmp_dir, archive_format):
+        if archive_format == "tar.zst":
+            zstandard = pytest.importorskip("zstandard")
+        res = wrapper.Output(target_root_name, f"archive_{archive_format}")
+        res.extract_results()
+        res.aggregate_input_data()
+        res.write_cdt()
+        archive_name = res.write_archive(archive_format,
+                                         include_autoclass_files=True)
+        expected = [res.root_out_name + ".tsv",
+                    res.root_out_name + ".cdt",
+                    target_root_name + ".case-data-1",
+                    target_root_name + ".tsv"]
+        if archive_format == "zip":
+            names = zipfile.ZipFile(archive_name).namelist()
+        elif archive_format == "tar.gz":
+            names = tarfile.open(archive_name).getnames()
+        else:
+            with open(archive_name, "rb") as f_in:
+                reader = zstandard.ZstdDecompressor().stream_reader(f_in)
+                names = tarfile.open(fileobj=reader, mode="r|").getnames()
+        assert sorted(names) == sorted(expected)
+
+    def test_write_archive_level_0(self, caplog, tmp_dir):
+        res = wrapper.Output(target_root_name, "archive_level")
+        res.extract_results()
+        res.aggregate_input_data()
+        sizes = [os.path.getsize(res.write_archive("tar.gz",
+                                                   compression_level=level))
+                 for level in (9, 0)]
+        # level 0 stores data without compression
+        assert sizes[1] > sizes[0]
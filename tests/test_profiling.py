@@ -0,0 +1,90 @@
+import sys
+import os
+import pstats
+import threading
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+import autoclasswrapper as wrapper
+from autoclasswrapper import profiling
+
+here = os.path.abspath(os.path.dirname(__file__))
+dir_data = "test_data"
+
+@pytest.fixture(scope='session')
+def tmp_dir(tmpdir_factory):
+    """Create temp dir and cd in it."""
+    tmpd = tmpdir_factory.mktemp("profiling")
+    os.chdir(str(tmpd))
+
+
+def test_profiling_requested(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV_VARIABLE, raising=False)
+    assert not profiling.profiling_requested()
+    monkeypatch.setenv(profiling.PROFILE_ENV_VARIABLE, "0")
+    assert not profiling.profiling_requested()
+    monkeypatch.setenv(profiling.PROFILE_ENV_VARIABLE, "1")
+    assert profiling.profiling_requested()
+
+
+class TestProfilerClass(object):
+    """Test for the Profiler class."""
+
+    def test_disabled(self, tmp_dir):
+        profiler = profiling.Profiler(None)
+        assert not profiler.enabled
+        with profiler.profile("stage"):
+            pass
+        assert profiler.counts == {}
+
+    def test_profile(self, tmp_dir):
+        profiler = profiling.Profiler("profiles", top_n=5)
+        for _ in range(2):
+            with profiler.profile("outer"):
+                with profiler.profile("inner"):
+                    sorted(range(1000))
+        assert profiler.counts == {"outer": 2}
+        assert sorted(os.listdir("profiles")) == ["outer.2.prof",
+                                                  "outer.prof",
+                                                  "summary.txt"]
+        stats = pstats.Stats(os.path.join("profiles", "outer.prof"))
+        assert any(function[2] == "<built-in method builtins.sorted>"
+                   for function in stats.stats)
+        with open(os.path.join("profiles", "summary.txt"), "r") as summary:
+            content = summary.read()
+        assert "outer.2 (" in content
+        assert "builtins.sorted" in content
+
+    def test_profile_threads(self, tmp_dir):
+        profiler = profiling.Profiler("profiles-threads")
+        entered = threading.Event()
+        finished = threading.Event()
+
+        def first_stage():
+            with profiler.profile("first"):
+                entered.set()
+                finished.wait(5)
+
+        thread = threading.Thread(target=first_stage)
+        thread.start()
+        entered.wait(5)
+        # not nested in the stage running in another thread
+        with profiler.profile("second"):
+            finished.set()
+            thread.join()
+        assert profiler.counts == {"first": 1, "second": 1}
+
+    def test_input_profile(self, tmp_dir, monkeypatch):
+        monkeypatch.delenv(profiling.PROFILE_ENV_VARIABLE, raising=False)
+        clust = wrapper.Input("profiled", profile=True)
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        clust.add_input_data(name, "real location")
+        clust.prepare_input_data()
+        assert os.path.isfile("profiled-profile/Input.add_input_data.prof")
+        assert os.path.isfile(
+            "profiled-profile/Input.prepare_input_data.prof")
+        monkeypatch.setenv(profiling.PROFILE_ENV_VARIABLE, "1")
+        results = wrapper.Output("profiled", "profiled_out")
+        assert results.profiler.profile_dir == "profiled_out-profile"
+        assert wrapper.Run().profiler.profile_dir == "autoclass-profile"
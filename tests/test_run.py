@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 
 import pytest
 
@@ -30,3 +31,148 @@ class TestRunClass(object):
         run = wrapper.Run()
         run.create_run_file_test()
         assert os.path.isfile("autoclass.sh")
+
+    def test_run_cache(self, caplog, tmp_dir, fake_autoclass):
+        for ext in (".db2", ".hd2", ".model", ".r-params"):
+            open("cached" + ext, "w").close()
+        with open("cached.s-params", "w") as sparams:
+            sparams.write("randomize_random_p = false\n"
+                          'start_fn_type = "block"\n')
+        run = wrapper.Run("cached", cache_dir="run-cache")
+        run.create_run_file()
+        run.run()
+        assert not run.cache_hit
+        entry = run.cache.entry_path(run.get_cache_key())
+        for _ in range(100):
+            if os.path.isdir(entry):
+                break
+            time.sleep(0.1)
+        assert run.cache.contains(run.get_cache_key(),
+                                  [".results-bin", ".search", ".case-data-1"])
+        os.remove("cached.case-data-1")
+        run = wrapper.Run("cached", cache_dir="run-cache")
+        run.run()
+        assert run.cache_hit
+        assert "Found results in cache" in caplog.text
+        assert os.path.isfile("cached.case-data-1")
+        assert os.path.isfile("autoclass-run-success")
+        # cache miss after a hit: cached results are not overwritten
+        with open("cached.s-params", "a") as sparams:
+            sparams.write("max_n_tries = 2\n")
+        run.create_run_file()
+        run.run()
+        assert not run.cache_hit
+        run.process.wait()
+        with open("cached.s-params", "w") as sparams:
+            sparams.write("randomize_random_p = false\n"
+                          'start_fn_type = "block"\n')
+        run.run()
+        assert run.cache_hit
+        with open("cached.search") as search:
+            assert "max_n_tries" not in search.read()
+
+    def test_run_without_autoclass(self, caplog, tmp_dir, monkeypatch):
+        monkeypatch.setenv("PATH", os.path.abspath("empty-path"))
+        with open("previous.search", "w") as search:
+            search.write("previous results\n")
+        run = wrapper.Run("previous")
+        run.run()
+        assert run.process is None
+        # results of a previous run are kept
+        assert os.path.isfile("previous.search")
+
+    def test_run_interim_reports(self, caplog, tmp_dir, monkeypatch,
+                                 fake_autoclass):
+        # slow search
+        monkeypatch.setenv("FAKE_AUTOCLASS_SLEEP", "4")
+        for ext in (".db2", ".hd2", ".model", ".s-params", ".r-params"):
+            open("interim" + ext, "w").close()
+        for name in ("autoclass-run-success", "autoclass-run-failure"):
+            if os.path.exists(name):
+                os.remove(name)
+        run = wrapper.Run("interim")
+        run.create_run_file(interim_period=1)
+        assert "every 1 seconds" in caplog.text
+        run.run()
+        results = wrapper.Output("interim")
+        for _ in range(30):
+            if results.extract_interim_results():
+                break
+            time.sleep(0.1)
+        assert results.class_number == 2
+        assert "(interim)" in caplog.text
+        assert not results.extract_interim_results()
+        for _ in range(100):
+            if os.path.isfile("autoclass-run-success"):
+                break
+            time.sleep(0.1)
+        assert os.path.isfile("autoclass-run-success")
+
+    def test_run_interim_reports_stop(self, caplog, tmp_dir, fake_autoclass):
+        for ext in (".db2", ".hd2", ".model", ".s-params", ".r-params"):
+            open("interimstop" + ext, "w").close()
+        run = wrapper.Run("interimstop")
+        # period longer than the search
+        run.create_run_file(interim_period=37)
+        run.run()
+        run.process.wait()
+        assert os.path.isfile("autoclass-run-success")
+        # background sleep is stopped with the interim subshell
+        for pid in filter(str.isdigit, os.listdir("/proc")):
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+                    assert cmdline.read() != b"sleep\x0037\x00"
+            except OSError:
+                pass
+
+    @pytest.mark.parametrize("cleanup, artifacts", [
+        ("on_success", None),
+        ("never", [".case-data-1"]),
+    ])
+    def test_run_scratch(self, caplog, tmp_dir, fake_autoclass,
+                         cleanup, artifacts):
+        work_dir = f"work-{cleanup}"
+        os.makedirs(work_dir, exist_ok=True)
+        for ext in (".db2", ".hd2", ".model", ".s-params", ".r-params"):
+            open(os.path.join(work_dir, "staged" + ext), "w").close()
+        run = wrapper.Run("staged", work_dir=work_dir,
+                          scratch_dir="scratch-base",
+                          scratch_artifacts=artifacts,
+                          scratch_cleanup=cleanup)
+        run.create_run_file()
+        run.run()
+        assert not run.had_error
+        assert os.path.dirname(run.run_dir) == os.path.abspath("scratch-base")
+        success = os.path.join(work_dir, "autoclass-run-success")
+        for _ in range(100):
+            if os.path.isfile(success):
+                break
+            time.sleep(0.1)
+        assert os.path.isfile(success)
+        assert os.path.isfile(os.path.join(work_dir, "staged.case-data-1"))
+        results_bin = os.path.join(work_dir, "staged.results-bin")
+        if cleanup == "on_success":
+            # AutoClass C ran in scratch directory
+            with open(results_bin) as f_in:
+                assert f_in.read().strip() == run.run_dir
+            for _ in range(100):
+                if not os.path.isdir(run.run_dir):
+                    break
+                time.sleep(0.1)
+            assert not os.path.isdir(run.run_dir)
+        else:
+            assert not os.path.isfile(results_bin)
+            assert os.path.isfile(os.path.join(run.run_dir,
+                                               "staged.results-bin"))
+
+    def test_run_scratch_errors(self, caplog, tmp_dir):
+        with pytest.raises(ValueError, match="Unknown cleanup policy"):
+            wrapper.Run(scratch_cleanup="sometimes")
+        with pytest.raises(ValueError, match="Use work_dir"):
+            wrapper.Run("dir/autoclass", scratch_dir="auto")
+
+    def test_create_run_file_interim_error(self, caplog, tmp_dir):
+        run = wrapper.Run()
+        run.create_run_file(interim_period=0)
+        assert run.had_error
+        assert "must be positive" in caplog.text
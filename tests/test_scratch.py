@@ -0,0 +1,52 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+import autoclasswrapper as wrapper
+from autoclasswrapper import scratch
+
+here = os.path.abspath(os.path.dirname(__file__))
+dir_data = "test_data"
+
+@pytest.fixture(scope='session')
+def tmp_dir(tmpdir_factory):
+    """Create temp dir and cd in it."""
+    tmpd = tmpdir_factory.mktemp("scratch")
+    os.chdir(str(tmpd))
+
+
+def test_default_scratch_base(monkeypatch, tmpdir):
+    monkeypatch.setattr(scratch, "SHM_DIR", str(tmpdir.join("no-shm")))
+    monkeypatch.setenv("TMPDIR", str(tmpdir))
+    monkeypatch.setattr(scratch.tempfile, "tempdir", None)
+    assert scratch.default_scratch_base() == str(tmpdir)
+    monkeypatch.setattr(scratch, "SHM_DIR", str(tmpdir))
+    assert scratch.default_scratch_base() == str(tmpdir)
+
+
+class TestScratchDirClass(object):
+    """Tests for the ScratchDir class."""
+
+    def test_stage(self, tmp_dir):
+        with open("input.db2", "w") as db2:
+            db2.write("1\t2\n")
+        scratch_dir = wrapper.ScratchDir("base", prefix="test-")
+        assert os.path.basename(scratch_dir.path).startswith("test-")
+        assert scratch_dir.stage(["input.db2", "missing.hd2"]) == 4
+        assert os.listdir(scratch_dir.path) == ["input.db2"]
+        scratch_dir.remove()
+        assert not os.path.exists(scratch_dir.path)
+
+    def test_work_dir(self, tmp_dir):
+        clust = wrapper.Input("work", work_dir="inputs")
+        name = os.path.join(here, dir_data, "sample-real-location.tsv")
+        clust.add_input_data(name, "real location")
+        clust.prepare_input_data()
+        clust.create_db2_file()
+        clust.create_rparams_file()
+        assert os.path.isfile(os.path.join("inputs", "work.db2"))
+        res = wrapper.Output("work", work_dir="inputs")
+        assert res.get_report_files()[0].startswith(
+            os.path.join("inputs", "work."))
@@ -31,3 +31,21 @@ def test_search_autoclass_in_path(caplog, tmp_dir):
 def test_get_autoclass_version(caplog):
     wrapper.get_autoclass_version()
     assert "AUTOCLASS" in caplog.text
+
+
+def test_read_report_type(tmp_dir):
+    assert wrapper.tools.read_report_type("missing.r-params") == "all"
+    with open("report.r-params", "w") as rparams:
+        rparams.write('report_type = "xref_case" \nreport_mode = "data" \n')
+    assert wrapper.tools.read_report_type("report.r-params") == "xref_case"
+
+
+def test_find_file_open_text(tmp_dir):
+    import gzip
+    with gzip.open("packed.txt.gz", "wt") as f_out:
+        f_out.write("content\n")
+    name = wrapper.tools.find_file("packed.txt")
+    assert name == "packed.txt.gz"
+    with wrapper.tools.open_text(name) as f_in:
+        assert f_in.read() == "content\n"
+    assert wrapper.tools.find_file("missing.txt") == "missing.txt"